@@ -0,0 +1,36 @@
+"""add_stock_journal
+
+Revision ID: 5c1f3a9d2e41
+Revises: 82fd2d7e1982
+Create Date: 2026-10-18 09:30:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5c1f3a9d2e41'
+down_revision: Union[str, Sequence[str], None] = '82fd2d7e1982'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('stock_journal',
+    sa.Column('id', sa.BigInteger(), nullable=False),
+    sa.Column('product_id', sa.BigInteger(), nullable=False, comment='关联商品ID'),
+    sa.Column('quantity', sa.Integer(), nullable=False, comment='销量变化: 正数=扣减库存, 负数=回补库存'),
+    sa.Column('created_at', sa.DateTime(timezone=True), nullable=True, comment='创建时间'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_stock_journal_product_id'), 'stock_journal', ['product_id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_stock_journal_product_id'), table_name='stock_journal')
+    op.drop_table('stock_journal')
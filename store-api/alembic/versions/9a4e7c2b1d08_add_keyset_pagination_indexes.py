@@ -0,0 +1,41 @@
+"""add_keyset_pagination_indexes
+
+Revision ID: 9a4e7c2b1d08
+Revises: 5c1f3a9d2e41
+Create Date: 2026-10-18 11:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9a4e7c2b1d08'
+down_revision: Union[str, Sequence[str], None] = '5c1f3a9d2e41'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # (category_id, status, id) 覆盖原 (category_id, status) 的所有查询
+    op.create_index('idx_products_cat_status_id', 'products', ['category_id', 'status', 'id'], unique=False)
+    op.drop_index('idx_products_cat_status', table_name='products')
+    op.create_index('idx_products_status_id', 'products', ['status', 'id'], unique=False)
+    op.create_index('idx_products_created_id', 'products', ['created_at', 'id'], unique=False)
+    op.create_index('idx_orders_created_id', 'orders', ['created_at', 'id'], unique=False)
+    op.create_index('idx_orders_status_created_id', 'orders', ['status', 'created_at', 'id'], unique=False)
+    op.create_index('idx_users_created_id', 'users', ['created_at', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('idx_users_created_id', table_name='users')
+    op.drop_index('idx_orders_status_created_id', table_name='orders')
+    op.drop_index('idx_orders_created_id', table_name='orders')
+    op.drop_index('idx_products_created_id', table_name='products')
+    op.drop_index('idx_products_status_id', table_name='products')
+    op.create_index('idx_products_cat_status', 'products', ['category_id', 'status'], unique=False)
+    op.drop_index('idx_products_cat_status_id', table_name='products')
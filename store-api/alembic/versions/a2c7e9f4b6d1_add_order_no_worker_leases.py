@@ -0,0 +1,36 @@
+"""add_order_no_worker_leases
+
+Revision ID: a2c7e9f4b6d1
+Revises: d1f6a3c8e5b2
+Create Date: 2026-10-18 23:40:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a2c7e9f4b6d1'
+down_revision: Union[str, Sequence[str], None] = 'd1f6a3c8e5b2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # 订单号 worker id 改为租约分配，取代循环取号的序列
+    op.create_table('order_no_worker_leases',
+    sa.Column('worker_id', sa.Integer(), autoincrement=False, nullable=False, comment='订单号 worker id'),
+    sa.Column('holder', sa.String(length=100), nullable=False, comment='持有者 (主机名:进程号:随机串)'),
+    sa.Column('expires_at', sa.DateTime(timezone=True), nullable=False, comment='租约到期时间'),
+    sa.PrimaryKeyConstraint('worker_id')
+    )
+    op.execute(sa.schema.DropSequence(sa.Sequence('order_no_worker_seq')))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute(sa.schema.CreateSequence(sa.Sequence('order_no_worker_seq')))
+    op.drop_table('order_no_worker_leases')
@@ -0,0 +1,48 @@
+"""add_daily_sales_rollup
+
+Revision ID: a8c4e2f6b1d9
+Revises: f7b3d2e8a4c6
+Create Date: 2026-10-19 10:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from app.core.config import settings
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a8c4e2f6b1d9'
+down_revision: Union[str, Sequence[str], None] = 'f7b3d2e8a4c6'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'daily_sales_rollup',
+        sa.Column('day', sa.Date(), nullable=False, comment='日期 (门店时区，订单按下单时间归属)'),
+        sa.Column('shard', sa.SmallInteger(), nullable=False, comment='分片号 (订单ID % SALES_ROLLUP_SHARDS)'),
+        sa.Column('order_count', sa.Integer(), nullable=False, comment='下单数'),
+        sa.Column('completed_count', sa.Integer(), nullable=False, comment='已完成订单数'),
+        sa.Column('sales_amount', sa.Numeric(precision=14, scale=2), nullable=False, comment='已完成订单实付金额'),
+        sa.PrimaryKeyConstraint('day', 'shard'),
+    )
+    # 由历史订单回填 (分片只用于分散写入，回填全部写入 0 号分片)
+    op.execute(sa.text("""
+        INSERT INTO daily_sales_rollup (day, shard, order_count, completed_count, sales_amount)
+        SELECT (created_at AT TIME ZONE :tz)::date, 0, count(*),
+               count(*) FILTER (WHERE status = 4),
+               coalesce(sum(final_amount) FILTER (WHERE status = 4), 0)
+        FROM orders
+        WHERE created_at IS NOT NULL
+        GROUP BY 1
+    """).bindparams(tz=settings.SHOP_TIMEZONE))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('daily_sales_rollup')
@@ -0,0 +1,71 @@
+"""add_hourly_and_product_sales_rollup
+
+Revision ID: b3f9d5a7c2e4
+Revises: a8c4e2f6b1d9
+Create Date: 2026-10-19 14:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from app.core.config import settings
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b3f9d5a7c2e4'
+down_revision: Union[str, Sequence[str], None] = 'a8c4e2f6b1d9'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'hourly_sales_rollup',
+        sa.Column('day', sa.Date(), nullable=False, comment='日期 (门店时区)'),
+        sa.Column('hour', sa.SmallInteger(), nullable=False, comment='小时 (门店时区，0-23)'),
+        sa.Column('shard', sa.SmallInteger(), nullable=False, comment='分片号 (订单ID % SALES_ROLLUP_SHARDS)'),
+        sa.Column('order_count', sa.Integer(), nullable=False, comment='下单数'),
+        sa.Column('completed_count', sa.Integer(), nullable=False, comment='已完成订单数'),
+        sa.Column('sales_amount', sa.Numeric(precision=14, scale=2), nullable=False, comment='已完成订单实付金额'),
+        sa.PrimaryKeyConstraint('day', 'hour', 'shard'),
+    )
+    op.create_table(
+        'product_sales_rollup',
+        sa.Column('day', sa.Date(), nullable=False, comment='日期 (门店时区，按订单下单时间归属)'),
+        sa.Column('product_id', sa.BigInteger(), nullable=False, comment='商品ID'),
+        sa.Column('product_name', sa.String(length=100), nullable=False, comment='最近一次计入时的商品名称快照'),
+        sa.Column('quantity', sa.Integer(), nullable=False, comment='销售数量'),
+        sa.Column('sales_amount', sa.Numeric(precision=14, scale=2), nullable=False, comment='销售额 (快照单价 × 数量，不含运费)'),
+        sa.Column('order_count', sa.Integer(), nullable=False, comment='包含该商品的已完成订单数'),
+        sa.PrimaryKeyConstraint('day', 'product_id'),
+    )
+    # 由历史订单回填 (分片只用于分散写入，回填全部写入 0 号分片)
+    op.execute(sa.text("""
+        INSERT INTO hourly_sales_rollup (day, hour, shard, order_count, completed_count, sales_amount)
+        SELECT (created_at AT TIME ZONE :tz)::date, extract(hour FROM created_at AT TIME ZONE :tz), 0, count(*),
+               count(*) FILTER (WHERE status = 4),
+               coalesce(sum(final_amount) FILTER (WHERE status = 4), 0)
+        FROM orders
+        WHERE created_at IS NOT NULL
+        GROUP BY 1, 2
+    """).bindparams(tz=settings.SHOP_TIMEZONE))
+    op.execute(sa.text("""
+        INSERT INTO product_sales_rollup (day, product_id, product_name, quantity, sales_amount, order_count)
+        SELECT (o.created_at AT TIME ZONE :tz)::date, i.product_id,
+               (array_agg(i.product_name ORDER BY i.id DESC))[1],
+               sum(i.quantity), sum(i.price * i.quantity), count(DISTINCT i.order_id)
+        FROM orders o
+        JOIN order_items i ON i.order_id = o.id
+        WHERE o.status = 4 AND o.created_at IS NOT NULL
+          AND i.product_id IS NOT NULL AND NOT i.is_removed
+        GROUP BY 1, 2
+    """).bindparams(tz=settings.SHOP_TIMEZONE))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('product_sales_rollup')
+    op.drop_table('hourly_sales_rollup')
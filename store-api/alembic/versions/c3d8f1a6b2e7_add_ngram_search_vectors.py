@@ -0,0 +1,63 @@
+"""add_ngram_search_vectors
+
+Revision ID: c3d8f1a6b2e7
+Revises: 9a4e7c2b1d08
+Create Date: 2026-10-18 14:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+from app.utils.search import tsvector_literal, DEFAULT_NGRAM_SIZES
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c3d8f1a6b2e7'
+down_revision: Union[str, Sequence[str], None] = '9a4e7c2b1d08'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# 与 app.models.user.PHONE_NGRAM_SIZES 一致 (迁移不导入模型，避免随模型变更)
+PHONE_NGRAM_SIZES = (1, 2, 3)
+BATCH_SIZE = 1000
+
+
+def _backfill(table: str, source: str, target: str, sizes) -> None:
+    # 分词在 Python 中完成 (与运行时写入一致)，按主键分批回填
+    bind = op.get_bind()
+    select_batch = sa.text(
+        f"SELECT id, {source} FROM {table} WHERE id > :last_id ORDER BY id LIMIT :limit"
+    )
+    update_row = sa.text(f"UPDATE {table} SET {target} = CAST(:vector AS tsvector) WHERE id = :id")
+    last_id = 0
+    while True:
+        rows = bind.execute(select_batch, {"last_id": last_id, "limit": BATCH_SIZE}).all()
+        if not rows:
+            break
+        bind.execute(update_row, [
+            {"id": row[0], "vector": tsvector_literal(row[1], sizes)} for row in rows
+        ])
+        last_id = rows[-1][0]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('products', sa.Column('search_vector', postgresql.TSVECTOR(), nullable=True, comment='商品名称 n-gram 检索向量'))
+    op.add_column('users', sa.Column('phone_search_vector', postgresql.TSVECTOR(), nullable=True, comment='手机号 n-gram 检索向量'))
+
+    _backfill('products', 'name', 'search_vector', DEFAULT_NGRAM_SIZES)
+    _backfill('users', 'phone', 'phone_search_vector', PHONE_NGRAM_SIZES)
+
+    op.create_index('idx_products_search', 'products', ['search_vector'], unique=False, postgresql_using='gin')
+    op.create_index('idx_users_phone_search', 'users', ['phone_search_vector'], unique=False, postgresql_using='gin')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('idx_users_phone_search', table_name='users')
+    op.drop_index('idx_products_search', table_name='products')
+    op.drop_column('users', 'phone_search_vector')
+    op.drop_column('products', 'search_vector')
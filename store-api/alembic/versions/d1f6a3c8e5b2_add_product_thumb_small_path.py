@@ -0,0 +1,29 @@
+"""add_product_thumb_small_path
+
+Revision ID: d1f6a3c8e5b2
+Revises: b3f9d5a7c2e4
+Create Date: 2026-10-20 10:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd1f6a3c8e5b2'
+down_revision: Union[str, Sequence[str], None] = 'b3f9d5a7c2e4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # 已有商品为空 (列表使用原图)，重新保存商品图片时记录
+    op.add_column('products', sa.Column('thumb_small_path', sa.String(length=255), nullable=True, comment='列表缩略图存储路径 (为空时使用原图)'))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('products', 'thumb_small_path')
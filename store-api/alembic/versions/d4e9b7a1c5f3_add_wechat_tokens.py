@@ -0,0 +1,34 @@
+"""add_wechat_tokens
+
+Revision ID: d4e9b7a1c5f3
+Revises: c3d8f1a6b2e7
+Create Date: 2026-10-18 21:30:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd4e9b7a1c5f3'
+down_revision: Union[str, Sequence[str], None] = 'c3d8f1a6b2e7'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('wechat_tokens',
+    sa.Column('name', sa.String(length=50), nullable=False, comment='凭证名称 (如 access_token:{appid})'),
+    sa.Column('token', sa.String(length=512), nullable=False, comment='凭证内容'),
+    sa.Column('expires_at', sa.DateTime(timezone=True), nullable=False, comment='过期时间'),
+    sa.Column('updated_at', sa.DateTime(timezone=True), nullable=True, comment='最后刷新时间'),
+    sa.PrimaryKeyConstraint('name')
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('wechat_tokens')
@@ -0,0 +1,29 @@
+"""add_order_no_worker_seq
+
+Revision ID: e5a1c9d3f7b2
+Revises: d4e9b7a1c5f3
+Create Date: 2026-10-18 22:30:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e5a1c9d3f7b2'
+down_revision: Union[str, Sequence[str], None] = 'd4e9b7a1c5f3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # 订单号生成器的进程编号 (每个进程启动时领取一个)
+    op.execute(sa.schema.CreateSequence(sa.Sequence('order_no_worker_seq')))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute(sa.schema.DropSequence(sa.Sequence('order_no_worker_seq')))
@@ -0,0 +1,51 @@
+"""add_active_pickup_code_unique_index
+
+Revision ID: f7b3d2e8a4c6
+Revises: e5a1c9d3f7b2
+Create Date: 2026-10-18 23:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f7b3d2e8a4c6'
+down_revision: Union[str, Sequence[str], None] = 'e5a1c9d3f7b2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+ACTIVE_PICKUP_CODE = "pickup_code IS NOT NULL AND status IN (0, 1, 2, 3)"
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # 旧版随机生成的自提码可能在未完结订单中重复: 保留最早的订单，其余重新生成，直到没有重复
+    op.execute(f"""
+        DO $$
+        BEGIN
+            LOOP
+                UPDATE orders o
+                SET pickup_code = (100000 + floor(random() * 900000))::int::text
+                FROM (
+                    SELECT id, row_number() OVER (PARTITION BY pickup_code ORDER BY id) AS rn
+                    FROM orders
+                    WHERE {ACTIVE_PICKUP_CODE}
+                ) d
+                WHERE o.id = d.id AND d.rn > 1;
+                EXIT WHEN NOT FOUND;
+            END LOOP;
+        END $$;
+    """)
+    op.create_index(
+        'uq_orders_active_pickup_code', 'orders', ['pickup_code'], unique=True,
+        postgresql_where=sa.text(ACTIVE_PICKUP_CODE),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('uq_orders_active_pickup_code', table_name='orders')
@@ -1,41 +1,144 @@
+import time
 from typing import AsyncGenerator, Annotated
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, HTTPException, Request, Response, status
 from fastapi.security import OAuth2PasswordBearer
-from jose import jwt, JWTError
+from jose import JWTError
 from pydantic import ValidationError
-from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
 from sqlalchemy import select
+from sqlalchemy.orm import make_transient_to_detached
 
-from app.core import security
+from app.core import security, metrics
+from app.core.cache import TTLCache
 from app.core.config import settings
-from app.core.database import SessionLocal
+from app.core.database import SessionLocal, ReadSessionLocal
 from app.models.user import User
-from app.schemas.token import TokenPayload
+from app.schemas.token import TokenUser
 
 reusable_oauth2 = OAuth2PasswordBearer(
     tokenUrl=f"{settings.API_V1_STR}/auth/login"
 )
 
-async def get_db() -> AsyncGenerator[AsyncSession, None]:
-    async with SessionLocal() as session:
-        yield session
+# 已认证用户缓存: user_id -> 用户字段快照
+user_cache = TTLCache(maxsize=settings.USER_CACHE_SIZE, ttl=settings.USER_CACHE_TTL)
+metrics.register("user_cache", user_cache.stats)
 
-async def get_current_user(
-    session: Annotated[AsyncSession, Depends(get_db)],
-    token: Annotated[str, Depends(reusable_oauth2)]
-) -> User:
+# 最近发生过写操作的客户端: 客户端标识 -> True
+# 在 REPLICA_STICKY_SECONDS 内它们的读请求仍走主库，保证能读到自己刚写入的数据。
+# 该缓存只在单个进程内有效，多 worker 部署时由客户端携带的写入时间标记 (见 LAST_WRITE_COOKIE) 跨 worker 生效
+recent_writers = TTLCache(maxsize=settings.USER_CACHE_SIZE, ttl=settings.REPLICA_STICKY_SECONDS)
+
+# 写请求在响应中下发最近写入时间 (Unix 时间戳，秒): 浏览器通过 Cookie 自动带回，
+# 不支持 Cookie 的客户端 (如小程序) 可把响应头 X-Last-Write 原样放入后续请求头
+LAST_WRITE_COOKIE = "last_write"
+LAST_WRITE_HEADER = "X-Last-Write"
+
+def _client_key(request: Request) -> str:
+    # 优先按 Token 区分用户，未登录时退化为客户端 IP
+    authorization = request.headers.get("Authorization")
+    if authorization:
+        return authorization
+    return request.client.host if request.client else ""
+
+def _recently_wrote(request: Request) -> bool:
+    if recent_writers.get(_client_key(request)):
+        return True
+    marker = request.headers.get(LAST_WRITE_HEADER) or request.cookies.get(LAST_WRITE_COOKIE)
     try:
-        payload = jwt.decode(
-            token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM]
+        return time.time() - float(marker) < settings.REPLICA_STICKY_SECONDS
+    except (TypeError, ValueError):
+        return False
+
+async def get_db(request: Request, response: Response) -> AsyncGenerator[AsyncSession, None]:
+    """
+    主库会话 (读写)
+
+    写请求在开始和结束时都会刷新本进程的粘滞窗口，窗口从请求完成时起算；
+    同时在响应中下发写入时间标记 (Cookie 和响应头)，客户端带回后任一 worker 都会把读请求路由到主库。
+    标记的时间取请求开始时，REPLICA_STICKY_SECONDS 应大于副本复制延迟与写请求耗时之和。
+    """
+    is_write = request.method not in ("GET", "HEAD", "OPTIONS")
+    if is_write:
+        recent_writers.set(_client_key(request), True)
+        marker = f"{time.time():.3f}"
+        response.set_cookie(
+            LAST_WRITE_COOKIE, marker, max_age=max(1, int(settings.REPLICA_STICKY_SECONDS)), httponly=True, samesite="lax"
         )
-        token_data = TokenPayload(**payload)
+        response.headers[LAST_WRITE_HEADER] = marker
+    try:
+        async with SessionLocal() as session:
+            yield session
+    finally:
+        if is_write:
+            recent_writers.set(_client_key(request), True)
+
+def get_read_session_factory(request: Request) -> async_sessionmaker:
+    """
+    只读会话工厂 (需要在一个请求中并发查询时使用，每个并发查询各自开一个会话)
+
+    路由规则与 get_read_db 相同。
+    """
+    if _recently_wrote(request):
+        return SessionLocal
+    return ReadSessionLocal
+
+async def get_read_db(
+    session_factory: Annotated[async_sessionmaker, Depends(get_read_session_factory)]
+) -> AsyncGenerator[AsyncSession, None]:
+    """
+    只读会话 (GET 接口使用)
+
+    默认连接只读副本；同一客户端刚执行过写操作 (本进程记录或请求携带的写入时间标记) 时改连主库 (read-your-writes)。
+    未配置副本时与 get_db 使用同一个数据库。
+    """
+    async with session_factory() as session:
+        yield session
+
+def _decode_token(token: str) -> TokenUser:
+    try:
+        token_data = security.decode_access_token(token)
+        return TokenUser(id=token_data.sub)
     except (JWTError, ValidationError):
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Could not validate credentials",
         )
-    result = await session.execute(select(User).where(User.id == int(token_data.sub)))
+
+async def get_current_user_claims(
+    token: Annotated[str, Depends(reusable_oauth2)]
+) -> TokenUser:
+    """
+    仅校验 Token，不查询数据库
+
+    只需要 current_user.id 的接口使用此依赖。
+    """
+    return _decode_token(token)
+
+async def get_current_user(
+    session: Annotated[AsyncSession, Depends(get_db)],
+    token: Annotated[str, Depends(reusable_oauth2)]
+) -> User:
+    claims = _decode_token(token)
+
+    data = user_cache.get(claims.id)
+    if data is not None:
+        # 由缓存快照还原为 detached 对象并挂到当前会话，不产生 SQL
+        user = User(**data)
+        make_transient_to_detached(user)
+        return await session.merge(user, load=False)
+
+    started = time.perf_counter()
+    result = await session.execute(select(User).where(User.id == claims.id))
     user = result.scalars().first()
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
+    user_cache.set(user.id, {
+        attr.key: getattr(user, attr.key)
+        for attr in User.__mapper__.column_attrs if not attr.deferred
+    })
+    user_cache.record_load(time.perf_counter() - started)
     return user
+
+def invalidate_user(user_id: int) -> None:
+    """用户信息变更后清除缓存"""
+    user_cache.pop(user_id)
@@ -4,16 +4,17 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, update
 
 from app.api import deps
-from app.models.user import User, UserAddress
+from app.models.user import UserAddress
 from app.schemas import address as address_schemas
 from app.schemas.response import ResponseModel, success
+from app.schemas.token import TokenUser
 
 router = APIRouter()
 
 @router.post("", response_model=ResponseModel[address_schemas.AddressOut])
 async def create_address(
     address_in: address_schemas.AddressCreate,
-    current_user: User = Depends(deps.get_current_user),
+    current_user: TokenUser = Depends(deps.get_current_user_claims),
     session: AsyncSession = Depends(deps.get_db),
 ) -> Any:
     """
@@ -43,8 +44,8 @@ async def create_address(
 
 @router.get("", response_model=ResponseModel[List[address_schemas.AddressOut]])
 async def read_addresses(
-    current_user: User = Depends(deps.get_current_user),
-    session: AsyncSession = Depends(deps.get_db),
+    current_user: TokenUser = Depends(deps.get_current_user_claims),
+    session: AsyncSession = Depends(deps.get_read_db),
 ) -> Any:
     """
     获取收货地址列表
@@ -63,7 +64,7 @@ async def read_addresses(
 async def update_address(
     address_id: int,
     address_in: address_schemas.AddressUpdate,
-    current_user: User = Depends(deps.get_current_user),
+    current_user: TokenUser = Depends(deps.get_current_user_claims),
     session: AsyncSession = Depends(deps.get_db),
 ) -> Any:
     """
@@ -105,7 +106,7 @@ async def update_address(
 @router.delete("/{address_id}", response_model=ResponseModel[None])
 async def delete_address(
     address_id: int,
-    current_user: User = Depends(deps.get_current_user),
+    current_user: TokenUser = Depends(deps.get_current_user_claims),
     session: AsyncSession = Depends(deps.get_db),
 ) -> Any:
     """
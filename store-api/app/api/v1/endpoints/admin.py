@@ -1,17 +1,28 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, func, desc, update, delete
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from sqlalchemy import select, func, desc, update, delete, text
 from sqlalchemy.orm import selectinload
-from typing import Any, List
-from datetime import datetime, time
+from typing import Any, List, Literal, Optional
+from datetime import date, datetime, time, timedelta
 
 from app.api import deps
+from app.core import metrics
+from app.core.config import settings
+from app.core.database import engine
 from app.models.order import Order, OrderTimeline, OrderItem
 from app.models.shop import ShopConfig
 from app.models.product import Product, Category
-from app.models.user import User
+from app.models.user import User, PHONE_NGRAM_SIZES
 from app.schemas import admin as admin_schemas, order as order_schemas, product as product_schemas, user as user_schemas
 from app.schemas.response import ResponseModel, success
+from app.services import images, order_events, order_state, sales_rollup
+from app.services.catalog import catalog
+from app.services.counting import CountMode, fetch_page
+from app.services.stock import StockError, stock_backend
+from app.services.storage import storage
+from app.utils.pagination import paginate_keyset, keyset_page
+from app.utils.search import keyword_search
 
 router = APIRouter()
 
@@ -20,46 +31,62 @@ async def list_all_orders(
     status: int = 0,
     page: int = 1,
     size: int = 10,
-    db: AsyncSession = Depends(deps.get_db),
+    cursor: str = None,
+    count_mode: CountMode = None,
+    db: AsyncSession = Depends(deps.get_read_db),
+    session_factory: async_sessionmaker = Depends(deps.get_read_session_factory),
 ) -> Any:
     """
     管理员获取订单列表
+    
+    传入 cursor 时使用游标分页 (空字符串表示第一页，不返回 total)；
+    count_mode 指定总数统计方式 (exact / estimate / none)
     """
-    query = select(Order).order_by(Order.created_at.desc())
+    query = select(Order)
     
     if status != 0:
         query = query.where(Order.status == status)
-        
-    # Count
-    count_query = select(func.count()).select_from(query.subquery())
-    total_result = await db.execute(count_query)
-    total = total_result.scalar_one()
     
-    # Paginate
-    query = query.offset((page - 1) * size).limit(size)
-    query = query.options(selectinload(Order.items), selectinload(Order.user))
-    
-    result = await db.execute(query)
-    orders = result.scalars().all()
+    if cursor is not None:
+        keyset = (Order.created_at, Order.id)
+        try:
+            query = paginate_keyset(query, keyset, cursor, size)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        query = query.options(selectinload(Order.items), selectinload(Order.user))
+        result = await db.execute(query)
+        orders, next_cursor = keyset_page(result.scalars().all(), keyset, size)
+        total, has_more = None, next_cursor is not None
+    else:
+        query = query.order_by(Order.created_at.desc(), Order.id.desc())
+        query = query.options(selectinload(Order.items), selectinload(Order.user))
+        result = await fetch_page(
+            db, query, page, size,
+            mode=count_mode or CountMode(settings.LIST_COUNT_MODE),
+            session_factory=session_factory,
+        )
+        orders, total, has_more = result.items, result.total, result.has_more
+        next_cursor = None
     
     # Process status text
-    from app.api.v1.endpoints.order import get_status_text
     order_list = []
     for o in orders:
-        o.status_text = get_status_text(o.status, o.delivery_type)
+        o.status_text = order_state.status_text(o.status, o.delivery_type)
         order_list.append(o)
         
     return success(data={
         "list": order_list,
         "total": total,
         "page": page,
-        "size": size
+        "size": size,
+        "has_more": has_more,
+        "next_cursor": next_cursor
     })
 
 @router.get("/order/detail", response_model=ResponseModel[order_schemas.OrderDetailOut])
 async def get_admin_order_detail(
     order_id: int,
-    db: AsyncSession = Depends(deps.get_db),
+    db: AsyncSession = Depends(deps.get_read_db),
 ) -> Any:
     """
     管理员获取订单详情
@@ -74,8 +101,7 @@ async def get_admin_order_detail(
     if not order:
         raise HTTPException(status_code=404, detail="Order not found")
     
-    from app.api.v1.endpoints.order import get_status_text
-    order.status_text = get_status_text(order.status, order.delivery_type)
+    order.status_text = order_state.status_text(order.status, order.delivery_type)
     
     return success(data=order)
 
@@ -89,41 +115,35 @@ async def audit_order(
     商家接单/拒单 (配送单)
     针对状态为 1 (待接单) 的配送订单。
     """
-    # 查询订单
-    result = await db.execute(select(Order).where(Order.id == request.order_id))
-    order = result.scalar_one_or_none()
-    
-    if not order:
-        raise HTTPException(status_code=404, detail="订单不存在")
-    
-    if order.status != 1:
-        raise HTTPException(status_code=400, detail="当前订单状态不可操作")
-    
     if request.action == "accept":
-        order.status = 3  # 配送中
+        event, values = "accept", {}
         timeline_remark = "商家已接单，准备配送"
         timeline_status = "商家已接单"
     elif request.action == "reject":
         if not request.reject_reason:
             raise HTTPException(status_code=400, detail="拒单原因必填")
-        order.status = -1  # 已关闭/退款
-        order.reject_reason = request.reject_reason
+        event, values = "reject", {"reject_reason": request.reject_reason}
         timeline_remark = f"原因: {request.reject_reason}"
         timeline_status = "商家拒单"
     else:
         raise HTTPException(status_code=400, detail="无效的操作类型")
-    
-    # 添加时间轴
-    timeline = OrderTimeline(
-        order_id=order.id,
-        status=timeline_status,
-        remark=timeline_remark
-    )
-    db.add(timeline)
-    
+
+    try:
+        await order_state.transition(
+            db, event, Order.id == request.order_id, values=values,
+            timeline_status=timeline_status, timeline_remark=timeline_remark,
+        )
+    except order_state.TransitionError as e:
+        raise HTTPException(status_code=404 if e.status is None else 400, detail=str(e))
+
+    counts = {}
+    if event == "reject":
+        # 拒单回补库存
+        counts = await stock_backend.release_items(db, OrderItem.order_id == request.order_id)
+
     await db.commit()
-    await db.refresh(order)
-    
+    catalog.mark_products(counts)
+
     return success(msg="操作成功")
 
 @router.post("/order/complete_delivery", response_model=ResponseModel)
@@ -135,27 +155,16 @@ async def complete_delivery(
     确认送达 (配送单)
     商家送完货后点击。
     """
-    result = await db.execute(select(Order).where(Order.id == request.order_id))
-    order = result.scalar_one_or_none()
-    
-    if not order:
-        raise HTTPException(status_code=404, detail="订单不存在")
-    
-    if order.status != 3:
-        raise HTTPException(status_code=400, detail="订单不是配送中状态")
-    
-    order.status = 4  # 已完成
-    order.verified_at = func.now()
-    
-    timeline = OrderTimeline(
-        order_id=order.id,
-        status="订单已送达",
-        remark="商家确认送达"
-    )
-    db.add(timeline)
-    
+    try:
+        await order_state.transition(
+            db, "complete_delivery", Order.id == request.order_id, values={"verified_at": func.now()},
+            timeline_status="订单已送达", timeline_remark="商家确认送达",
+        )
+    except order_state.TransitionError as e:
+        raise HTTPException(status_code=404 if e.status is None else 400, detail=str(e))
+
     await db.commit()
-    
+
     return success(msg="操作成功")
 
 @router.post("/order/verify", response_model=ResponseModel)
@@ -167,42 +176,27 @@ async def verify_pickup(
     扫码核销 (自提单)
     商家扫描用户二维码或输入6位数字码。
     """
-    # 查找订单
-    result = await db.execute(select(Order).where(Order.pickup_code == request.code))
-    order = result.scalar_one_or_none()
-    
-    if not order:
-        raise HTTPException(status_code=404, detail="无效的核销码")
-    
-    if order.status != 2:
+    try:
+        order = await order_state.transition(
+            db, "verify", Order.pickup_code == request.code, values={"verified_at": func.now()},
+            timeline_status="自提核销完成", timeline_remark="商家扫码核销",
+            returning=(Order.order_no, Order.final_amount),
+        )
+    except order_state.TransitionError as e:
+        if e.status is None:
+            raise HTTPException(status_code=404, detail="无效的核销码")
         # 可能是已经核销过的，或者还没支付的
-        if order.status == 4:
+        if e.status == order_state.COMPLETED:
             raise HTTPException(status_code=400, detail="该订单已核销")
-        raise HTTPException(status_code=400, detail="订单状态不满足核销条件")
-        
-    order.status = 4  # 已完成
-    order.verified_at = func.now()
-    
-    # 保存ID供后续查询使用，防止commit后对象过期访问触发IO
-    target_order_id = order.id
-    
-    timeline = OrderTimeline(
-        order_id=order.id,
-        status="自提核销完成",
-        remark="商家扫码核销"
-    )
-    db.add(timeline)
-    
+        raise HTTPException(status_code=400, detail=str(e))
+
     await db.commit()
-    
+    target_order_id = order.id
+
     # 构建返回信息
     # 直接查询 OrderItem 表，避免 Relationship Lazy Load 问题
     from app.models.order import OrderItem
-    
-    # 重新查询订单信息 (commit后对象过期)
-    result = await db.execute(select(Order).where(Order.id == target_order_id))
-    order_loaded = result.scalar_one()
-    
+
     # 查询订单项
     result = await db.execute(select(OrderItem).where(OrderItem.order_id == target_order_id))
     items = result.scalars().all()
@@ -216,8 +210,8 @@ async def verify_pickup(
         })
         
     order_info = {
-        "order_no": order_loaded.order_no,
-        "total_amount": str(order_loaded.final_amount),
+        "order_no": order.order_no,
+        "total_amount": str(order.final_amount),
         "items": items_data
     }
 
@@ -228,6 +222,67 @@ async def verify_pickup(
         }
     )
 
+@router.post("/order/batch/audit", response_model=ResponseModel[admin_schemas.BatchOrderResultOut])
+async def batch_audit_orders(
+    request: admin_schemas.BatchOrderAuditRequest,
+    db: AsyncSession = Depends(deps.get_db),
+) -> Any:
+    """
+    批量接单/拒单 (配送单)
+    只处理状态为 1 (待接单) 的订单，逐个返回处理结果。
+    """
+    if request.action == "accept":
+        data = await order_state.transition_many(
+            db, "accept", request.order_ids,
+            timeline_status="商家已接单", timeline_remark="商家已接单，准备配送",
+        )
+        await db.commit()
+    else:
+        if not request.reject_reason:
+            raise HTTPException(status_code=400, detail="拒单原因必填")
+        data = await order_state.transition_many(
+            db, "reject", request.order_ids, values={"reject_reason": request.reject_reason},
+            timeline_status="商家拒单", timeline_remark=f"原因: {request.reject_reason}",
+        )
+        counts = {}
+        if data["updated"]:
+            counts = await stock_backend.release_items(db, OrderItem.order_id.in_(data["updated"]))
+        await db.commit()
+        catalog.mark_products(counts)
+    return success(data=data)
+
+@router.post("/order/batch/complete_delivery", response_model=ResponseModel[admin_schemas.BatchOrderResultOut])
+async def batch_complete_delivery(
+    request: admin_schemas.BatchOrderRequest,
+    db: AsyncSession = Depends(deps.get_db),
+) -> Any:
+    """
+    批量确认送达 (配送单)
+    只处理状态为 3 (配送中) 的订单。
+    """
+    data = await order_state.transition_many(
+        db, "complete_delivery", request.order_ids, values={"verified_at": func.now()},
+        timeline_status="订单已送达", timeline_remark="商家确认送达",
+    )
+    await db.commit()
+    return success(data=data)
+
+@router.post("/order/batch/verify", response_model=ResponseModel[admin_schemas.BatchOrderResultOut])
+async def batch_verify_pickup(
+    request: admin_schemas.BatchOrderRequest,
+    db: AsyncSession = Depends(deps.get_db),
+) -> Any:
+    """
+    批量核销 (自提单)
+    只处理状态为 2 (待自提) 的自提订单。
+    """
+    data = await order_state.transition_many(
+        db, "verify", request.order_ids, values={"verified_at": func.now()},
+        timeline_status="自提核销完成", timeline_remark="商家批量核销",
+    )
+    await db.commit()
+    return success(data=data)
+
 @router.post("/order/update_items", response_model=ResponseModel)
 async def update_order_items(
     request: admin_schemas.OrderUpdateItemsRequest,
@@ -237,24 +292,35 @@ async def update_order_items(
     管理员修改订单商品
     """
     # 1. Get Order with Items
-    query = select(Order).where(Order.id == request.order_id).options(selectinload(Order.items))
+    # 锁定订单行: 并发的取消/拒单要等本次修改提交后再按修改后的明细回补库存，不会重复回补
+    query = select(Order).where(Order.id == request.order_id).options(selectinload(Order.items)).with_for_update()
     result = await db.execute(query)
     order = result.scalar_one_or_none()
     
     if not order:
         raise HTTPException(status_code=404, detail="Order not found")
+    # 已取消订单的库存已经回补，再修改商品会重复回补或预占不再归还的库存
+    # 已完成订单的库存仍处于扣减状态，修改商品按实际交付的数量同步库存和经营汇总
+    if order.status == order_state.CANCELLED:
+        await db.rollback()
+        raise HTTPException(status_code=400, detail="已取消的订单不可修改商品")
         
     # 2. Process updates
     # Map item_id to OrderItem object for easy access
     order_items_map = {item.id: item for item in order.items}
     
     updated_items_info = []
+    # 销量变化 {product_id: 数量}: 正数需要预占库存，负数 (移除或减少数量) 回补库存
+    sold = {}
+    # 已完成订单的商品销量变化，用于调整商品销售汇总
+    rollup_items = {}
     
     for item_update in request.items:
         if item_update.item_id not in order_items_map:
             continue
             
         item = order_items_map[item_update.item_id]
+        before = 0 if item.is_removed else item.quantity
         
         # Apply changes
         if item_update.is_removed is not None:
@@ -262,8 +328,30 @@ async def update_order_items(
         
         if item_update.quantity is not None:
             item.quantity = item_update.quantity
+
+        if item.product_id is not None:
+            after = 0 if item.is_removed else item.quantity
+            sold[item.product_id] = sold.get(item.product_id, 0) + after - before
+            if order.status == order_state.COMPLETED:
+                delta = rollup_items.setdefault(item.product_id, {
+                    "product_id": item.product_id, "product_name": item.product_name,
+                    "quantity": 0, "sales_amount": 0, "order_count": 0,
+                })
+                delta["quantity"] += after - before
+                delta["sales_amount"] += item.price * (after - before)
+                delta["order_count"] += (after > 0) - (before > 0)
             
         updated_items_info.append(f"{item.product_name} (x{item.quantity}{' Removed' if item.is_removed else ''})")
+
+    reserve = {pid: n for pid, n in sold.items() if n > 0}
+    release = {pid: -n for pid, n in sold.items() if n < 0}
+    if reserve:
+        try:
+            await stock_backend.reserve(db, reserve)
+        except StockError as e:
+            await db.rollback()
+            raise HTTPException(status_code=400, detail=str(e))
+    await stock_backend.release(db, release)
             
     # 3. Recalculate Totals
     new_total_amount = 0
@@ -271,8 +359,14 @@ async def update_order_items(
         if not item.is_removed:
             new_total_amount += item.price * item.quantity
             
+    previous_amount = order.final_amount
     order.total_amount = new_total_amount
     order.final_amount = order.total_amount + order.delivery_fee
+    if order.status == order_state.COMPLETED:
+        # 已计入销售额的订单，按变化调整经营汇总
+        await sales_rollup.record_completed_change(
+            db, order.id, order.created_at, order.final_amount - previous_amount, list(rollup_items.values())
+        )
     
     # 4. Add Timeline
     timeline = OrderTimeline(
@@ -282,7 +376,13 @@ async def update_order_items(
     )
     db.add(timeline)
     
-    await db.commit()
+    try:
+        await db.commit()
+    except Exception:
+        # 事务未提交，撤销库存层中的预占
+        await stock_backend.discard(reserve)
+        raise
+    catalog.mark_products(sold)
     
     return success(msg="订单商品已更新")
 
@@ -290,41 +390,134 @@ async def update_order_items(
 from sqlalchemy.orm import selectinload
 from app.models.product import Product
 
+@router.get("/order/events")
+async def stream_order_events() -> StreamingResponse:
+    """
+    订单事件推送 (Server-Sent Events)
+
+    商家端用 EventSource 建立一个长连接，代替轮询订单列表和数据看板:
+    - order_created: 新订单 (order_id, order_no, status, delivery_type, final_amount)
+    - order_status_changed: 订单状态变更 (order_id, event, status)
+    - resync: 服务端监听曾中断，可能漏掉了事件，客户端应重新拉取列表
+    连接因客户端消费过慢被断开时，EventSource 会自动重连。
+    """
+    return StreamingResponse(
+        order_events.broker.stream(),
+        media_type="text/event-stream",
+        # 禁止代理缓存和缓冲，事件立即送达
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
 @router.get("/dashboard", response_model=ResponseModel)
 async def get_dashboard_stats(
-    db: AsyncSession = Depends(deps.get_db),
+    db: AsyncSession = Depends(deps.get_read_db),
 ) -> Any:
     """
     数据看板
+
+    今日下单数和销售额读取经营汇总表 (daily_sales_rollup)，待处理订单数走状态索引，
+    合并为一条语句，耗时不随历史订单增长。
     """
-    today = datetime.now().date()
-    
-    # Today Orders
-    result = await db.execute(
-        select(func.count(Order.id))
-        .where(func.date(Order.created_at) == today)
+    totals = sales_rollup.totals(sales_rollup.local_today())
+    pending = (
+        select(func.count())
+        .select_from(Order)
+        .where(Order.status.in_([order_state.PENDING_ACCEPT, order_state.PENDING_PICKUP]))
+        .scalar_subquery()
     )
-    today_orders = result.scalar_one()
+    row = (await db.execute(select(totals.c.order_count, totals.c.sales_amount, pending))).one()
     
-    # Today Sales (Completed orders)
-    result = await db.execute(
-        select(func.sum(Order.final_amount))
-        .where(func.date(Order.created_at) == today)
-        .where(Order.status == 4)
-    )
-    today_sales = result.scalar_one() or 0
+    return success(data={
+        "today_orders": row[0],
+        "today_sales": str(row[1]),
+        "pending_orders": row[2]
+    })
+
+def _stats_range(start_date: Optional[date], end_date: Optional[date], default_days: int) -> tuple:
+    # 接口的结束日期包含在内，换算为 [start, end)
+    end = (end_date or sales_rollup.local_today()) + timedelta(days=1)
+    start = start_date or end - timedelta(days=default_days)
+    return start, end
+
+@router.get("/stats/sales", response_model=ResponseModel[List[admin_schemas.SalesStatsPoint]])
+async def get_sales_stats(
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    granularity: Literal["day", "hour"] = "day",
+    db: AsyncSession = Depends(deps.get_read_db),
+) -> Any:
+    """
+    销售趋势
+
+    按天或按小时返回下单数、已完成订单数和销售额 (日期为门店时区，包含结束日期)。
+    默认最近 7 天；按天最多查询 366 天，按小时最多 31 天。
+    数据来自经营汇总表，不扫描订单表。
+    """
+    start, end = _stats_range(start_date, end_date, 7)
+    try:
+        series = await sales_rollup.sales_series(db, start, end, granularity)
+    except sales_rollup.StatsRangeError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return success(data=series)
+
+@router.get("/stats/products", response_model=ResponseModel[List[admin_schemas.ProductStatsItem]])
+async def get_product_stats(
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    limit: int = Query(10, ge=1, le=100),
+    order_by: Literal["sales_amount", "quantity"] = "sales_amount",
+    db: AsyncSession = Depends(deps.get_read_db),
+) -> Any:
+    """
+    商品销量排行
+
+    返回区间内已完成订单中销售额 (或销量) 最高的商品 (日期为门店时区，包含结束日期)。
+    默认最近 30 天，最多查询 366 天。数据来自商品销售汇总表，不扫描订单和明细。
+    """
+    start, end = _stats_range(start_date, end_date, 30)
+    try:
+        products = await sales_rollup.top_products(db, start, end, limit, order_by)
+    except sales_rollup.StatsRangeError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return success(data=products)
+
+@router.get("/metrics", response_model=ResponseModel)
+async def get_metrics() -> Any:
+    """
+    运行指标 (缓存命中率等)
+    """
+    return success(data=metrics.snapshot())
+
+@router.get("/db/pool", response_model=ResponseModel)
+async def get_db_pool_stats(
+    db: AsyncSession = Depends(deps.get_db),
+) -> Any:
+    """
+    数据库连接池状态
+    
+    返回当前 worker 的连接池使用情况 (已取出/溢出/等待时间)，
+    以及 PostgreSQL 的 max_connections，用于估算可部署的 worker 数量。
+    """
+    pool = engine.pool.stats()
     
-    # Pending Orders
+    max_connections = int((await db.execute(text("SHOW max_connections"))).scalar_one())
+    reserved = int((await db.execute(text("SHOW superuser_reserved_connections"))).scalar_one())
     result = await db.execute(
-        select(func.count(Order.id))
-        .where(Order.status.in_([1, 2])) # Pending Delivery/Pickup
+        text("SELECT count(*) FROM pg_stat_activity WHERE datname = current_database()")
     )
-    pending_orders = result.scalar_one()
+    server_connections = result.scalar_one()
     
+    # 每个 worker 的连接上限 = pool_size + max_overflow
+    per_worker = pool["pool_size"] + pool["max_overflow"]
     return success(data={
-        "today_orders": today_orders,
-        "today_sales": str(today_sales),
-        "pending_orders": pending_orders
+        "pool": pool,
+        "server": {
+            "max_connections": max_connections,
+            "superuser_reserved_connections": reserved,
+            "current_connections": server_connections,
+        },
+        "per_worker_max_connections": per_worker,
+        "max_workers": (max_connections - reserved) // per_worker if per_worker else None,
     })
 
 @router.post("/product/stock", response_model=ResponseModel)
@@ -340,13 +533,14 @@ async def adjust_stock(
     if not product:
          raise HTTPException(status_code=404, detail="Product not found")
          
+    await stock_backend.invalidate(db, [product_id])
     product.stock = stock
     await db.commit()
     return success(msg="库存已更新")
 
 @router.get("/shop/config", response_model=ResponseModel[admin_schemas.ShopConfigOut])
 async def get_shop_config(
-    db: AsyncSession = Depends(deps.get_db),
+    db: AsyncSession = Depends(deps.get_read_db),
 ) -> Any:
     """
     获取店铺配置
@@ -429,7 +623,7 @@ async def update_shop_config(
 
 @router.get("/category/list", response_model=ResponseModel[List[product_schemas.CategoryOut]])
 async def list_categories(
-    db: AsyncSession = Depends(deps.get_db),
+    db: AsyncSession = Depends(deps.get_read_db),
 ) -> Any:
     """分类列表"""
     result = await db.execute(select(Category).order_by(Category.sort_order.desc()))
@@ -493,32 +687,52 @@ async def list_products(
     name: str = None,
     category_id: int = None,
     status: int = None,
-    db: AsyncSession = Depends(deps.get_db),
+    cursor: str = None,
+    count_mode: CountMode = None,
+    db: AsyncSession = Depends(deps.get_read_db),
+    session_factory: async_sessionmaker = Depends(deps.get_read_session_factory),
 ) -> Any:
-    """商品列表 (Admin)"""
-    query = select(Product).order_by(Product.created_at.desc())
+    """商品列表 (Admin)，传入 cursor 时使用游标分页，count_mode 指定总数统计方式"""
+    query = select(Product)
     
     if name:
-        query = query.where(Product.name.ilike(f"%{name}%"))
+        query = query.where(*keyword_search(Product.search_vector, Product.name, name)[0])
     if category_id:
         query = query.where(Product.category_id == category_id)
     if status is not None:
         query = query.where(Product.status == status)
-        
-    # Count
-    count_query = select(func.count()).select_from(query.subquery())
-    total = (await db.execute(count_query)).scalar_one()
     
-    # Paginate
-    query = query.offset((page - 1) * size).limit(size)
-    result = await db.execute(query)
-    products = result.scalars().all()
+    if cursor is not None:
+        keyset = (Product.created_at, Product.id)
+        try:
+            query = paginate_keyset(query, keyset, cursor, size)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        result = await db.execute(query)
+        products, next_cursor = keyset_page(result.scalars().all(), keyset, size)
+        return success(data={
+            "list": products,
+            "total": None,
+            "page": page,
+            "size": size,
+            "has_more": next_cursor is not None,
+            "next_cursor": next_cursor
+        })
+        
+    # Paginate (精确总数与分页查询并发执行)
+    query = query.order_by(Product.created_at.desc(), Product.id.desc())
+    result = await fetch_page(
+        db, query, page, size,
+        mode=count_mode or CountMode(settings.LIST_COUNT_MODE),
+        session_factory=session_factory,
+    )
     
     return success(data={
-        "list": products,
-        "total": total,
+        "list": result.items,
+        "total": result.total,
         "page": page,
-        "size": size
+        "size": size,
+        "has_more": result.has_more
     })
 
 @router.post("/product/save", response_model=ResponseModel)
@@ -535,8 +749,12 @@ async def save_product(
             raise HTTPException(status_code=404, detail="Product not found")
         
         update_data = request.model_dump(exclude_unset=True)
+        if "stock" in update_data:
+            await stock_backend.invalidate(db, [id])
         for field, value in update_data.items():
             setattr(product, field, value)
+        if "thumb_url" in update_data:
+            product.thumb_small_path = await images.existing_thumbnail(storage, product.thumb_url)
         msg = "商品更新成功"
     else:
         # Create
@@ -546,6 +764,7 @@ async def save_product(
              raise HTTPException(status_code=400, detail="Missing required fields")
              
         product = Product(**request.model_dump())
+        product.thumb_small_path = await images.existing_thumbnail(storage, product.thumb_url)
         db.add(product)
         msg = "商品创建成功"
         
@@ -588,26 +807,46 @@ async def list_users(
     page: int = 1,
     size: int = 10,
     phone: str = None,
-    db: AsyncSession = Depends(deps.get_db),
+    cursor: str = None,
+    count_mode: CountMode = None,
+    db: AsyncSession = Depends(deps.get_read_db),
+    session_factory: async_sessionmaker = Depends(deps.get_read_session_factory),
 ) -> Any:
-    """用户列表"""
-    query = select(User).order_by(User.created_at.desc())
+    """用户列表，传入 cursor 时使用游标分页，count_mode 指定总数统计方式"""
+    query = select(User)
     
     if phone:
-        query = query.where(User.phone.ilike(f"%{phone}%"))
+        query = query.where(*keyword_search(User.phone_search_vector, User.phone, phone, PHONE_NGRAM_SIZES)[0])
+    
+    if cursor is not None:
+        keyset = (User.created_at, User.id)
+        try:
+            query = paginate_keyset(query, keyset, cursor, size)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        result = await db.execute(query)
+        users, next_cursor = keyset_page(result.scalars().all(), keyset, size)
+        return success(data={
+            "list": users,
+            "total": None,
+            "page": page,
+            "size": size,
+            "has_more": next_cursor is not None,
+            "next_cursor": next_cursor
+        })
         
-    # Count
-    count_query = select(func.count()).select_from(query.subquery())
-    total = (await db.execute(count_query)).scalar_one()
-    
-    # Paginate
-    query = query.offset((page - 1) * size).limit(size)
-    result = await db.execute(query)
-    users = result.scalars().all()
+    # Paginate (精确总数与分页查询并发执行)
+    query = query.order_by(User.created_at.desc(), User.id.desc())
+    result = await fetch_page(
+        db, query, page, size,
+        mode=count_mode or CountMode(settings.LIST_COUNT_MODE),
+        session_factory=session_factory,
+    )
     
     return success(data={
-        "list": users,
-        "total": total,
+        "list": result.items,
+        "total": result.total,
         "page": page,
-        "size": size
+        "size": size,
+        "has_more": result.has_more
     })
@@ -134,6 +134,7 @@ async def update_user_profile(
     session.add(current_user)
     await session.commit()
     await session.refresh(current_user)
+    deps.invalidate_user(current_user.id)
     
     return success(data={
         "nickname": current_user.nickname,
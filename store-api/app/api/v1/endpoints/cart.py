@@ -8,9 +8,9 @@ from sqlalchemy.orm import selectinload
 from app.api import deps
 from app.models.cart import CartItem
 from app.models.product import Product
-from app.models.user import User
 from app.schemas import cart as cart_schemas
 from app.schemas.response import ResponseModel, success
+from app.schemas.token import TokenUser
 
 router = APIRouter()
 
@@ -18,7 +18,7 @@ router = APIRouter()
 async def add_to_cart(
     cart_in: cart_schemas.CartAdd,
     session: AsyncSession = Depends(deps.get_db),
-    current_user: User = Depends(deps.get_current_user),
+    current_user: TokenUser = Depends(deps.get_current_user_claims),
 ) -> Any:
     """
     添加商品到购物车
@@ -74,8 +74,8 @@ async def add_to_cart(
 
 @router.get("/list", response_model=ResponseModel[cart_schemas.CartListOut])
 async def list_cart(
-    session: AsyncSession = Depends(deps.get_db),
-    current_user: User = Depends(deps.get_current_user),
+    session: AsyncSession = Depends(deps.get_read_db),
+    current_user: TokenUser = Depends(deps.get_current_user_claims),
 ) -> Any:
     """
     获取购物车列表
@@ -123,7 +123,7 @@ async def list_cart(
 async def update_cart(
     update_in: cart_schemas.CartUpdate,
     session: AsyncSession = Depends(deps.get_db),
-    current_user: User = Depends(deps.get_current_user),
+    current_user: TokenUser = Depends(deps.get_current_user_claims),
 ) -> Any:
     """
     更新购物车项 (数量/选中状态)
@@ -152,7 +152,7 @@ async def update_cart(
 async def delete_cart(
     delete_in: cart_schemas.CartDelete,
     session: AsyncSession = Depends(deps.get_db),
-    current_user: User = Depends(deps.get_current_user),
+    current_user: TokenUser = Depends(deps.get_current_user_claims),
 ) -> Any:
     """
     删除购物车项
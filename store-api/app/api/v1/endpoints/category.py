@@ -1,5 +1,5 @@
 from typing import List, Any
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, status
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 
@@ -7,6 +7,7 @@ from app.api import deps
 from app.models.product import Category, Product
 from app.schemas import product as product_schemas
 from app.schemas.response import ResponseModel, success
+from app.services.catalog import catalog, snapshot_response
 
 router = APIRouter()
 
@@ -27,14 +28,21 @@ async def create_category(
 
 @router.get("/list", response_model=ResponseModel[List[product_schemas.CategoryOut]])
 async def read_categories(
-    session: AsyncSession = Depends(deps.get_db),
+    request: Request,
+    session: AsyncSession = Depends(deps.get_read_db),
+    catalog_session: AsyncSession = Depends(deps.get_db),
 ) -> Any:
     """
     获取分类列表 (左侧导航)
     
     - 仅返回可见 (is_visible=True) 的分类
     - 按 sort_order 倒序排列
+    - 启用目录快照时由快照返回，支持 ETag / If-None-Match
     """
+    if catalog.enabled:
+        await catalog.ensure_fresh(catalog_session)
+        return snapshot_response(request, catalog.categories)
+    
     result = await session.execute(
         select(Category)
         .where(Category.is_visible == True)
@@ -46,7 +54,7 @@ async def read_categories(
 @router.get("/{category_id}", response_model=ResponseModel[product_schemas.CategoryOut])
 async def read_category(
     category_id: int,
-    session: AsyncSession = Depends(deps.get_db),
+    session: AsyncSession = Depends(deps.get_read_db),
 ) -> Any:
     """
     获取分类详情
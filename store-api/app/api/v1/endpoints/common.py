@@ -2,6 +2,7 @@ from typing import Any
 from fastapi import APIRouter, UploadFile, File, HTTPException
 from app.schemas.response import ResponseModel, success
 from app.schemas.file import FileOut
+from app.services import images
 from app.services.storage import storage
 
 router = APIRouter()
@@ -15,12 +16,18 @@ async def upload_file(
     
     - 支持图片、视频等文件
     - 返回文件存储路径 (Relative Path) 和 访问链接 (URL)
-    - 目前使用阿里云 OSS
+    - 存储后端由 UPLOAD_STORAGE_TYPE 决定 (aliyun: 阿里云 OSS, local: 本地文件系统)
+    - 图片 (JPEG/PNG/WebP) 同时生成多个尺寸的缩略图，保存在原图旁边，链接见 variants
     """
     try:
         path = await storage.upload(file)
         url = storage.get_file_url(path)
-        return success(data={"path": path, "url": url})
+        variants = await images.create_variants(storage, file, path)
+        return success(data={
+            "path": path,
+            "url": url,
+            "variants": {str(size): storage.get_file_url(p) for size, p in variants.items()},
+        })
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Upload failed: {str(e)}")
 
@@ -1,103 +1,57 @@
 from typing import List, Any
 from datetime import datetime
-import random
-import time
 from decimal import Decimal
 
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import insert, select
 from sqlalchemy.orm import selectinload
 
 from app.api import deps
-from app.models.user import User, UserAddress
+from app.models.user import UserAddress
 from app.models.product import Product
 from app.models.order import Order, OrderItem, OrderTimeline
 from app.schemas import order as order_schemas
 from app.schemas.response import ResponseModel, success
+from app.schemas.token import TokenUser
+from app.services import order_events, order_state, pickup_code, sales_rollup, stock
+from app.services.catalog import catalog
+from app.services.order_no import next_order_no
+from app.utils.order_no import ClockSkewError
 
 router = APIRouter()
 
-# Helper to generate order no
-def generate_order_no():
-    return f"{time.strftime('%Y%m%d%H%M%S')}{random.randint(1000, 9999)}"
-
-# Helper to get status text
-def get_status_text(status: int, delivery_type: str) -> str:
-    status_map = {
-        0: "待支付",
-        1: "待接单",
-        2: "待自提" if delivery_type == "pickup" else "待发货",
-        3: "配送中",
-        4: "已完成",
-        -1: "已取消"
-    }
-    return status_map.get(status, "未知状态")
-
 @router.post("/cancel", response_model=ResponseModel)
 async def cancel_order(
     cancel_in: order_schemas.OrderCancelRequest,
     session: AsyncSession = Depends(deps.get_db),
-    current_user: User = Depends(deps.get_current_user),
+    current_user: TokenUser = Depends(deps.get_current_user_claims),
 ) -> Any:
     """
     用户主动取消订单
     仅限: 待支付(0), 待接单(1), 待自提(2) 状态
     """
-    query = select(Order).where(Order.id == cancel_in.order_id, Order.user_id == current_user.id)
-    result = await session.execute(query)
-    order = result.scalars().first()
-    
-    if not order:
-        raise HTTPException(status_code=404, detail="订单不存在")
-        
-    # Check status
-    # Allow cancel if status is 0, 1, or 2 (before merchant accepts for delivery, or before pickup verified?)
-    # Logic: 
-    # - 0: Pending Payment -> OK
-    # - 1: Pending Delivery (Merchant hasn't accepted yet) -> OK
-    # - 2: Pending Pickup (Merchant hasn't verified yet) -> OK? Usually yes.
-    if order.status not in [0, 1, 2]:
-         raise HTTPException(status_code=400, detail="当前订单状态不可取消")
-         
-    order.status = -1
-    order.reject_reason = f"用户主动取消: {cancel_in.reason or ''}"
-    
-    # Restore Stock? 
-    # In a real system, we should restore stock.
-    # For simplicity, we skip it or implement simple logic.
-    # Let's restore stock.
-    # We need to load items.
-    # But wait, we didn't eager load items.
-    
-    # Re-fetch with items
-    query_items = select(OrderItem).where(OrderItem.order_id == order.id)
-    result_items = await session.execute(query_items)
-    items = result_items.scalars().all()
-    
-    for item in items:
-        # Find product
-        prod = await session.get(Product, item.product_id)
-        if prod:
-            prod.stock += item.quantity
-            prod.sales_count -= item.quantity
-    
-    # Add timeline
-    timeline = OrderTimeline(
-        order_id=order.id,
-        status="已取消",
-        remark="用户主动取消"
-    )
-    session.add(timeline)
-    
+    try:
+        order = await order_state.transition(
+            session, "cancel", Order.id == cancel_in.order_id, Order.user_id == current_user.id,
+            values={"reject_reason": f"用户主动取消: {cancel_in.reason or ''}"},
+            timeline_status="已取消", timeline_remark="用户主动取消",
+        )
+    except order_state.TransitionError as e:
+        raise HTTPException(status_code=404 if e.status is None else 400, detail=str(e))
+
+    # Restore Stock
+    counts = await stock.stock_backend.release_items(session, OrderItem.order_id == order.id)
+
     await session.commit()
+    catalog.mark_products(counts)
     
     return success(msg="订单已取消")
 @router.post("/preview", response_model=ResponseModel[order_schemas.OrderPreviewResponse])
 async def preview_order(
     preview_in: order_schemas.OrderPreviewRequest,
     session: AsyncSession = Depends(deps.get_db),
-    current_user: User = Depends(deps.get_current_user),
+    current_user: TokenUser = Depends(deps.get_current_user_claims),
 ) -> Any:
     """
     订单预检 (结算页)
@@ -137,42 +91,12 @@ async def preview_order(
 async def create_order(
     order_in: order_schemas.OrderCreateRequest,
     session: AsyncSession = Depends(deps.get_db),
-    current_user: User = Depends(deps.get_current_user),
+    current_user: TokenUser = Depends(deps.get_current_user_claims),
 ) -> Any:
     """
     创建订单
     """
-    # 1. Validate Items & Stock
-    product_ids = [item.product_id for item in order_in.items]
-    result = await session.execute(select(Product).where(Product.id.in_(product_ids)))
-    products = {p.id: p for p in result.scalars().all()}
-    
-    total_goods_price = Decimal(0)
-    order_items = []
-    
-    for item in order_in.items:
-        product = products.get(item.product_id)
-        if not product:
-            raise HTTPException(status_code=400, detail=f"Product {item.product_id} not found")
-        if product.stock < item.count:
-             raise HTTPException(status_code=400, detail=f"Product {product.name} stock insufficient")
-        
-        # Deduct stock (Simple version, optimistic lock needed in prod)
-        product.stock -= item.count
-        product.sales_count += item.count
-        
-        total_goods_price += product.price * item.count
-        
-        # Create OrderItem snapshot
-        order_items.append(OrderItem(
-            product_id=product.id,
-            product_name=product.name,
-            product_image=product.thumb_url,
-            price=product.price,
-            quantity=item.count
-        ))
-
-    # 2. Handle Delivery Info
+    # 1. Handle Delivery Info (校验放在扣库存之前，避免扣减后再失败)
     address_snapshot = None
     if order_in.delivery_type == "delivery":
         if not order_in.address_id:
@@ -186,62 +110,116 @@ async def create_order(
             "phone": address.contact_phone,
             "address": address.detail_address
         }
+
+    # 订单号在扣减库存之前生成，生成失败时无需回滚
+    try:
+        order_no = next_order_no()
+    except ClockSkewError:
+        raise HTTPException(status_code=503, detail="系统繁忙，请稍后重试")
+
+    # 2. Reserve Stock (原子扣减整单库存)
+    counts = stock.merge_counts(order_in.items)
+    try:
+        products = await stock.stock_backend.reserve(session, counts)
+    except stock.StockError as e:
+        await session.rollback()
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    total_goods_price = Decimal(0)
+    order_items = []
+    
+    for item in order_in.items:
+        product = products[item.product_id]
+        total_goods_price += product.price * item.count
+        
+        # OrderItem snapshot (order_id 在订单插入后填入)
+        order_items.append({
+            "product_id": product.id,
+            "product_name": product.name,
+            "product_image": product.thumb_url,
+            "price": product.price,
+            "quantity": item.count,
+        })
         
     delivery_fee = Decimal("3.00") if order_in.delivery_type == "delivery" and total_goods_price < 30 else Decimal("0.00")
     final_amount = total_goods_price + delivery_fee
     
     # 3. Create Order
-    order_no = generate_order_no()
-    pickup_code = str(random.randint(100000, 999999)) if order_in.delivery_type == "pickup" else None
-    
     # Status: Skip payment for now -> Directly to PENDING_DELIVERY/PICKUP
     # In real world: Status = 0 (Pending Payment)
-    initial_status = 1 if order_in.delivery_type == "delivery" else 2
-    
-    order = Order(
+    initial_status = order_state.initial_status(order_in.delivery_type)
+    order_values = dict(
         order_no=order_no,
         user_id=current_user.id,
         total_amount=total_goods_price,
         delivery_fee=delivery_fee,
         final_amount=final_amount,
-        status=initial_status, 
+        status=initial_status,
         delivery_type=order_in.delivery_type.value,
         address_snapshot=address_snapshot,
-        pickup_code=pickup_code,
         pickup_time=order_in.pickup_time,
-        remark=order_in.remark
+        remark=order_in.remark,
     )
-    session.add(order)
-    await session.flush() # Get Order ID
-    
-    # Add Items
-    for item in order_items:
-        item.order_id = order.id
-        session.add(item)
-    
-    # Add Timeline
-    timeline_logs = [OrderTimeline(order_id=order.id, status="下单成功")]
-    if initial_status > 0:
-        # Mock payment success since we skip payment flow
-        timeline_logs.append(OrderTimeline(order_id=order.id, status="支付成功", remark="Mock Payment"))
     
-    for log in timeline_logs:
-        session.add(log)
+    # 订单、明细、时间轴各一条语句: INSERT ... RETURNING id 取得订单ID，
+    # 明细和时间轴基于 Table 批量插入 (executemany)，不经过 ORM 工作单元，也不需要提交后 refresh。
+    # (ORM 批量插入遇到 created_at 的 SQL 默认值会退化为逐行 INSERT ... RETURNING)
+    try:
+        if order_in.delivery_type == "pickup":
+            # 自提码在插入订单时分配，冲突时换码重试
+            order_id, _ = await pickup_code.allocator.insert_order(session, **order_values)
+        else:
+            result = await session.execute(insert(Order).values(**order_values).returning(Order.id))
+            order_id = result.scalar_one()
         
-    await session.commit()
-    await session.refresh(order)
+        # Add Items
+        for item in order_items:
+            item["order_id"] = order_id
+        await session.execute(insert(OrderItem.__table__), order_items)
+        
+        # Add Timeline
+        timeline_logs = [{"order_id": order_id, "status": "下单成功", "remark": None}]
+        if initial_status > 0:
+            # Mock payment success since we skip payment flow
+            timeline_logs.append({"order_id": order_id, "status": "支付成功", "remark": "Mock Payment"})
+        await session.execute(insert(OrderTimeline.__table__), timeline_logs)
+
+        # 新订单事件在提交后推送给商家端
+        await order_events.notify(session, [{
+            "type": "order_created",
+            "order_id": order_id,
+            "order_no": order_no,
+            "status": initial_status,
+            "delivery_type": order_in.delivery_type.value,
+            "final_amount": final_amount,
+        }])
+
+        # 经营汇总放在最后，汇总行的锁只持有到提交
+        await sales_rollup.record_created(session, order_id)
+            
+        await session.commit()
+    except pickup_code.PickupCodeError:
+        await session.rollback()
+        await stock.stock_backend.discard(counts)
+        raise HTTPException(status_code=503, detail="系统繁忙，请稍后重试")
+    except Exception:
+        # 事务未提交，撤销库存层中的预占
+        await stock.stock_backend.discard(counts)
+        raise
+    # 库存由 Core UPDATE 扣减，不经过 ORM 事件，需手动通知目录快照
+    catalog.mark_products(counts)
     
     return success(data={
-        "order_id": order.id,
-        "order_no": order.order_no,
+        "order_id": order_id,
+        "order_no": order_no,
         "pay_params": {"mock": "pay_params"}
     })
 
 @router.get("/list", response_model=ResponseModel[List[order_schemas.OrderOut]])
 async def list_orders(
     status: int = 0, # 0 for all
-    session: AsyncSession = Depends(deps.get_db),
-    current_user: User = Depends(deps.get_current_user),
+    session: AsyncSession = Depends(deps.get_read_db),
+    current_user: TokenUser = Depends(deps.get_current_user_claims),
 ) -> Any:
     """
     订单列表
@@ -260,7 +238,7 @@ async def list_orders(
     # Process status text
     order_list = []
     for o in orders:
-        o.status_text = get_status_text(o.status, o.delivery_type)
+        o.status_text = order_state.status_text(o.status, o.delivery_type)
         order_list.append(o)
         
     return success(data=order_list)
@@ -268,8 +246,8 @@ async def list_orders(
 @router.get("/detail", response_model=ResponseModel[order_schemas.OrderDetailOut])
 async def get_order_detail(
     order_id: int,
-    session: AsyncSession = Depends(deps.get_db),
-    current_user: User = Depends(deps.get_current_user),
+    session: AsyncSession = Depends(deps.get_read_db),
+    current_user: TokenUser = Depends(deps.get_current_user_claims),
 ) -> Any:
     """
     订单详情 (含时间轴)
@@ -284,6 +262,6 @@ async def get_order_detail(
     if not order:
         raise HTTPException(status_code=404, detail="Order not found")
         
-    order.status_text = get_status_text(order.status, order.delivery_type)
+    order.status_text = order_state.status_text(order.status, order.delivery_type)
     
     return success(data=order)
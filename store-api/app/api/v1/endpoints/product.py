@@ -1,12 +1,20 @@
 from typing import List, Any, Optional
-from fastapi import APIRouter, Depends, Query, HTTPException
-from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, func
+from fastapi import APIRouter, Depends, Query, HTTPException, Request
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from sqlalchemy import select
 
 from app.api import deps
 from app.models.product import Product, Category
 from app.schemas import product as product_schemas
 from app.schemas.response import ResponseModel, success
+from app.core.config import settings
+from app.services.catalog import catalog, snapshot_response
+from app.services import images
+from app.services.counting import CountMode, fetch_page
+from app.services.stock import stock_backend
+from app.services.storage import storage
+from app.utils.pagination import paginate_keyset, keyset_page
+from app.utils.search import keyword_search
 
 router = APIRouter()
 
@@ -25,6 +33,7 @@ async def create_product(
         raise HTTPException(status_code=404, detail="Category not found")
 
     product = Product(**product_in.model_dump())
+    product.thumb_small_path = await images.existing_thumbnail(storage, product.thumb_url)
     session.add(product)
     await session.commit()
     await session.refresh(product)
@@ -32,56 +41,102 @@ async def create_product(
 
 @router.get("/list", response_model=ResponseModel[product_schemas.ProductListOut])
 async def read_products(
+    request: Request,
     category_id: Optional[int] = Query(None, description="分类ID"),
     keyword: Optional[str] = Query(None, description="搜索关键词"),
     page: int = Query(1, ge=1, description="页码"),
     size: int = Query(10, ge=1, le=100, description="每页数量"),
-    session: AsyncSession = Depends(deps.get_db),
+    cursor: Optional[str] = Query(None, description="游标分页: 上一页的 next_cursor，空字符串表示第一页"),
+    count_mode: Optional[CountMode] = Query(None, description="总数统计方式: exact / estimate / none"),
+    session: AsyncSession = Depends(deps.get_read_db),
+    session_factory: async_sessionmaker = Depends(deps.get_read_session_factory),
+    catalog_session: AsyncSession = Depends(deps.get_db),
 ) -> Any:
     """
     获取商品列表 (分页)
     
     - 支持按 category_id 筛选
-    - 支持按 keyword 模糊搜索 (匹配 name)
+    - 支持按 keyword 模糊搜索 (匹配 name)，结果按相关度排序 (游标分页时仍按 id 排序)
     - 仅返回上架商品 (status=1)
+    - 传入 cursor 时使用游标分页 (忽略 page，不返回 total)，深度翻页耗时不变
+    - count_mode 指定总数统计方式，默认取 LIST_COUNT_MODE 配置
+    - 无关键字的分页浏览由目录快照返回 (总数始终精确)，支持 ETag / If-None-Match
     """
+    if catalog.enabled and not keyword and cursor is None:
+        await catalog.ensure_fresh(catalog_session)
+        products, total = catalog.list_products(category_id, page, size)
+        return snapshot_response(request, {
+            "list": products,
+            "total": None if count_mode == CountMode.NONE else total,
+            "page": page,
+            "size": size,
+            "has_more": page * size < total
+        })
+    
     # 构建查询
     query = select(Product).where(Product.status == 1)
     
     if category_id:
         query = query.where(Product.category_id == category_id)
     
+    relevance = []
     if keyword:
-        query = query.where(Product.name.ilike(f"%{keyword}%"))
+        # n-gram 检索索引筛选候选后以 ILIKE 复核，按相关度排序
+        conditions, relevance = keyword_search(Product.search_vector, Product.name, keyword)
+        query = query.where(*conditions)
     
-    # 计算总数
-    count_query = select(func.count()).select_from(query.subquery())
-    total_result = await session.execute(count_query)
-    total = total_result.scalar_one()
+    if cursor is not None:
+        keyset = (Product.id,)
+        try:
+            query = paginate_keyset(query, keyset, cursor, size)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        result = await session.execute(query)
+        products, next_cursor = keyset_page(result.scalars().all(), keyset, size)
+        return success(data={
+            "list": products,
+            "total": None,
+            "page": page,
+            "size": size,
+            "has_more": next_cursor is not None,
+            "next_cursor": next_cursor
+        })
     
-    # 分页查询
+    # 分页查询 (总数按 count_mode 统计，精确总数与分页查询并发执行)
     # Note: Product model doesn't have sort_order in my previous definition, so using id desc
-    query = query.order_by(Product.id.desc())
-    query = query.offset((page - 1) * size).limit(size)
-    
-    result = await session.execute(query)
-    products = result.scalars().all()
+    query = query.order_by(*relevance, Product.id.desc())
+    result = await fetch_page(
+        session, query, page, size,
+        mode=count_mode or CountMode(settings.LIST_COUNT_MODE),
+        session_factory=session_factory,
+    )
     
     return success(data={
-        "list": products,
-        "total": total,
+        "list": result.items,
+        "total": result.total,
         "page": page,
-        "size": size
+        "size": size,
+        "has_more": result.has_more
     })
 
 @router.get("/{product_id}", response_model=ResponseModel[product_schemas.ProductOut])
 async def read_product(
+    request: Request,
     product_id: int,
-    session: AsyncSession = Depends(deps.get_db),
+    session: AsyncSession = Depends(deps.get_read_db),
+    catalog_session: AsyncSession = Depends(deps.get_db),
 ) -> Any:
     """
     获取商品详情
+    
+    上架商品由目录快照返回，下架商品查询数据库
     """
+    if catalog.enabled:
+        await catalog.ensure_fresh(catalog_session)
+        product = catalog.get_product(product_id)
+        if product is not None:
+            return snapshot_response(request, product)
+    
     product = await session.get(Product, product_id)
     if not product:
         raise HTTPException(status_code=404, detail="Product not found")
@@ -106,8 +161,12 @@ async def update_product(
             raise HTTPException(status_code=404, detail="Category not found")
 
     update_data = product_in.model_dump(exclude_unset=True)
+    if "stock" in update_data:
+        await stock_backend.invalidate(session, [product_id])
     for field, value in update_data.items():
         setattr(product, field, value)
+    if "thumb_url" in update_data:
+        product.thumb_small_path = await images.existing_thumbnail(storage, product.thumb_url)
     
     session.add(product)
     await session.commit()
@@ -0,0 +1,73 @@
+import time
+from collections import OrderedDict
+from typing import Any, Hashable, Optional
+
+
+class TTLCache:
+    """
+    进程内有界缓存 (TTL + LRU)
+
+    - 超过 maxsize 时淘汰最久未使用的条目
+    - 每个条目在 ttl 秒后过期，也可在 set 时单独指定过期时间
+    - 记录命中率与回源耗时，用于估算缓存节省的延迟
+
+    Args:
+        maxsize: 最大条目数
+        ttl: 默认过期时间 (秒)
+    """
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.loads = 0
+        self.load_seconds = 0.0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        entry = self._data.get(key)
+        if entry is None:
+            self.misses += 1
+            return default
+        value, expires_at = entry
+        if expires_at <= time.monotonic():
+            del self._data[key]
+            self.misses += 1
+            return default
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        ttl = self.ttl if ttl is None else ttl
+        if ttl <= 0:
+            return
+        self._data[key] = (value, time.monotonic() + ttl)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def pop(self, key: Hashable) -> None:
+        self._data.pop(key, None)
+
+    def clear(self) -> None:
+        self._data.clear()
+
+    def record_load(self, seconds: float) -> None:
+        """记录一次回源 (缓存未命中时查询数据源) 的耗时"""
+        self.loads += 1
+        self.load_seconds += seconds
+
+    def stats(self) -> dict:
+        """缓存统计: 命中率、平均回源耗时、按平均回源耗时估算的节省时间"""
+        lookups = self.hits + self.misses
+        avg_load = self.load_seconds / self.loads if self.loads else 0.0
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "avg_load_ms": round(avg_load * 1000, 3),
+            "saved_ms": round(self.hits * avg_load * 1000, 1),
+        }
@@ -18,10 +18,26 @@ class Settings(BaseSettings):
     SECRET_KEY: str  # JWT 签名密钥
     ALGORITHM: str   # 加密算法 (如 HS256)
     ACCESS_TOKEN_EXPIRE_MINUTES: int  # Token 过期时间(分钟)
+    JWT_BACKEND: str = "jose"  # Token 校验后端: jose / pyjwt (需安装 PyJWT，未安装时启动失败)
+    TOKEN_CACHE_SIZE: int = 10000  # 已校验 Token 缓存条数
+    TOKEN_CACHE_TTL: int = 600  # 已校验 Token 缓存有效期上限(秒)，不会超过 Token 自身的 exp
+    USER_CACHE_SIZE: int = 10000  # 已认证用户缓存条数
+    USER_CACHE_TTL: int = 300  # 已认证用户缓存有效期(秒)
     
     # 微信小程序配置 (WeChat Mini Program)
     WECHAT_APP_ID: str = ""
     WECHAT_APP_SECRET: str = ""
+    WECHAT_API_BASE: str = "https://api.weixin.qq.com"  # 微信服务端 API 地址
+    WECHAT_HTTP2: bool = True  # 使用 HTTP/2 (需安装 h2，未安装时使用 HTTP/1.1)
+    WECHAT_MAX_CONNECTIONS: int = 20  # 到微信 API 的最大连接数
+    WECHAT_MAX_KEEPALIVE: int = 10  # 保持的空闲长连接数
+    WECHAT_KEEPALIVE_EXPIRY: float = 60.0  # 空闲长连接保留时间(秒)
+    WECHAT_TIMEOUT: float = 5.0  # 请求超时(秒)
+    WECHAT_CONNECT_TIMEOUT: float = 3.0  # 建立连接超时(秒)
+    WECHAT_RETRIES: int = 2  # 失败重试次数
+    WECHAT_TOKEN_REFRESH_MARGIN: int = 300  # access_token 过期前多少秒开始提前刷新
+    WECHAT_TOKEN_RETRY_INTERVAL: float = 10.0  # access_token 后台刷新失败后的重试间隔(秒)
+    WECHAT_RETRY_BACKOFF: float = 0.2  # 重试退避基数(秒)，第 n 次重试等待约 backoff * 2^n
 
     # 商家端后台配置 (Admin Panel)
     ADMIN_USERNAME: str
@@ -34,6 +50,56 @@ class Settings(BaseSettings):
     ALIYUN_OSS_ENDPOINT: str = ""
     ALIYUN_OSS_BUCKET_NAME: str = "your-bucket-name" # Need user to provide bucket or we default
     ALIYUN_OSS_REGION: str = ""
+    ALIYUN_OSS_PUBLIC_URL: str = ""  # 公开访问域名 (如 CDN: https://cdn.example.com)，设置后直接拼接 URL，不再签名
+    ALIYUN_OSS_URL_EXPIRES: int = 31536000  # 签名 URL 有效期(秒)，默认 1 年
+    ALIYUN_OSS_URL_CACHE_SIZE: int = 10000  # 签名 URL 缓存条目数
+    ALIYUN_OSS_URL_CACHE_TTL: int = 86400  # 签名 URL 缓存时间(秒)，远小于签名有效期，客户端拿到的链接至少还有 (有效期 - 缓存时间) 可用
+    LOCAL_STORAGE_DIR: str = "storage"  # 本地存储目录 (UPLOAD_STORAGE_TYPE=local)
+    LOCAL_STORAGE_URL: str = "/files"  # 本地存储访问前缀，可带域名 (如 https://api.example.com/files)，路径部分即静态路由挂载点
+    IMAGE_VARIANT_SIZES: List[int] = [200, 400, 800]  # 上传图片时生成的缩略图尺寸 (最长边像素)，为空则不生成
+    IMAGE_LIST_SIZE: int = 200  # 商品列表使用的缩略图尺寸，需在 IMAGE_VARIANT_SIZES 中
+    IMAGE_VARIANT_FORMAT: str = "webp"  # 缩略图格式: webp, jpeg
+    IMAGE_VARIANT_QUALITY: int = 80  # 缩略图编码质量 (1-100)
+    IMAGE_VARIANTS_SINCE: str = ""  # 从该日期 (YYYYMMDD，对应存储路径中的日期目录) 起上传的图片才有缩略图，部署缩略图功能时设置，避免旧图片返回不存在的链接
+    IMAGE_MAX_BYTES: int = 20 * 1024 * 1024  # 超过该大小的图片不生成缩略图
+    IMAGE_PROCESS_WORKERS: int = 2  # 缩略图处理进程数
+    UPLOAD_THREADS: int = 4  # 上传线程池大小，即同时进行的 OSS 上传调用数上限
+    UPLOAD_MULTIPART_THRESHOLD: int = 10 * 1024 * 1024  # 超过该大小(字节)的文件使用分片上传
+    UPLOAD_PART_SIZE: int = 5 * 1024 * 1024  # 分片大小(字节)，同时也是分片上传时每个文件占用的内存上限
+    UPLOAD_PART_RETRIES: int = 3  # 单个分片上传失败后的重试次数
+
+    # 库存配置 (Stock)
+    STOCK_BACKEND: str = "database" # database, memory (单进程热点库存计数层)
+    STOCK_FLUSH_INTERVAL: float = 1.0 # 内存库存回写数据库的间隔 (秒)
+
+    # 订单号配置 (Order Number)
+    ORDER_NO_WORKER_ID: int | None = None  # 固定的订单号 worker id (0-9999)，为空时启动时从数据库租用
+    ORDER_NO_WORKERS: int = 1024  # 可租用的 worker id 数 [0, ORDER_NO_WORKERS)，即同时运行的进程数上限
+    ORDER_NO_LEASE_TTL: int = 60  # worker id 租约有效期(秒)，进程每 1/3 有效期续约一次，退出或失联后编号被回收
+    ORDER_NO_MAX_CLOCK_SKEW_MS: int = 1000  # 允许的系统时钟回拨(毫秒)，超过时拒绝生成订单号
+
+    # 自提码配置 (Pickup Code)
+    PICKUP_CODE_ATTEMPTS: int = 10  # 分配自提码时的最大尝试次数 (随机码与未完结订单冲突时重试)
+
+    # 经营统计配置 (Sales Stats)
+    SHOP_TIMEZONE: str = "Asia/Shanghai"  # 门店时区，"今日" 及按天统计的日期边界按该时区计算
+    SALES_ROLLUP_SHARDS: int = 16  # 每天的汇总拆成的行数，分散并发下单对同一行的锁竞争
+
+    # 订单事件推送配置 (Order Events)
+    ORDER_EVENTS_CHANNEL: str = "order_events"  # PostgreSQL LISTEN/NOTIFY 频道名，多个 worker 通过它共享订单事件
+    ORDER_EVENTS_QUEUE_SIZE: int = 100  # 每个推送连接缓存的事件数，写满 (客户端消费过慢) 时断开该连接
+    ORDER_EVENTS_HEARTBEAT: float = 15.0  # 推送连接空闲时发送心跳的间隔(秒)，避免被代理超时断开
+    ORDER_EVENTS_CLIENT_RETRY_MS: int = 3000  # 告知客户端 (EventSource) 断线后的重连间隔(毫秒)
+    ORDER_EVENTS_RETRY_INTERVAL: float = 5.0  # 监听连接断开后的重连间隔(秒)
+
+    # 商品目录快照配置 (Catalog Snapshot)
+    CATALOG_SNAPSHOT: bool = True  # 分类/商品浏览接口由进程内快照返回
+    CATALOG_TTL: int = 300  # 快照整体重建间隔(秒)，决定其他 worker 的变更多久后可见
+
+    # 列表总数配置 (List Totals)
+    LIST_COUNT_MODE: str = "exact" # 分页列表默认的总数统计方式: exact, estimate, none
+    COUNT_CACHE_SIZE: int = 10000  # 精确总数缓存条数
+    COUNT_CACHE_TTL: int = 10  # 精确总数缓存有效期(秒)，本进程内的写入会立即使其失效
 
     # 数据库配置 (Database)
     POSTGRES_SERVER: str
@@ -42,6 +108,25 @@ class Settings(BaseSettings):
     POSTGRES_DB: str
     POSTGRES_PORT: int = 5432
 
+    # 只读副本配置 (Read Replica)，未配置 POSTGRES_REPLICA_SERVER 时读请求仍走主库
+    POSTGRES_REPLICA_SERVER: str = ""
+    POSTGRES_REPLICA_PORT: int | None = None  # 默认同 POSTGRES_PORT
+    POSTGRES_REPLICA_DB: str = ""  # 默认同 POSTGRES_DB
+    REPLICA_STICKY_SECONDS: float = 5  # 同一用户写操作后的读请求继续走主库的时间(秒)，应大于副本复制延迟
+
+    # 连接池配置 (Connection Pool)，均为单个 worker 进程内的值
+    # 每个 worker 最多占用 DB_POOL_SIZE + DB_MAX_OVERFLOW 个连接，
+    # 所有 worker 合计应小于 PostgreSQL 的 max_connections
+    DB_POOL_SIZE: int = 5  # 常驻连接数
+    DB_MAX_OVERFLOW: int = 10  # 高峰期额外允许的连接数
+    DB_POOL_TIMEOUT: float = 30  # 等待可用连接的超时时间(秒)
+    DB_POOL_RECYCLE: int = 1800  # 连接最长存活时间(秒)，-1 表示不回收
+    DB_POOL_PRE_PING: bool = True  # 取出连接前探活，避免使用已被服务端断开的连接
+    DB_STATEMENT_CACHE_SIZE: int = 100  # 每个连接的预编译语句缓存条数，0 表示关闭
+    DB_CONNECT_TIMEOUT: float = 10  # 建立连接的超时时间(秒)
+    DB_COMMAND_TIMEOUT: float | None = 30  # 单条语句的超时时间(秒)
+    DB_ECHO: bool = False  # 打印 SQL 语句，生产环境建议关闭
+
     @computed_field
     @property
     def SQLALCHEMY_DATABASE_URI(self) -> PostgresDsn:
@@ -58,6 +143,23 @@ class Settings(BaseSettings):
             path=self.POSTGRES_DB,
         )
 
+    @computed_field
+    @property
+    def SQLALCHEMY_REPLICA_URI(self) -> PostgresDsn | None:
+        """
+        构建只读副本连接 URL (用户名密码与主库相同)，未配置副本时为 None
+        """
+        if not self.POSTGRES_REPLICA_SERVER:
+            return None
+        return MultiHostUrl.build(
+            scheme="postgresql+asyncpg",
+            username=self.POSTGRES_USER,
+            password=self.POSTGRES_PASSWORD,
+            host=self.POSTGRES_REPLICA_SERVER,
+            port=self.POSTGRES_REPLICA_PORT or self.POSTGRES_PORT,
+            path=self.POSTGRES_REPLICA_DB or self.POSTGRES_DB,
+        )
+
     model_config = SettingsConfigDict(
         env_file=".env",
         extra="ignore",
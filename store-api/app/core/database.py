@@ -1,13 +1,105 @@
+import time
+
+from sqlalchemy import exc
 from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
 from sqlalchemy.orm import DeclarativeBase
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+from app.core import metrics
 from app.core.config import settings
 
-# 创建异步数据库引擎
-# echo=True 可以打印 SQL 语句，生产环境建议关闭
-engine = create_async_engine(str(settings.SQLALCHEMY_DATABASE_URI))
+
+class InstrumentedPool(AsyncAdaptedQueuePool):
+    """
+    带等待时间统计的连接池
+
+    在默认队列池的基础上记录取连接的次数、累计/最大等待时间、超时次数和其他失败次数，
+    用于判断连接池是否过小 (等待时间上升、超时) 或数据库不可用 (建立连接失败)。
+    """
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.checkouts = 0
+        self.timeouts = 0
+        self.errors = 0
+        self.wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            # 等待 pool_timeout 后仍没有空闲连接
+            self.timeouts += 1
+            raise
+        except Exception:
+            # 建立新连接失败等其他错误，与连接池容量无关
+            self.errors += 1
+            raise
+        finally:
+            waited = time.perf_counter() - started
+            self.checkouts += 1
+            self.wait_seconds += waited
+            self.max_wait_seconds = max(self.max_wait_seconds, waited)
+
+    def stats(self) -> dict:
+        """
+        连接池当前状态
+
+        Returns:
+            dict: 连接数与等待时间统计
+        """
+        return {
+            "pool_size": self.size(),
+            "max_overflow": self._max_overflow,
+            "checked_out": self.checkedout(),
+            "checked_in": self.checkedin(),
+            "overflow": max(self.overflow(), 0),
+            "checkouts": self.checkouts,
+            "timeouts": self.timeouts,
+            "errors": self.errors,
+            "avg_wait_ms": round(self.wait_seconds / self.checkouts * 1000, 3) if self.checkouts else 0.0,
+            "max_wait_ms": round(self.max_wait_seconds * 1000, 3),
+        }
+
+
+def create_engine(url: str):
+    """
+    按 Settings 中的 DB_* 配置创建异步数据库引擎
+    
+    Args:
+        url: 数据库连接 URL
+    """
+    return create_async_engine(
+        url,
+        poolclass=InstrumentedPool,
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_MAX_OVERFLOW,
+        pool_timeout=settings.DB_POOL_TIMEOUT,
+        pool_recycle=settings.DB_POOL_RECYCLE,
+        pool_pre_ping=settings.DB_POOL_PRE_PING,
+        echo=settings.DB_ECHO,
+        connect_args={
+            "prepared_statement_cache_size": settings.DB_STATEMENT_CACHE_SIZE,
+            "timeout": settings.DB_CONNECT_TIMEOUT,
+            "command_timeout": settings.DB_COMMAND_TIMEOUT,
+        },
+    )
+
+# 主库引擎 (读写)
+engine = create_engine(str(settings.SQLALCHEMY_DATABASE_URI))
+metrics.register("db_pool", lambda: engine.pool.stats())
+
+# 只读副本引擎，未配置副本时与主库共用同一个引擎
+if settings.SQLALCHEMY_REPLICA_URI:
+    read_engine = create_engine(str(settings.SQLALCHEMY_REPLICA_URI))
+    metrics.register("db_replica_pool", lambda: read_engine.pool.stats())
+else:
+    read_engine = engine
 
 # 创建异步 Session 工厂
 SessionLocal = async_sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# 只读 Session 工厂 (仅用于 GET 接口)
+ReadSessionLocal = async_sessionmaker(autocommit=False, autoflush=False, bind=read_engine)
 
 class Base(DeclarativeBase):
     """
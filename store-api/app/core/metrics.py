@@ -0,0 +1,20 @@
+from typing import Callable, Dict
+
+# 指标提供者注册表: 名称 -> 返回 dict 的无参函数
+_providers: Dict[str, Callable[[], dict]] = {}
+
+def register(name: str, provider: Callable[[], dict]) -> None:
+    """
+    注册一个指标提供者
+
+    Args:
+        name: 指标名称 (如 user_cache)
+        provider: 返回当前指标的函数
+    """
+    _providers[name] = provider
+
+def snapshot() -> Dict[str, dict]:
+    """
+    获取所有已注册指标的当前值
+    """
+    return {name: provider() for name, provider in _providers.items()}
@@ -1,14 +1,56 @@
+import time
 from datetime import datetime, timedelta, timezone
 from typing import Any, Union
 
-from jose import jwt
+from jose import jwt, JWTError
 from passlib.context import CryptContext
 
+from app.core import metrics
+from app.core.cache import TTLCache
 from app.core.config import settings
+from app.schemas.token import TokenPayload
 
 # 密码加密上下文 (使用 bcrypt 算法)
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
+# 已校验 Token 缓存: token 字符串 -> TokenPayload
+# 同一个 Token 在会话内会被反复使用，签名校验结果在过期前可以复用
+token_cache = TTLCache(maxsize=settings.TOKEN_CACHE_SIZE, ttl=settings.TOKEN_CACHE_TTL)
+metrics.register("token_cache", token_cache.stats)
+
+
+def _jose_decode(token: str) -> dict:
+    return jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+
+def _pyjwt_decoder():
+    # PyJWT 是可选依赖，在选择后端时导入一次，未安装时启动即失败，而不是在每次校验时才报错
+    try:
+        import jwt as pyjwt
+    except ImportError as e:
+        raise RuntimeError("JWT_BACKEND=pyjwt requires the PyJWT package (pip install PyJWT)") from e
+
+    def decode(token: str) -> dict:
+        # PyJWT 校验更快，异常统一转换为 JWTError，调用方无需区分后端
+        try:
+            return pyjwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+        except pyjwt.PyJWTError as e:
+            raise JWTError(str(e)) from e
+
+    return decode
+
+def get_jwt_decoder():
+    """
+    根据配置选择 JWT 校验后端 (jose / pyjwt)
+
+    Raises:
+        RuntimeError: 选择了 pyjwt 但未安装 PyJWT
+    """
+    if settings.JWT_BACKEND == "pyjwt":
+        return _pyjwt_decoder()
+    return _jose_decode
+
+_decode = get_jwt_decoder()
+
 def create_access_token(subject: Union[str, Any], expires_delta: timedelta = None) -> str:
     """
     创建 JWT 访问令牌
@@ -30,6 +72,37 @@ def create_access_token(subject: Union[str, Any], expires_delta: timedelta = Non
     encoded_jwt = jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
     return encoded_jwt
 
+def decode_access_token(token: str) -> TokenPayload:
+    """
+    校验并解析 JWT 访问令牌 (带缓存)
+    
+    首次校验签名后缓存解析结果，缓存有效期不超过 Token 的 exp。
+    
+    Args:
+        token: JWT 字符串
+        
+    Returns:
+        TokenPayload: 解析后的载荷
+        
+    Raises:
+        JWTError: 签名无效或已过期
+        ValidationError: 载荷格式错误
+    """
+    token_data = token_cache.get(token)
+    if token_data is not None:
+        return token_data
+    
+    started = time.perf_counter()
+    payload = _decode(token)
+    token_data = TokenPayload(**payload)
+    token_cache.record_load(time.perf_counter() - started)
+    
+    ttl = None
+    if token_data.exp is not None:
+        ttl = min(token_data.exp - time.time(), settings.TOKEN_CACHE_TTL)
+    token_cache.set(token, token_data, ttl)
+    return token_data
+
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """
     校验密码
@@ -1,5 +1,7 @@
 from app.models.shop import ShopConfig
 from app.models.user import User, UserAddress
-from app.models.product import Category, Product
-from app.models.order import Order, OrderItem
+from app.models.product import Category, Product, StockJournal
+from app.models.order import Order, OrderItem, OrderNoWorkerLease
 from app.models.cart import CartItem
+from app.models.wechat import WeChatToken
+from app.models.stats import DailySalesRollup, HourlySalesRollup, ProductSalesRollup
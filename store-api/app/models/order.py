@@ -3,6 +3,9 @@ from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.orm import relationship
 from app.core.database import Base
 
+# 自提码在未完结 (待支付/待接单/待自提/配送中) 的订单中唯一，订单完成或取消后可被复用
+ACTIVE_PICKUP_CODE = text("pickup_code IS NOT NULL AND status IN (0, 1, 2, 3)")
+
 class Order(Base):
     """
     订单主表模型 (Order Model)
@@ -51,7 +54,10 @@ class Order(Base):
     # 索引优化
     __table_args__ = (
         Index('idx_orders_user_status', 'user_id', 'status'), # 优化 "我的订单" 列表查询
-        Index('idx_orders_pickup_code', 'pickup_code'),       # 优化 "商家扫码核销" 查询
+        Index('idx_orders_pickup_code', 'pickup_code'),       # 按核销码查询历史订单 (核销失败时给出原因)
+        Index('uq_orders_active_pickup_code', 'pickup_code', unique=True, postgresql_where=ACTIVE_PICKUP_CODE), # 核销码分配与 "商家扫码核销" 查询
+        Index('idx_orders_created_id', 'created_at', 'id'),   # 优化后台订单列表的游标分页
+        Index('idx_orders_status_created_id', 'status', 'created_at', 'id'), # 优化后台按状态筛选的游标分页
     )
 
 
@@ -91,3 +97,15 @@ class OrderTimeline(Base):
     created_at = Column(DateTime(timezone=True), default=func.now(), comment='发生时间')
 
     order = relationship("Order", back_populates="timeline")
+
+
+class OrderNoWorkerLease(Base):
+    """
+    订单号 worker id 租约 (见 app.services.order_no)
+    每个进程启动时租用一个未被占用的编号并定期续约，到期未续约的编号可被其他进程租用。
+    """
+    __tablename__ = "order_no_worker_leases"
+
+    worker_id = Column(Integer, primary_key=True, autoincrement=False, comment='订单号 worker id')
+    holder = Column(String(100), nullable=False, comment='持有者 (主机名:进程号:随机串)')
+    expires_at = Column(DateTime(timezone=True), nullable=False, comment='租约到期时间')
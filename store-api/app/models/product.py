@@ -1,7 +1,8 @@
-from sqlalchemy import Column, Integer, String, Boolean, Numeric, Text, DateTime, func, BigInteger, ForeignKey, Index
-from sqlalchemy.dialects.postgresql import JSONB
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, Integer, String, Boolean, Numeric, Text, DateTime, func, BigInteger, ForeignKey, Index, event, inspect
+from sqlalchemy.dialects.postgresql import JSONB, TSVECTOR
+from sqlalchemy.orm import relationship, deferred
 from app.core.database import Base
+from app.utils.search import search_vector
 
 class Category(Base):
     """
@@ -31,6 +32,8 @@ class Product(Base):
     name = Column(String(100), nullable=False, comment='商品名称')
     description = Column(Text, comment='商品详情描述')
     thumb_url = Column(String(255), comment='商品缩略图URL')
+    # 保存商品时确认已生成的列表尺寸缩略图，没有时列表使用原图
+    thumb_small_path = Column(String(255), comment='列表缩略图存储路径 (为空时使用原图)')
     price = Column(Numeric(10, 2), nullable=False, comment='当前售价')
     original_price = Column(Numeric(10, 2), comment='原价/划线价 (展示用)')
     stock = Column(Integer, default=0, nullable=False, comment='库存数量')
@@ -39,11 +42,39 @@ class Product(Base):
     specs = Column(JSONB, default=None, comment='预留字段：多规格信息 (JSON格式)')
     created_at = Column(DateTime(timezone=True), default=func.now(), comment='创建时间')
     updated_at = Column(DateTime(timezone=True), default=func.now(), onupdate=func.now(), comment='更新时间')
+    # 名称变更时由 ORM 事件维护，仅用于检索，默认不加载
+    search_vector = deferred(Column(TSVECTOR, comment='商品名称 n-gram 检索向量'))
 
     # 关联关系
     category = relationship("Category", back_populates="products")
 
     # 索引优化
     __table_args__ = (
-        Index('idx_products_cat_status', 'category_id', 'status'), # 优化 "分类下上架商品" 的查询
+        Index('idx_products_cat_status_id', 'category_id', 'status', 'id'), # 优化 "分类下上架商品" 的查询及游标分页
+        Index('idx_products_status_id', 'status', 'id'),             # 优化 "全部上架商品" 的游标分页
+        Index('idx_products_created_id', 'created_at', 'id'),        # 优化后台商品列表的游标分页
+        Index('idx_products_search', 'search_vector', postgresql_using='gin'), # 优化商品名称关键字搜索
     )
+
+
+@event.listens_for(Product, "before_insert")
+def _product_search_on_insert(mapper, connection, target):
+    target.search_vector = search_vector(target.name)
+
+@event.listens_for(Product, "before_update")
+def _product_search_on_update(mapper, connection, target):
+    if inspect(target).attrs.name.history.has_changes():
+        target.search_vector = search_vector(target.name)
+
+
+class StockJournal(Base):
+    """
+    库存流水模型 (Stock Journal)
+    内存库存层的预写日志: 与订单在同一事务中写入，由后台任务批量合并回 products 表。
+    """
+    __tablename__ = "stock_journal"
+
+    id = Column(BigInteger, primary_key=True)
+    product_id = Column(BigInteger, nullable=False, index=True, comment='关联商品ID')
+    quantity = Column(Integer, nullable=False, comment='销量变化: 正数=扣减库存, 负数=回补库存')
+    created_at = Column(DateTime(timezone=True), default=func.now(), comment='创建时间')
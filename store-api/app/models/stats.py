@@ -0,0 +1,47 @@
+from sqlalchemy import BigInteger, Column, Date, Integer, Numeric, SmallInteger, String
+from app.core.database import Base
+
+class DailySalesRollup(Base):
+    """
+    每日经营汇总模型 (Daily Sales Rollup)
+    下单和订单完成时在同一事务中增量累加，数据看板直接读取，不再扫描订单表。
+    每天拆成多行 (shard)，分散并发下单对同一行的锁竞争，查询时按天求和。
+    """
+    __tablename__ = "daily_sales_rollup"
+
+    day = Column(Date, primary_key=True, comment='日期 (门店时区，订单按下单时间归属)')
+    shard = Column(SmallInteger, primary_key=True, default=0, comment='分片号 (订单ID % SALES_ROLLUP_SHARDS)')
+    order_count = Column(Integer, nullable=False, default=0, comment='下单数')
+    completed_count = Column(Integer, nullable=False, default=0, comment='已完成订单数')
+    sales_amount = Column(Numeric(14, 2), nullable=False, default=0, comment='已完成订单实付金额')
+
+
+class HourlySalesRollup(Base):
+    """
+    每小时经营汇总模型 (Hourly Sales Rollup)
+    与每日汇总同时维护，用于按小时查看下单和销售趋势。
+    """
+    __tablename__ = "hourly_sales_rollup"
+
+    day = Column(Date, primary_key=True, comment='日期 (门店时区)')
+    hour = Column(SmallInteger, primary_key=True, comment='小时 (门店时区，0-23)')
+    shard = Column(SmallInteger, primary_key=True, default=0, comment='分片号 (订单ID % SALES_ROLLUP_SHARDS)')
+    order_count = Column(Integer, nullable=False, default=0, comment='下单数')
+    completed_count = Column(Integer, nullable=False, default=0, comment='已完成订单数')
+    sales_amount = Column(Numeric(14, 2), nullable=False, default=0, comment='已完成订单实付金额')
+
+
+class ProductSalesRollup(Base):
+    """
+    商品每日销售汇总模型 (Product Sales Rollup)
+    订单完成时由订单明细快照累加 (不含已移除的明细)，用于商品销量排行。
+    不设外键，商品删除后历史销量仍保留。
+    """
+    __tablename__ = "product_sales_rollup"
+
+    day = Column(Date, primary_key=True, comment='日期 (门店时区，按订单下单时间归属)')
+    product_id = Column(BigInteger, primary_key=True, comment='商品ID')
+    product_name = Column(String(100), nullable=False, comment='最近一次计入时的商品名称快照')
+    quantity = Column(Integer, nullable=False, default=0, comment='销售数量')
+    sales_amount = Column(Numeric(14, 2), nullable=False, default=0, comment='销售额 (快照单价 × 数量，不含运费)')
+    order_count = Column(Integer, nullable=False, default=0, comment='包含该商品的已完成订单数')
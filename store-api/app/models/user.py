@@ -1,6 +1,11 @@
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, func, BigInteger, ForeignKey
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, func, BigInteger, ForeignKey, Index, event, inspect
+from sqlalchemy.dialects.postgresql import TSVECTOR
+from sqlalchemy.orm import relationship, deferred
 from app.core.database import Base
+from app.utils.search import search_vector
+
+# 手机号只有数字，2 字片段区分度太低，额外切分 3 字片段
+PHONE_NGRAM_SIZES = (1, 2, 3)
 
 class User(Base):
     """
@@ -16,12 +21,30 @@ class User(Base):
     phone = Column(String(20), unique=True, index=True, comment='手机号')
     created_at = Column(DateTime(timezone=True), default=func.now(), comment='注册时间')
     updated_at = Column(DateTime(timezone=True), default=func.now(), onupdate=func.now(), comment='更新时间')
+    # 手机号变更时由 ORM 事件维护，仅用于检索，默认不加载
+    phone_search_vector = deferred(Column(TSVECTOR, comment='手机号 n-gram 检索向量'))
 
     # 关联关系
     addresses = relationship("UserAddress", back_populates="user", cascade="all, delete-orphan")
     orders = relationship("Order", back_populates="user")
     cart_items = relationship("CartItem", back_populates="user", cascade="all, delete-orphan")
 
+    # 索引优化
+    __table_args__ = (
+        Index('idx_users_created_id', 'created_at', 'id'), # 优化后台用户列表的游标分页
+        Index('idx_users_phone_search', 'phone_search_vector', postgresql_using='gin'), # 优化后台手机号搜索
+    )
+
+
+@event.listens_for(User, "before_insert")
+def _user_search_on_insert(mapper, connection, target):
+    target.phone_search_vector = search_vector(target.phone, PHONE_NGRAM_SIZES)
+
+@event.listens_for(User, "before_update")
+def _user_search_on_update(mapper, connection, target):
+    if inspect(target).attrs.phone.history.has_changes():
+        target.phone_search_vector = search_vector(target.phone, PHONE_NGRAM_SIZES)
+
 
 class UserAddress(Base):
     """
@@ -0,0 +1,14 @@
+from sqlalchemy import Column, String, DateTime, func
+from app.core.database import Base
+
+class WeChatToken(Base):
+    """
+    微信接口凭证模型 (WeChat Token)
+    多个 worker 共享的 access_token，由获得刷新锁的 worker 写入，其余 worker 直接读取。
+    """
+    __tablename__ = "wechat_tokens"
+
+    name = Column(String(50), primary_key=True, comment='凭证名称 (如 access_token:{appid})')
+    token = Column(String(512), nullable=False, comment='凭证内容')
+    expires_at = Column(DateTime(timezone=True), nullable=False, comment='过期时间')
+    updated_at = Column(DateTime(timezone=True), default=func.now(), onupdate=func.now(), comment='最后刷新时间')
@@ -1,4 +1,6 @@
-from typing import Optional, Dict, Any, Literal
+from datetime import date
+from decimal import Decimal
+from typing import Optional, Dict, Any, List, Literal
 from pydantic import BaseModel, Field, ConfigDict
 
 class OrderAuditRequest(BaseModel):
@@ -16,6 +18,23 @@ class VerifyPickupResponse(BaseModel):
     success: bool
     order_info: Dict[str, Any]
 
+class BatchOrderRequest(BaseModel):
+    order_ids: List[int] = Field(..., min_length=1, max_length=100, description="订单ID列表 (最多100个)")
+
+class BatchOrderAuditRequest(BatchOrderRequest):
+    action: Literal['accept', 'reject'] = Field(..., description="操作类型: accept-接单, reject-拒绝")
+    reject_reason: Optional[str] = Field(None, max_length=255, description="拒绝原因 (拒单时必填)")
+
+class BatchOrderResult(BaseModel):
+    order_id: int
+    success: bool
+    msg: str
+
+class BatchOrderResultOut(BaseModel):
+    results: List[BatchOrderResult]
+    succeeded: int
+    failed: int
+
 class ShopConfigUpdate(BaseModel):
     is_open: int = Field(..., ge=0, le=1, description="营业状态: 1-营业中, 0-休息中")
     open_time: str = Field(..., pattern=r"^([0-1]?[0-9]|2[0-3]):[0-5][0-9]$", description="营业开始时间 (HH:MM)")
@@ -46,3 +65,17 @@ class ShopConfigOut(BaseModel):
     store_phone: Optional[str] = None
 
     model_config = ConfigDict(from_attributes=True)
+
+class SalesStatsPoint(BaseModel):
+    date: date
+    hour: Optional[int] = None  # 按小时统计时为 0-23
+    order_count: int
+    completed_count: int
+    sales_amount: Decimal
+
+class ProductStatsItem(BaseModel):
+    product_id: int
+    product_name: str
+    quantity: int
+    sales_amount: Decimal
+    order_count: int
@@ -1,7 +1,9 @@
-from pydantic import BaseModel, ConfigDict
+from typing import Dict
+from pydantic import BaseModel, ConfigDict, Field
 
 class FileOut(BaseModel):
     path: str
     url: str
+    variants: Dict[str, str] = Field(default_factory=dict, description="缩略图链接: {尺寸: URL}")
     
     model_config = ConfigDict(from_attributes=True)
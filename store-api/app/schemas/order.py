@@ -106,9 +106,11 @@ class OrderListOut(BaseModel):
 
 class OrderAdminListOut(BaseModel):
     list: List[OrderAdminOut]
-    total: int
+    total: Optional[int] = None  # 游标分页或 count_mode=none 时不统计总数；estimate 时为估算值
     page: int
     size: int
+    has_more: Optional[bool] = None  # 是否还有下一页 (不统计总数时据此翻页)
+    next_cursor: Optional[str] = None  # 游标分页: 下一页游标，没有下一页时为 None
 
 class OrderDetailOut(OrderOut):
     delivery_type: str
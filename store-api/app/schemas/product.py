@@ -62,6 +62,8 @@ class ProductOut(ProductBase):
     id: int
     sales_count: int
     thumb_path: Optional[str] = Field(None, description="图片存储路径")
+    thumb_small_path: Optional[str] = Field(None, exclude=True, description="列表缩略图存储路径")
+    thumb_small_url: Optional[str] = Field(None, description="列表缩略图URL (IMAGE_LIST_SIZE 尺寸)，无缩略图时与 thumb_url 相同")
 
     model_config = ConfigDict(from_attributes=True)
 
@@ -72,11 +74,14 @@ class ProductOut(ProductBase):
             self.thumb_path = self.thumb_url
             if not self.thumb_url.startswith('http'):
                 self.thumb_url = storage.get_file_url(self.thumb_url)
+            self.thumb_small_url = storage.get_file_url(self.thumb_small_path) if self.thumb_small_path else self.thumb_url
         return self
 
 class ProductListOut(BaseModel):
     """商品列表响应 (带分页)"""
     list: List[ProductOut]
-    total: int
+    total: Optional[int] = None  # 游标分页或 count_mode=none 时不统计总数；estimate 时为估算值
     page: int
     size: int
+    has_more: Optional[bool] = None  # 是否还有下一页 (不统计总数时据此翻页)
+    next_cursor: Optional[str] = None  # 游标分页: 下一页游标，没有下一页时为 None
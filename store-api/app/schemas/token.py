@@ -6,3 +6,8 @@ class Token(BaseModel):
 
 class TokenPayload(BaseModel):
     sub: str | None = None
+    exp: int | None = None
+
+class TokenUser(BaseModel):
+    """Token 中携带的用户身份 (无需查询数据库)"""
+    id: int
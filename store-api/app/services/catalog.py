@@ -0,0 +1,260 @@
+import asyncio
+import bisect
+import hashlib
+import json
+import logging
+import time
+from typing import Any, Collection, Dict, List, Optional, Set, Tuple
+
+from fastapi import Request, Response
+from fastapi.responses import JSONResponse
+from sqlalchemy import event, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.core import metrics
+from app.core.config import settings
+from app.models.product import Category, Product
+from app.schemas import product as product_schemas
+from app.schemas.response import success
+from app.services.storage import storage
+
+logger = logging.getLogger(__name__)
+
+# 快照中保存的商品字段 (ProductOut 所需的列，不含检索向量等大字段)
+PRODUCT_COLUMNS = (
+    Product.id, Product.category_id, Product.name, Product.description, Product.thumb_url, Product.thumb_small_path,
+    Product.price, Product.original_price, Product.stock, Product.sales_count, Product.status,
+    Product.specs,
+)
+CATEGORY_COLUMNS = (Category.id, Category.name, Category.sort_order, Category.is_visible)
+
+
+class Catalog:
+    """
+    进程内商品目录快照
+
+    - 保存可见分类和全部上架商品 (已序列化为响应格式)，按分类和 ID 建立索引，
+      分类列表、商品列表 (无关键字) 和商品详情直接由快照返回，不查询数据库。
+    - 本进程内提交的商品/分类变更由 Session 事件记录，下一次读取前只重新加载变更的行；
+      订单扣减/回补库存由调用方通过 mark_products 通知。
+    - 其他 worker 的变更在 CATALOG_TTL 到期后整体重建时生效。
+    - ETag 由快照内容的摘要生成 (各商品摘要异或，增删商品时增量更新)，供客户端条件请求 (304)。
+      内容相同的快照在各 worker 和重启前后得到相同的 ETag，内容不同则 ETag 不同。
+
+    快照只在事件循环中修改，读取与修改之间没有 await，读到的总是一致的状态。
+    """
+
+    def __init__(self, enabled: bool, ttl: float):
+        self.enabled = enabled
+        self.ttl = ttl
+        self.version = 0
+        self.categories: List[dict] = []
+        self._products_digest = 0
+        self._categories_digest = 0
+        self.products: Dict[int, dict] = {}
+        # 分类ID -> 升序商品ID列表；None 键保存全部上架商品
+        self._index: Dict[Optional[int], List[int]] = {None: []}
+        self._built_at: Optional[float] = None
+        self._dirty_products: Set[int] = set()
+        self._dirty_categories = False
+        self._lock = asyncio.Lock()
+        self.rebuilds = 0
+        self.refreshes = 0
+
+    @property
+    def etag(self) -> str:
+        return f'W/"catalog-{self._products_digest ^ self._categories_digest:032x}"'
+
+    def mark_products(self, product_ids: Collection[int]) -> None:
+        """标记商品已变更 (事务提交后调用)"""
+        self._dirty_products.update(product_ids)
+
+    def mark_categories(self) -> None:
+        """标记分类已变更 (事务提交后调用)"""
+        self._dirty_categories = True
+
+    async def ensure_fresh(self, session: AsyncSession) -> None:
+        """
+        读取快照前调用: 首次使用或过期时整体重建，有变更时增量刷新
+
+        Args:
+            session: 用于加载数据的会话 (应连接主库，避免读到副本上的旧数据)
+        """
+        if self._is_fresh():
+            return
+        async with self._lock:
+            if self._built_at is None or time.monotonic() - self._built_at >= self.ttl:
+                await self._rebuild(session)
+            if self._dirty_categories:
+                await self._refresh_categories(session)
+            if self._dirty_products:
+                await self._refresh_products(session)
+
+    def _is_fresh(self) -> bool:
+        return (
+            self._built_at is not None
+            and time.monotonic() - self._built_at < self.ttl
+            and not self._dirty_products
+            and not self._dirty_categories
+        )
+
+    async def _rebuild(self, session: AsyncSession) -> None:
+        # 先清除变更标记: 加载期间提交的变更会重新标记，下次读取时再增量刷新
+        self._dirty_products.clear()
+        self._dirty_categories = False
+        started = time.perf_counter()
+
+        categories = await self._load_categories(session)
+        rows = (await session.execute(select(*PRODUCT_COLUMNS).where(Product.status == 1))).all()
+        # 批量生成图片链接，序列化时直接命中签名缓存
+        storage.get_file_urls(
+            path for row in rows if row.thumb_url and not row.thumb_url.startswith("http")
+            for path in (row.thumb_url, row.thumb_small_path)
+        )
+        products = {row.id: _serialize_product(row) for row in rows}
+        index: Dict[Optional[int], List[int]] = {None: sorted(products)}
+        products_digest = 0
+        for pid in index[None]:
+            index.setdefault(products[pid]["category_id"], []).append(pid)
+            products_digest ^= _digest(products[pid])
+
+        self.categories, self.products, self._index = categories, products, index
+        self._products_digest, self._categories_digest = products_digest, _digest(categories)
+        self._built_at = time.monotonic()
+        self.version += 1
+        self.rebuilds += 1
+        logger.info(
+            "Catalog snapshot rebuilt: %s categories, %s products in %.1f ms",
+            len(categories), len(products), (time.perf_counter() - started) * 1000,
+        )
+
+    async def _refresh_categories(self, session: AsyncSession) -> None:
+        self._dirty_categories = False
+        self.categories = await self._load_categories(session)
+        self._categories_digest = _digest(self.categories)
+        self.version += 1
+        self.refreshes += 1
+
+    async def _refresh_products(self, session: AsyncSession) -> None:
+        ids = list(self._dirty_products)
+        self._dirty_products.clear()
+        result = await session.execute(
+            select(*PRODUCT_COLUMNS).where(Product.id.in_(ids), Product.status == 1)
+        )
+        loaded = {row.id: _serialize_product(row) for row in result}
+        for pid in ids:
+            self._remove(pid)
+            if pid in loaded:
+                self._add(loaded[pid])
+        self.version += 1
+        self.refreshes += 1
+
+    async def _load_categories(self, session: AsyncSession) -> List[dict]:
+        result = await session.execute(
+            select(*CATEGORY_COLUMNS)
+            .where(Category.is_visible == True)
+            .order_by(Category.sort_order.desc(), Category.id.asc())
+        )
+        return [
+            product_schemas.CategoryOut.model_validate(row).model_dump(mode="json")
+            for row in result
+        ]
+
+    def _add(self, product: dict) -> None:
+        self.products[product["id"]] = product
+        self._products_digest ^= _digest(product)
+        for key in (None, product["category_id"]):
+            bisect.insort(self._index.setdefault(key, []), product["id"])
+
+    def _remove(self, product_id: int) -> None:
+        product = self.products.pop(product_id, None)
+        if product is None:
+            return
+        self._products_digest ^= _digest(product)
+        for key in (None, product["category_id"]):
+            ids = self._index.get(key, [])
+            i = bisect.bisect_left(ids, product_id)
+            if i < len(ids) and ids[i] == product_id:
+                del ids[i]
+
+    def list_products(self, category_id: Optional[int], page: int, size: int) -> Tuple[List[dict], int]:
+        """
+        按 ID 倒序分页列出上架商品
+
+        Returns:
+            tuple: (当前页商品, 总数)
+        """
+        ids = self._index.get(category_id or None, [])
+        end = len(ids) - (page - 1) * size
+        start = max(end - size, 0)
+        if end <= 0:
+            return [], len(ids)
+        return [self.products[pid] for pid in reversed(ids[start:end])], len(ids)
+
+    def get_product(self, product_id: int) -> Optional[dict]:
+        return self.products.get(product_id)
+
+    def stats(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "version": self.version,
+            "categories": len(self.categories),
+            "products": len(self.products),
+            "rebuilds": self.rebuilds,
+            "refreshes": self.refreshes,
+            "pending_products": len(self._dirty_products),
+        }
+
+
+def _serialize_product(row: Any) -> dict:
+    return product_schemas.ProductOut.model_validate(row).model_dump(mode="json")
+
+
+def _digest(data: Any) -> int:
+    # 序列化结果的 128 位摘要 (键排序，与字典顺序无关)
+    encoded = json.dumps(data, sort_keys=True, separators=(",", ":"), ensure_ascii=False).encode()
+    return int.from_bytes(hashlib.blake2b(encoded, digest_size=16).digest(), "big")
+
+
+def snapshot_response(request: Request, data: Any) -> Response:
+    """
+    以快照数据构造响应 (带 ETag)
+
+    数据已是序列化后的格式，直接输出 JSON，跳过响应模型校验；
+    请求的 If-None-Match 与当前版本一致时返回 304。
+    """
+    headers = {"ETag": catalog.etag}
+    if request.headers.get("If-None-Match") == catalog.etag:
+        return Response(status_code=304, headers=headers)
+    return JSONResponse(success(data=data), headers=headers)
+
+
+catalog = Catalog(enabled=settings.CATALOG_SNAPSHOT, ttl=settings.CATALOG_TTL)
+metrics.register("catalog", catalog.stats)
+
+
+# --- 变更跟踪: 本进程内通过 ORM 提交的商品/分类变更 ---
+
+@event.listens_for(Session, "after_flush")
+def _after_flush(session: Session, flush_context) -> None:
+    for obj in (*session.new, *session.dirty, *session.deleted):
+        if isinstance(obj, Product):
+            session.info.setdefault("catalog_products", set()).add(obj.id)
+        elif isinstance(obj, Category):
+            session.info["catalog_categories"] = True
+
+
+@event.listens_for(Session, "after_commit")
+def _after_commit(session: Session) -> None:
+    product_ids = session.info.pop("catalog_products", None)
+    if product_ids:
+        catalog.mark_products(product_ids)
+    if session.info.pop("catalog_categories", False):
+        catalog.mark_categories()
+
+
+@event.listens_for(Session, "after_rollback")
+def _after_rollback(session: Session) -> None:
+    session.info.pop("catalog_products", None)
+    session.info.pop("catalog_categories", None)
@@ -0,0 +1,189 @@
+import asyncio
+from enum import Enum
+from typing import Any, Callable, Dict, List, NamedTuple, Optional
+
+from sqlalchemy import Select, event, func, select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from sqlalchemy.sql.util import find_tables
+
+from app.core import metrics
+from app.core.cache import TTLCache
+from app.core.config import settings
+
+
+class CountMode(str, Enum):
+    """
+    分页列表总数的统计方式
+
+    - exact: 精确 COUNT(*)，按筛选条件缓存，表有写入后失效
+    - estimate: 估算值，无筛选条件时取 pg_class.reltuples，否则取 EXPLAIN 的预估行数
+    - none: 不统计总数，只返回 has_more
+    """
+    EXACT = "exact"
+    ESTIMATE = "estimate"
+    NONE = "none"
+
+
+class Page(NamedTuple):
+    items: List[Any]
+    total: Optional[int]
+    has_more: bool
+
+
+# 精确总数缓存: (表版本, SQL, 参数) -> 总数
+count_cache = TTLCache(maxsize=settings.COUNT_CACHE_SIZE, ttl=settings.COUNT_CACHE_TTL)
+metrics.register("count_cache", count_cache.stats)
+
+# 表版本号: 表名 -> 版本，事务提交了对该表的写入后加一，旧版本的缓存随之失效。
+# 版本号只在当前进程内有效，其他 worker 的写入要等缓存 TTL 到期后才能看到
+_generations: Dict[str, int] = {}
+
+
+def _mark(session: Session, table_name: str) -> None:
+    session.info.setdefault("written_tables", set()).add(table_name)
+
+
+@event.listens_for(Session, "after_flush")
+def _after_flush(session: Session, flush_context) -> None:
+    for obj in (*session.new, *session.dirty, *session.deleted):
+        table = getattr(obj, "__table__", None)
+        if table is not None:
+            _mark(session, table.name)
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _on_execute(orm_execute_state) -> None:
+    # 批量 INSERT/UPDATE/DELETE 不经过 flush，在这里记录。
+    # 不改变任何列表筛选结果的语句 (如库存扣减) 可用 preserve_counts=True 跳过
+    if orm_execute_state.is_select:
+        return
+    if orm_execute_state.execution_options.get("preserve_counts"):
+        return
+    table = getattr(orm_execute_state.statement, "table", None)
+    if table is not None:
+        _mark(orm_execute_state.session, table.name)
+
+
+@event.listens_for(Session, "after_commit")
+def _after_commit(session: Session) -> None:
+    for name in session.info.pop("written_tables", ()):
+        _generations[name] = _generations.get(name, 0) + 1
+
+
+@event.listens_for(Session, "after_rollback")
+def _after_rollback(session: Session) -> None:
+    session.info.pop("written_tables", None)
+
+
+def _count_query(query: Select) -> Select:
+    return select(func.count()).select_from(query.order_by(None).subquery())
+
+
+def _hashable(value: Any) -> Any:
+    # 展开式 IN (如 column.in_([...])) 的参数是列表，转成元组才能作为缓存键
+    if isinstance(value, (list, tuple)):
+        return tuple(_hashable(v) for v in value)
+    return value
+
+
+def _cache_key(session: AsyncSession, query: Select) -> tuple:
+    compiled = query.compile(dialect=session.bind.dialect)
+    tables = sorted(t.name for t in find_tables(query, include_joins=True) if hasattr(t, "name"))
+    versions = tuple((name, _generations.get(name, 0)) for name in tables)
+    params = tuple(sorted((name, _hashable(value)) for name, value in compiled.params.items()))
+    return versions, str(compiled), params
+
+
+async def estimate_count(session: AsyncSession, query: Select) -> Optional[int]:
+    """
+    估算查询的结果行数 (不扫描数据)
+
+    无筛选条件时读取表的 pg_class.reltuples，否则读取 EXPLAIN 的预估行数。
+
+    Args:
+        session: 数据库会话
+        query: 列表查询 (未分页)
+
+    Returns:
+        int: 估算的行数，表从未 ANALYZE 时返回 None
+    """
+    froms = query.get_final_froms()
+    if query.whereclause is None and len(froms) == 1 and hasattr(froms[0], "fullname"):
+        result = await session.execute(
+            text("SELECT reltuples::bigint FROM pg_class WHERE oid = CAST(:name AS regclass)"),
+            {"name": froms[0].fullname},
+        )
+        estimate = result.scalar_one_or_none()
+        return estimate if estimate is not None and estimate >= 0 else None
+
+    # EXPLAIN 不支持绑定参数，筛选值以字面量编译 (由方言负责转义)
+    sql = str(query.order_by(None).compile(
+        dialect=session.bind.dialect, compile_kwargs={"literal_binds": True}
+    ))
+    connection = await session.connection()
+    result = await connection.exec_driver_sql(f"EXPLAIN (FORMAT JSON) {sql}")
+    plan = result.scalar_one()
+    return int(plan[0]["Plan"]["Plan Rows"])
+
+
+async def fetch_page(
+    session: AsyncSession,
+    query: Select,
+    page: int,
+    size: int,
+    mode: CountMode = CountMode.EXACT,
+    session_factory: Optional[Callable[[], AsyncSession]] = None,
+) -> Page:
+    """
+    查询一页数据及总数
+
+    exact 模式缓存未命中且提供了 session_factory 时，COUNT 在独立会话中与分页查询并发执行，
+    总耗时约等于两者中较慢的一个。每页多取一条用于判断 has_more。
+
+    Args:
+        session: 分页查询使用的会话
+        query: 已排序、未分页的列表查询
+        page: 页码 (从 1 开始)
+        size: 每页数量
+        mode: 总数统计方式
+        session_factory: 用于并发执行 COUNT 的会话工厂
+
+    Returns:
+        Page: (当前页记录, 总数, 是否还有下一页)
+    """
+    page_query = query.offset((page - 1) * size).limit(size + 1)
+
+    async def fetch_items() -> List[Any]:
+        result = await session.execute(page_query)
+        return list(result.scalars().all())
+
+    total = None
+    if mode == CountMode.EXACT:
+        key = _cache_key(session, query)
+        total = count_cache.get(key)
+        if total is None:
+            count_query = _count_query(query)
+
+            async def fetch_total() -> int:
+                started = asyncio.get_running_loop().time()
+                if session_factory is None:
+                    value = (await session.execute(count_query)).scalar_one()
+                else:
+                    async with session_factory() as count_session:
+                        value = (await count_session.execute(count_query)).scalar_one()
+                count_cache.record_load(asyncio.get_running_loop().time() - started)
+                return value
+
+            if session_factory is None:
+                total = await fetch_total()
+                items = await fetch_items()
+            else:
+                total, items = await asyncio.gather(fetch_total(), fetch_items())
+            count_cache.set(key, total)
+            return Page(items[:size], total, len(items) > size)
+    elif mode == CountMode.ESTIMATE:
+        total = await estimate_count(session, query)
+
+    items = await fetch_items()
+    return Page(items[:size], total, len(items) > size)
@@ -0,0 +1,137 @@
+import asyncio
+import logging
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Optional
+
+from fastapi import UploadFile
+
+from app.core.config import settings
+from app.services.storage import BaseStorage
+from app.utils.images import PROCESSABLE_EXTENSIONS, PROCESSABLE_TYPES, render_variants, variant_path
+
+logger = logging.getLogger(__name__)
+
+_executor: Optional[ProcessPoolExecutor] = None
+
+
+def get_executor() -> ProcessPoolExecutor:
+    """
+    缩略图进程池 (首次使用时创建)
+
+    使用 spawn 启动子进程: 不复制父进程的事件循环、线程和数据库连接
+    """
+    global _executor
+    if _executor is None:
+        _executor = ProcessPoolExecutor(
+            max_workers=settings.IMAGE_PROCESS_WORKERS,
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+    return _executor
+
+
+def shutdown() -> None:
+    """关闭进程池 (应用停止时调用)"""
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+
+
+def thumbnail_path(path: Optional[str], size: Optional[int] = None) -> Optional[str]:
+    """
+    获取图片指定尺寸的缩略图路径 (按命名规则，不检查文件是否存在，见 existing_thumbnail)
+
+    Args:
+        path: 原图存储路径
+        size: 缩略图尺寸，默认为商品列表尺寸 (IMAGE_LIST_SIZE)
+
+    Returns:
+        str: 缩略图路径；外部链接、不生成缩略图的文件类型、未配置该尺寸
+             或早于 IMAGE_VARIANTS_SINCE 上传的图片返回 None
+    """
+    size = size or settings.IMAGE_LIST_SIZE
+    if not path or path.startswith("http") or size not in settings.IMAGE_VARIANT_SIZES:
+        return None
+    if os.path.splitext(path)[1].lower() not in PROCESSABLE_EXTENSIONS:
+        return None
+    if settings.IMAGE_VARIANTS_SINCE and _upload_date(path) < settings.IMAGE_VARIANTS_SINCE:
+        return None
+    return variant_path(path, size, settings.IMAGE_VARIANT_FORMAT)
+
+
+def _upload_date(path: str) -> str:
+    # 路径格式: {folder}/{type_folder}/{YYYYMMDD}/{HHMMSS}_{uuid}{ext}
+    parts = path.split("/")
+    return parts[-2] if len(parts) >= 2 and parts[-2].isdigit() else ""
+
+
+async def create_variants(storage: BaseStorage, file: UploadFile, path: str) -> Dict[int, str]:
+    """
+    为上传的图片生成缩略图，保存在原图旁边
+
+    缩放和编码在进程池中执行，不占用事件循环和上传线程池。
+    非图片、超过 IMAGE_MAX_BYTES 或无法解析的图片不生成缩略图，上传本身不受影响。
+
+    Args:
+        storage: 存储后端
+        file: 已上传的文件
+        path: 原图存储路径
+
+    Returns:
+        dict: {尺寸: 缩略图路径}
+    """
+    sizes = settings.IMAGE_VARIANT_SIZES
+    if not sizes or file.content_type not in PROCESSABLE_TYPES:
+        return {}
+    if file.size is not None and file.size > settings.IMAGE_MAX_BYTES:
+        return {}
+
+    await file.seek(0)
+    data = await file.read()
+    fmt = settings.IMAGE_VARIANT_FORMAT
+    try:
+        rendered = await asyncio.get_running_loop().run_in_executor(
+            get_executor(), render_variants, data, sizes, fmt, settings.IMAGE_VARIANT_QUALITY
+        )
+    except Exception:
+        logger.warning("Failed to create thumbnails for %s", path, exc_info=True)
+        return {}
+
+    content_type = f"image/{fmt}"
+    paths = {size: variant_path(path, size, fmt) for size in rendered}
+    results = await asyncio.gather(*(
+        storage.put_bytes(paths[size], content, content_type) for size, content in rendered.items()
+    ), return_exceptions=True)
+    # 保存失败的尺寸不返回，原图已上传成功
+    for size, result in zip(list(rendered), results):
+        if isinstance(result, Exception):
+            logger.warning("Failed to store %spx thumbnail for %s", size, path, exc_info=result)
+            del paths[size]
+    return paths
+
+
+async def existing_thumbnail(storage: BaseStorage, path: Optional[str], size: Optional[int] = None) -> Optional[str]:
+    """
+    获取图片已生成的缩略图路径 (保存商品图片时调用，结果随商品保存)
+
+    缩略图按命名规则保存在原图旁边，但类型不支持、超过大小限制、无法解析或保存失败的图片没有缩略图，
+    因此需要确认文件确实存在。
+
+    Args:
+        storage: 存储后端
+        path: 原图存储路径
+        size: 缩略图尺寸，默认为商品列表尺寸 (IMAGE_LIST_SIZE)
+
+    Returns:
+        str: 缩略图路径，没有缩略图或无法确认时返回 None (使用原图)
+    """
+    candidate = thumbnail_path(path, size)
+    if candidate is None:
+        return None
+    try:
+        return candidate if await storage.exists(candidate) else None
+    except Exception:
+        logger.warning("Failed to check thumbnail %s", candidate, exc_info=True)
+        return None
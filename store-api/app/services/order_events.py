@@ -0,0 +1,183 @@
+import asyncio
+import json
+import logging
+from typing import Any, AsyncIterator, Awaitable, Callable, List, Optional, Set
+
+import asyncpg
+from sqlalchemy import Text, bindparam, func, select
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core import metrics
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# 订阅者的队列溢出 (消费过慢) 时放入的结束标记，推送连接随即断开，由客户端重连
+_OVERFLOW = None
+
+
+async def _connect() -> asyncpg.Connection:
+    # LISTEN 需要独占一个连接，不占用连接池
+    dsn = str(settings.SQLALCHEMY_DATABASE_URI).replace("postgresql+asyncpg://", "postgresql://", 1)
+    return await asyncpg.connect(dsn, timeout=settings.DB_CONNECT_TIMEOUT)
+
+
+async def notify(session: AsyncSession, events: List[dict]) -> None:
+    """
+    发布订单事件 (与业务变更在同一事务中，由调用方提交)
+
+    通过 pg_notify 发送，PostgreSQL 在事务提交后才投递，回滚的变更不会产生事件；
+    所有 worker (包括发布者自己) 的监听连接都会收到，再分发给各自的订阅者。
+    多个事件用一条 SELECT pg_notify(...) FROM unnest(...) 发送。
+
+    Args:
+        session: 数据库会话 (调用方负责提交)
+        events: 事件列表，每个事件包含 type 和 order_id
+    """
+    if not events:
+        return
+    payloads = func.unnest(
+        bindparam("payloads", [json.dumps(event, ensure_ascii=False, default=str) for event in events], type_=ARRAY(Text))
+    ).column_valued("payload")
+    await session.execute(select(func.pg_notify(settings.ORDER_EVENTS_CHANNEL, payloads)))
+
+
+class OrderEventBroker:
+    """
+    订单事件的进程内发布/订阅
+
+    - 每个 worker 用一个独立连接 LISTEN 订单事件频道，收到的事件分发给本进程的所有订阅者
+      (每个商家端推送连接一个有界队列)
+    - 订阅者消费过慢、队列写满时断开该订阅者，由客户端重连后重新拉取列表，不影响其他订阅者
+    - 监听连接断开后自动重连，重连成功时向订阅者发送 resync 事件，提示断线期间可能漏掉了事件
+    - 由应用生命周期启动和停止 (main.py)
+
+    Args:
+        channel: 通知频道
+        queue_size: 每个订阅者缓存的事件数
+        connect: 创建监听连接的函数 (测试用)
+    """
+    def __init__(
+        self,
+        channel: Optional[str] = None,
+        queue_size: Optional[int] = None,
+        connect: Callable[[], Awaitable[asyncpg.Connection]] = _connect,
+    ):
+        self.channel = channel or settings.ORDER_EVENTS_CHANNEL
+        self.queue_size = queue_size or settings.ORDER_EVENTS_QUEUE_SIZE
+        self.connect = connect
+        self.subscribers: Set[asyncio.Queue] = set()
+        self.listening = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self.received = 0
+        self.dropped = 0
+        self.reconnects = 0
+
+    def subscribe(self) -> asyncio.Queue:
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size + 1)
+        self.subscribers.add(queue)
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue) -> None:
+        self.subscribers.discard(queue)
+
+    def dispatch(self, event: dict) -> None:
+        """将事件放入本进程所有订阅者的队列"""
+        for queue in list(self.subscribers):
+            if queue.qsize() >= self.queue_size:
+                # 预留的最后一个位置放结束标记
+                self.unsubscribe(queue)
+                queue.put_nowait(_OVERFLOW)
+                self.dropped += 1
+                continue
+            queue.put_nowait(event)
+
+    def _on_notification(self, connection: Any, pid: int, channel: str, payload: str) -> None:
+        try:
+            event = json.loads(payload)
+        except ValueError:
+            logger.warning("Ignored malformed order event: %r", payload)
+            return
+        self.received += 1
+        self.dispatch(event)
+
+    async def run_listener(self) -> None:
+        """后台任务: 保持 LISTEN 连接，断开后稍后重连"""
+        first = True
+        while True:
+            connection = None
+            try:
+                connection = await self.connect()
+                closed = asyncio.Event()
+                connection.add_termination_listener(lambda _: closed.set())
+                await connection.add_listener(self.channel, self._on_notification)
+                self.listening.set()
+                if not first:
+                    self.reconnects += 1
+                    self.dispatch({"type": "resync"})
+                first = False
+                await closed.wait()
+                logger.warning("Order event listener connection closed, reconnecting")
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.warning("Order event listener failed, retrying", exc_info=True)
+            finally:
+                self.listening.clear()
+                if connection is not None and not connection.is_closed():
+                    await connection.close()
+            await asyncio.sleep(settings.ORDER_EVENTS_RETRY_INTERVAL)
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self.run_listener())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def stream(self) -> AsyncIterator[str]:
+        """
+        Server-Sent Events 格式的事件流 (每个推送连接一个)
+
+        连接建立时先发送重连间隔，空闲时定期发送注释行保持连接 (避免被代理超时断开)。
+        客户端断开时 Starlette 取消该生成器，随即取消订阅。
+        """
+        queue = self.subscribe()
+        try:
+            yield f"retry: {settings.ORDER_EVENTS_CLIENT_RETRY_MS}\n\n"
+            while True:
+                try:
+                    event = await asyncio.wait_for(queue.get(), settings.ORDER_EVENTS_HEARTBEAT)
+                except asyncio.TimeoutError:
+                    yield ": ping\n\n"
+                    continue
+                if event is _OVERFLOW:
+                    return
+                yield format_event(event)
+        finally:
+            self.unsubscribe(queue)
+
+    def stats(self) -> dict:
+        return {
+            "listening": self.listening.is_set(),
+            "subscribers": len(self.subscribers),
+            "received": self.received,
+            "dropped": self.dropped,
+            "reconnects": self.reconnects,
+        }
+
+
+def format_event(event: dict) -> str:
+    """编码为一条 SSE 消息 (event 为事件类型，data 为 JSON)"""
+    return f"event: {event.get('type', 'message')}\ndata: {json.dumps(event, ensure_ascii=False, default=str)}\n\n"
+
+
+broker = OrderEventBroker()
+metrics.register("order_events", broker.stats)
@@ -0,0 +1,159 @@
+import asyncio
+import logging
+import os
+import socket
+import uuid
+import zlib
+from datetime import datetime, timedelta
+from typing import Optional, Tuple
+from zoneinfo import ZoneInfo
+
+from sqlalchemy import delete, func, select, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core import metrics
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.models.order import OrderNoWorkerLease
+from app.utils.order_no import OrderNoGenerator
+
+logger = logging.getLogger(__name__)
+
+# 租用 worker id 时持有的事务级咨询锁，避免并发启动的进程选中同一个空闲编号
+LEASE_LOCK_ID = zlib.crc32(b"order_no_worker_leases")
+
+
+def _default_worker_id() -> int:
+    if settings.ORDER_NO_WORKER_ID is not None:
+        return settings.ORDER_NO_WORKER_ID
+    # 未从数据库租用编号前 (脚本、测试) 按进程号区分
+    return os.getpid() % settings.ORDER_NO_WORKERS
+
+
+def prefix_utc_offset() -> int:
+    """
+    订单号时间前缀的固定偏移 (秒): 门店时区的标准时间，不含夏令时
+
+    夏令时的偏移比标准时间大，取一年中冬夏两个时点的较小值即为标准时间偏移。
+    """
+    tz = ZoneInfo(settings.SHOP_TIMEZONE)
+    year = datetime.now(tz).year
+    return int(min(datetime(year, month, 1, tzinfo=tz).utcoffset() for month in (1, 7)).total_seconds())
+
+
+def _new_generator(worker_id: int) -> OrderNoGenerator:
+    return OrderNoGenerator(worker_id, settings.ORDER_NO_MAX_CLOCK_SKEW_MS, utc_offset=prefix_utc_offset())
+
+
+generator = _new_generator(_default_worker_id())
+# 当前持有的租约 (worker id, 持有者)，使用固定 ORDER_NO_WORKER_ID 时为空
+lease: Optional[Tuple[int, str]] = None
+
+
+def next_order_no() -> str:
+    """
+    生成订单号
+
+    Raises:
+        ClockSkewError: 系统时钟回拨超过 ORDER_NO_MAX_CLOCK_SKEW_MS
+    """
+    return generator.next()
+
+
+def _lease_expires_at():
+    return func.now() + timedelta(seconds=settings.ORDER_NO_LEASE_TTL)
+
+
+async def assign_worker_id(session: AsyncSession) -> int:
+    """
+    为当前进程租用 worker id (应用启动时调用，调用方提交事务)
+
+    未配置 ORDER_NO_WORKER_ID 时，在 order_no_worker_leases 表中租用 [0, ORDER_NO_WORKERS)
+    内最小的未被占用 (无租约或租约已到期) 的编号。进程需通过 run_lease_renewer 定期续约，
+    退出时调用 release_worker_id 归还；异常退出的进程在租约到期后编号被回收。
+
+    Args:
+        session: 数据库会话 (需连接主库)
+
+    Returns:
+        int: worker id
+
+    Raises:
+        RuntimeError: 所有编号都被占用 (同时运行的进程超过 ORDER_NO_WORKERS 个)
+    """
+    global generator, lease
+    worker_id = settings.ORDER_NO_WORKER_ID
+    if worker_id is None:
+        await session.execute(select(func.pg_advisory_xact_lock(LEASE_LOCK_ID)))
+        held = set((await session.execute(
+            select(OrderNoWorkerLease.worker_id).where(OrderNoWorkerLease.expires_at > func.now())
+        )).scalars())
+        worker_id = next((i for i in range(settings.ORDER_NO_WORKERS) if i not in held), None)
+        if worker_id is None:
+            raise RuntimeError(f"All {settings.ORDER_NO_WORKERS} order number worker ids are leased")
+        holder = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        await session.execute(
+            insert(OrderNoWorkerLease)
+            .values(worker_id=worker_id, holder=holder, expires_at=_lease_expires_at())
+            .on_conflict_do_update(
+                index_elements=[OrderNoWorkerLease.worker_id],
+                set_={"holder": holder, "expires_at": _lease_expires_at()},
+            )
+        )
+        lease = (worker_id, holder)
+    generator = _new_generator(worker_id)
+    logger.info("Order number worker id: %s", worker_id)
+    return worker_id
+
+
+async def renew_worker_id(session: AsyncSession) -> bool:
+    """
+    续约当前持有的 worker id (调用方提交事务)
+
+    Returns:
+        bool: 续约成功；租约已到期并被其他进程租用时返回 False
+    """
+    if lease is None:
+        return True
+    worker_id, holder = lease
+    result = await session.execute(
+        update(OrderNoWorkerLease)
+        .where(OrderNoWorkerLease.worker_id == worker_id, OrderNoWorkerLease.holder == holder)
+        .values(expires_at=_lease_expires_at())
+    )
+    return result.rowcount == 1
+
+
+async def release_worker_id(session: AsyncSession) -> None:
+    """归还当前持有的 worker id (应用退出时调用，调用方提交事务)"""
+    global lease
+    if lease is None:
+        return
+    worker_id, holder = lease
+    await session.execute(
+        delete(OrderNoWorkerLease)
+        .where(OrderNoWorkerLease.worker_id == worker_id, OrderNoWorkerLease.holder == holder)
+    )
+    lease = None
+
+
+async def run_lease_renewer() -> None:
+    """后台任务: 每 1/3 租约有效期续约一次，租约丢失 (长时间未能续约) 时重新租用编号"""
+    while True:
+        await asyncio.sleep(settings.ORDER_NO_LEASE_TTL / 3)
+        try:
+            async with SessionLocal() as session:
+                if not await renew_worker_id(session):
+                    logger.error("Order number worker id %s lease lost, leasing a new one", generator.worker_id)
+                    await assign_worker_id(session)
+                await session.commit()
+        except Exception:
+            logger.exception("Failed to renew order number worker id lease")
+
+
+def stats() -> dict:
+    return {"worker_id": generator.worker_id, "issued": generator.issued, "skewed": generator.skewed}
+
+
+metrics.register("order_no", stats)
@@ -0,0 +1,246 @@
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from sqlalchemy import BigInteger, any_, bindparam, insert, select, tuple_, update
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.order import Order, OrderTimeline
+from app.services import order_events, sales_rollup
+
+# 订单状态
+PENDING_PAYMENT = 0   # 待支付
+PENDING_ACCEPT = 1    # 待接单 (配送单)
+PENDING_PICKUP = 2    # 待自提 (自提单) / 待发货
+DELIVERING = 3        # 配送中
+COMPLETED = 4         # 已完成
+CANCELLED = -1        # 已取消 / 已拒单
+
+DELIVERY_TYPES = ("delivery", "pickup")
+
+
+class Transition(NamedTuple):
+    """
+    状态流转规则
+
+    Attributes:
+        sources: 允许流转的当前状态
+        target: 流转后的状态
+        delivery_type: 仅适用于该配送方式 (None 表示不限)
+        invalid_msg: 当前状态不允许流转时的提示
+    """
+    sources: Tuple[int, ...]
+    target: int
+    delivery_type: Optional[str]
+    invalid_msg: str
+
+
+TRANSITIONS: Dict[str, Transition] = {
+    "cancel": Transition((PENDING_PAYMENT, PENDING_ACCEPT, PENDING_PICKUP), CANCELLED, None, "当前订单状态不可取消"),
+    "accept": Transition((PENDING_ACCEPT,), DELIVERING, None, "当前订单状态不可操作"),
+    "reject": Transition((PENDING_ACCEPT,), CANCELLED, None, "当前订单状态不可操作"),
+    "complete_delivery": Transition((DELIVERING,), COMPLETED, None, "订单不是配送中状态"),
+    "verify": Transition((PENDING_PICKUP,), COMPLETED, "pickup", "订单状态不满足核销条件"),
+}
+
+# 预先展开的查表结构，运行时不再构造字典
+# (当前状态, 配送方式, 事件) -> 目标状态
+TRANSITION_TABLE: Dict[Tuple[int, str, str], int] = {
+    (source, delivery_type, event): rule.target
+    for event, rule in TRANSITIONS.items()
+    for source in rule.sources
+    for delivery_type in DELIVERY_TYPES
+    if rule.delivery_type in (None, delivery_type)
+}
+
+# 事件 -> 允许的 (当前状态, 配送方式)，由 TRANSITION_TABLE 生成，作为条件更新的 WHERE 条件
+EVENT_SOURCES: Dict[str, List[Tuple[int, str]]] = {
+    event: sorted((source, delivery_type) for source, delivery_type, e in TRANSITION_TABLE if e == event)
+    for event in TRANSITIONS
+}
+
+# (状态, 配送方式) -> 状态文案
+STATUS_TEXT: Dict[Tuple[int, str], str] = {
+    (status, delivery_type): text
+    for delivery_type in DELIVERY_TYPES
+    for status, text in (
+        (PENDING_PAYMENT, "待支付"),
+        (PENDING_ACCEPT, "待接单"),
+        (PENDING_PICKUP, "待自提" if delivery_type == "pickup" else "待发货"),
+        (DELIVERING, "配送中"),
+        (COMPLETED, "已完成"),
+        (CANCELLED, "已取消"),
+    )
+}
+
+
+def status_text(status: int, delivery_type: str) -> str:
+    """
+    订单状态文案
+
+    Args:
+        status: 订单状态
+        delivery_type: 配送方式
+
+    Returns:
+        str: 状态文案，未知状态返回 "未知状态"
+    """
+    return STATUS_TEXT.get((status, delivery_type), "未知状态")
+
+
+def can_transition(status: int, delivery_type: str, event: str) -> bool:
+    """判断订单当前是否允许发生该事件"""
+    return (status, delivery_type, event) in TRANSITION_TABLE
+
+
+def initial_status(delivery_type: str) -> int:
+    """下单 (模拟支付) 后的初始状态: 配送单待接单，自提单待自提"""
+    return PENDING_ACCEPT if delivery_type == "delivery" else PENDING_PICKUP
+
+
+def status_changed_event(order_id: int, event: str, status: int) -> dict:
+    """订单状态变更事件 (推送给商家端，见 order_events)"""
+    return {"type": "order_status_changed", "order_id": order_id, "event": event, "status": status}
+
+
+class TransitionError(Exception):
+    """
+    订单状态流转失败
+
+    Attributes:
+        status: 订单当前状态 (订单不存在时为 None)
+    """
+    def __init__(self, status: Optional[int], message: str):
+        super().__init__(message)
+        self.status = status
+
+
+def _conditions(event: str) -> list:
+    # 与 can_transition 使用同一张表，数据库中的校验与内存中的判断一致
+    return [tuple_(Order.status, Order.delivery_type).in_(EVENT_SOURCES[event])]
+
+
+async def transition(
+    session: AsyncSession,
+    event: str,
+    *criteria: Any,
+    values: Optional[dict] = None,
+    timeline_status: str,
+    timeline_remark: Optional[str] = None,
+    returning: Iterable[Any] = (),
+) -> Any:
+    """
+    执行单个订单的状态流转 (条件更新)
+
+    状态校验放在 UPDATE ... WHERE status IN (...) 中，一次往返完成校验和变更，
+    并发请求中只有一个能成功，不存在 "先查后改" 的竞态窗口。
+    只有更新失败时才额外查询一次，用于区分订单不存在和状态不允许。
+    时间轴记录加入会话，由调用方提交；订单完成时同时累加经营汇总 (sales_rollup)，
+    并发布状态变更事件 (提交后推送给商家端)。
+
+    Args:
+        session: 数据库会话 (调用方负责提交)
+        event: 事件名称 (见 TRANSITIONS)
+        *criteria: 定位订单的条件，如 Order.id == order_id
+        values: 除状态外需要同时更新的字段
+        timeline_status: 时间轴状态描述
+        timeline_remark: 时间轴备注
+        returning: 需要返回的其他列
+
+    Returns:
+        Row: 更新后的行 (id 及 returning 指定的列)
+
+    Raises:
+        TransitionError: 订单不存在或当前状态不允许该事件
+    """
+    rule = TRANSITIONS[event]
+    result = await session.execute(
+        update(Order)
+        .where(*criteria, *_conditions(event))
+        .values(status=rule.target, **(values or {}))
+        .returning(Order.id, *returning)
+        .execution_options(synchronize_session=False)
+    )
+    row = result.first()
+    if row is None:
+        # 自提码会被复用，按最近的订单给出原因
+        current = (await session.execute(
+            select(Order.status).where(*criteria).order_by(Order.id.desc()).limit(1)
+        )).scalar_one_or_none()
+        raise TransitionError(current, "订单不存在" if current is None else rule.invalid_msg)
+    session.add(OrderTimeline(order_id=row.id, status=timeline_status, remark=timeline_remark))
+    if rule.target == COMPLETED:
+        await sales_rollup.record_completed(session, [row.id])
+    await order_events.notify(session, [status_changed_event(row.id, event, rule.target)])
+    return row
+
+
+async def transition_many(
+    session: AsyncSession,
+    event: str,
+    order_ids: List[int],
+    *,
+    values: Optional[dict] = None,
+    timeline_status: str,
+    timeline_remark: Optional[str] = None,
+) -> dict:
+    """
+    批量执行状态流转
+
+    一条 UPDATE ... WHERE id = ANY(:ids) AND status IN (...) RETURNING id 同时完成校验和变更，
+    再用一条批量 INSERT 写入时间轴；只有存在失败的订单时才额外查询失败原因。
+
+    Args:
+        session: 数据库会话 (调用方负责提交)
+        event: 事件名称 (见 TRANSITIONS)
+        order_ids: 订单ID列表
+        values: 除状态外需要同时更新的字段
+        timeline_status: 时间轴状态描述
+        timeline_remark: 时间轴备注
+
+    Returns:
+        dict: 每个订单的处理结果及成功/失败数量，updated 为成功的订单ID列表
+    """
+    rule = TRANSITIONS[event]
+    ids = list(dict.fromkeys(order_ids))
+    result = await session.execute(
+        update(Order)
+        .where(Order.id == any_(bindparam("ids", ids, type_=ARRAY(BigInteger))), *_conditions(event))
+        .values(status=rule.target, **(values or {}))
+        .returning(Order.id)
+        .execution_options(synchronize_session=False)
+    )
+    updated = set(result.scalars().all())
+    if updated:
+        await session.execute(insert(OrderTimeline.__table__), [
+            {"order_id": order_id, "status": timeline_status, "remark": timeline_remark}
+            for order_id in ids if order_id in updated
+        ])
+        if rule.target == COMPLETED:
+            await sales_rollup.record_completed(session, sorted(updated))
+        await order_events.notify(session, [
+            status_changed_event(order_id, event, rule.target) for order_id in ids if order_id in updated
+        ])
+
+    failed = [order_id for order_id in ids if order_id not in updated]
+    existing = set()
+    if failed:
+        result = await session.execute(
+            select(Order.id).where(Order.id == any_(bindparam("ids", failed, type_=ARRAY(BigInteger))))
+        )
+        existing = set(result.scalars().all())
+
+    results = []
+    for order_id in ids:
+        if order_id in updated:
+            msg = "操作成功"
+        elif order_id in existing:
+            msg = rule.invalid_msg
+        else:
+            msg = "订单不存在"
+        results.append({"order_id": order_id, "success": order_id in updated, "msg": msg})
+    return {
+        "results": results,
+        "succeeded": len(updated),
+        "failed": len(failed),
+        "updated": [order_id for order_id in ids if order_id in updated],
+    }
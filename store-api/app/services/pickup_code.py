@@ -0,0 +1,75 @@
+import secrets
+from typing import Any, Tuple
+
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core import metrics
+from app.core.config import settings
+from app.models.order import ACTIVE_PICKUP_CODE, Order
+
+
+class PickupCodeError(Exception):
+    """多次尝试后仍未分配到空闲的自提码"""
+
+
+def generate_code() -> str:
+    """随机生成 6 位自提码 (不可预测，避免被猜出其他订单的码)"""
+    return str(100000 + secrets.randbelow(900000))
+
+
+class PickupCodeAllocator:
+    """
+    自提码分配
+
+    - 唯一性由部分唯一索引 uq_orders_active_pickup_code 保证，只约束未完结的订单，
+      订单完成或取消后其自提码自动回收，无需额外维护码池
+    - 分配时不查询已占用的码: INSERT ... ON CONFLICT DO NOTHING RETURNING id，
+      冲突时换一个随机码重试，不会使事务失败
+    - 占用率为 p 时平均尝试 1 / (1 - p) 次，只取决于占用率，与未完结订单总数无关
+    """
+    def __init__(self):
+        self.allocations = 0
+        self.attempts = 0
+        self.exhausted = 0
+
+    async def insert_order(self, session: AsyncSession, **values: Any) -> Tuple[int, str]:
+        """
+        插入自提订单并分配自提码
+
+        Args:
+            session: 数据库会话 (调用方负责提交)
+            **values: 订单字段 (不含 pickup_code)
+
+        Returns:
+            tuple: (订单ID, 自提码)
+
+        Raises:
+            PickupCodeError: 连续 PICKUP_CODE_ATTEMPTS 次冲突
+        """
+        for _ in range(settings.PICKUP_CODE_ATTEMPTS):
+            code = generate_code()
+            self.attempts += 1
+            result = await session.execute(
+                insert(Order)
+                .values(pickup_code=code, **values)
+                .on_conflict_do_nothing(index_elements=[Order.pickup_code], index_where=ACTIVE_PICKUP_CODE)
+                .returning(Order.id)
+            )
+            order_id = result.scalar_one_or_none()
+            if order_id is not None:
+                self.allocations += 1
+                return order_id, code
+        self.exhausted += 1
+        raise PickupCodeError(f"No free pickup code after {settings.PICKUP_CODE_ATTEMPTS} attempts")
+
+    def stats(self) -> dict:
+        return {
+            "allocations": self.allocations,
+            "attempts_per_allocation": round(self.attempts / self.allocations, 3) if self.allocations else None,
+            "exhausted": self.exhausted,
+        }
+
+
+allocator = PickupCodeAllocator()
+metrics.register("pickup_code", allocator.stats)
@@ -0,0 +1,307 @@
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
+from typing import Any, List, Optional, Tuple
+from zoneinfo import ZoneInfo
+
+from sqlalchemy import BigInteger, Date, SmallInteger, any_, bindparam, cast, func, literal, select
+from sqlalchemy.dialects.postgresql import ARRAY, insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.models.order import Order, OrderItem
+from app.models.stats import DailySalesRollup, HourlySalesRollup, ProductSalesRollup
+
+_COUNTERS = ("order_count", "completed_count", "sales_amount")
+_PRODUCT_COUNTERS = ("quantity", "sales_amount", "order_count")
+# 单次查询的最大天数
+MAX_RANGE_DAYS = {"day": 366, "hour": 31}
+
+
+class StatsRangeError(Exception):
+    """统计查询的日期区间无效或超过上限"""
+
+
+def shop_timezone() -> ZoneInfo:
+    return ZoneInfo(settings.SHOP_TIMEZONE)
+
+
+def local_today() -> date:
+    """门店时区的今天"""
+    return datetime.now(shop_timezone()).date()
+
+
+def day_bounds(start: date, end: Optional[date] = None) -> Tuple[datetime, datetime]:
+    """
+    日期区间 [start, end) 对应的时间范围 (门店时区的零点)
+
+    用于直接比较 created_at 的可走索引查询 (created_at >= 起点 AND created_at < 终点)，
+    代替对每一行计算 date(created_at)。按时区计算零点，夏令时切换的日期也不会错位。
+
+    Args:
+        start: 起始日期 (包含)
+        end: 结束日期 (不包含)，默认为 start 的下一天
+
+    Returns:
+        Tuple[datetime, datetime]: 带时区的起止时间
+    """
+    tz = shop_timezone()
+    end = end or start + timedelta(days=1)
+    return datetime.combine(start, time(), tz), datetime.combine(end, time(), tz)
+
+
+def local_day(column: Any) -> Any:
+    """SQL 表达式: 时间列在门店时区下的日期"""
+    return cast(func.timezone(settings.SHOP_TIMEZONE, column), Date)
+
+
+def local_hour(column: Any) -> Any:
+    """SQL 表达式: 时间列在门店时区下的小时 (0-23)"""
+    return cast(func.extract("hour", func.timezone(settings.SHOP_TIMEZONE, column)), SmallInteger)
+
+
+def _shard(order_id: Any) -> Any:
+    return order_id % settings.SALES_ROLLUP_SHARDS
+
+
+def _upsert(model: Any, stmt: Any, counters: Tuple[str, ...] = _COUNTERS) -> Any:
+    # 同一主键已有记录时累加计数列
+    set_ = {name: getattr(model, name) + getattr(stmt.excluded, name) for name in counters}
+    if model is ProductSalesRollup:
+        set_["product_name"] = stmt.excluded.product_name
+    return stmt.on_conflict_do_update(index_elements=list(model.__table__.primary_key), set_=set_)
+
+
+async def record_created(session: AsyncSession, order_id: int) -> None:
+    """
+    下单时累加当天和当前小时的下单数 (与订单在同一事务中，由调用方提交)
+
+    订单的 created_at 默认值与 now() 同为事务开始时间，直接按 now() 归属日期和小时。
+    每日和每小时汇总通过 WITH 合并为一条语句。
+    """
+    now = func.now()
+    counters = dict(order_count=1, completed_count=0, sales_amount=0)
+    daily = _upsert(DailySalesRollup, insert(DailySalesRollup).values(
+        day=local_day(now), shard=_shard(order_id), **counters,
+    )).cte("daily")
+    hourly = _upsert(HourlySalesRollup, insert(HourlySalesRollup).values(
+        day=local_day(now), hour=local_hour(now), shard=_shard(order_id), **counters,
+    ))
+    await session.execute(hourly.add_cte(daily))
+
+
+async def record_completed(session: AsyncSession, order_ids: List[int]) -> None:
+    """
+    订单完成时累加已完成订单数、销售额和商品销量 (由 order_state 在状态流转后调用)
+
+    按订单的下单时间归属，即 "某天的销售额" 为当天下单且已完成的订单实付金额；
+    商品销量取订单明细快照 (单价 × 数量，不含已移除的明细)。
+    每日、每小时和商品汇总通过 WITH 合并为一条 INSERT ... SELECT ... ON CONFLICT DO UPDATE，
+    各表按主键排序写入，并发的批量操作以相同顺序加锁，不会互相死锁。
+
+    Args:
+        session: 数据库会话 (调用方负责提交)
+        order_ids: 刚完成的订单ID
+    """
+    if not order_ids:
+        return
+    done = (
+        select(Order.id, Order.created_at, Order.final_amount)
+        .where(Order.id == any_(bindparam("ids", order_ids, type_=ARRAY(BigInteger))))
+        .cte("done")
+    )
+    day = local_day(done.c.created_at).label("day")
+    hour = local_hour(done.c.created_at).label("hour")
+    shard = _shard(done.c.id).label("shard")
+    sums = (literal(0), func.count(), func.sum(done.c.final_amount))
+
+    daily = _upsert(DailySalesRollup, insert(DailySalesRollup).from_select(
+        ["day", "shard", *_COUNTERS],
+        select(day, shard, *sums).group_by(day, shard).order_by(day, shard),
+    )).cte("daily")
+    hourly = _upsert(HourlySalesRollup, insert(HourlySalesRollup).from_select(
+        ["day", "hour", "shard", *_COUNTERS],
+        select(day, hour, shard, *sums).group_by(day, hour, shard).order_by(day, hour, shard),
+    )).cte("hourly")
+    products = (
+        select(
+            day, OrderItem.product_id, func.max(OrderItem.product_name),
+            func.sum(OrderItem.quantity), func.sum(OrderItem.price * OrderItem.quantity),
+            func.count(func.distinct(OrderItem.order_id)),
+        )
+        .select_from(done.join(OrderItem, OrderItem.order_id == done.c.id))
+        .where(OrderItem.is_removed.is_(False), OrderItem.product_id.is_not(None))
+        .group_by(day, OrderItem.product_id)
+        .order_by(day, OrderItem.product_id)
+    )
+    stmt = _upsert(ProductSalesRollup, insert(ProductSalesRollup).from_select(
+        ["day", "product_id", "product_name", *_PRODUCT_COUNTERS], products,
+    ), _PRODUCT_COUNTERS)
+    await session.execute(stmt.add_cte(daily, hourly))
+
+
+async def record_completed_change(
+    session: AsyncSession,
+    order_id: int,
+    created_at: datetime,
+    amount_delta: Decimal,
+    items: List[dict],
+) -> None:
+    """
+    已完成订单的商品被修改时调整汇总
+
+    Args:
+        session: 数据库会话 (调用方负责提交)
+        order_id: 订单ID
+        created_at: 订单下单时间
+        amount_delta: 实付金额变化 (修改后 - 修改前)
+        items: 商品销量变化，每项包含 product_id, product_name, quantity, sales_amount, order_count
+    """
+    local = created_at.astimezone(shop_timezone())
+    if amount_delta:
+        counters = dict(order_count=0, completed_count=0, sales_amount=amount_delta)
+        daily = _upsert(DailySalesRollup, insert(DailySalesRollup).values(
+            day=local.date(), shard=_shard(order_id), **counters,
+        )).cte("daily")
+        await session.execute(_upsert(HourlySalesRollup, insert(HourlySalesRollup).values(
+            day=local.date(), hour=local.hour, shard=_shard(order_id), **counters,
+        )).add_cte(daily))
+    items = sorted(
+        (item for item in items if any(item[name] for name in _PRODUCT_COUNTERS)),
+        key=lambda item: item["product_id"],
+    )
+    if items:
+        await session.execute(_upsert(ProductSalesRollup, insert(ProductSalesRollup).values([
+            {"day": local.date(), **item} for item in items
+        ]), _PRODUCT_COUNTERS))
+
+
+def totals(start: date, end: Optional[date] = None) -> Any:
+    """
+    日期区间 [start, end) 的汇总查询 (子查询，可与其他查询合并为一条语句)
+
+    列: order_count, completed_count, sales_amount，无数据时为 0
+    """
+    end = end or start + timedelta(days=1)
+    return (
+        select(*(func.coalesce(func.sum(getattr(DailySalesRollup, name)), 0).label(name) for name in _COUNTERS))
+        .where(DailySalesRollup.day >= start, DailySalesRollup.day < end)
+        .subquery("totals")
+    )
+
+
+async def summary(session: AsyncSession, start: date, end: Optional[date] = None) -> dict:
+    """
+    日期区间 [start, end) 的下单数、已完成订单数和销售额
+
+    Args:
+        session: 数据库会话
+        start: 起始日期 (包含，门店时区)
+        end: 结束日期 (不包含)，默认为 start 的下一天
+
+    Returns:
+        dict: order_count, completed_count, sales_amount
+    """
+    row = (await session.execute(select(totals(start, end)))).one()
+    return dict(row._mapping)
+
+
+def _check_range(start: date, end: date, max_days: int) -> None:
+    if end <= start:
+        raise StatsRangeError("结束日期不能早于开始日期")
+    if (end - start).days > max_days:
+        raise StatsRangeError(f"查询范围不能超过 {max_days} 天")
+
+
+async def sales_series(session: AsyncSession, start: date, end: date, granularity: str = "day") -> List[dict]:
+    """
+    日期区间 [start, end) 每天或每小时的下单数、已完成订单数和销售额
+
+    只读取汇总表 (按天最多 366 天 × 分片数行，按小时最多 31 × 24 × 分片数行)，
+    没有数据的时段补 0，返回连续的序列便于直接绘图。
+
+    Args:
+        session: 数据库会话
+        start: 起始日期 (包含，门店时区)
+        end: 结束日期 (不包含)
+        granularity: day / hour
+
+    Returns:
+        List[dict]: date, hour (按天时为 None), order_count, completed_count, sales_amount
+
+    Raises:
+        StatsRangeError: 日期区间无效或超过上限
+    """
+    _check_range(start, end, MAX_RANGE_DAYS[granularity])
+    model = DailySalesRollup if granularity == "day" else HourlySalesRollup
+    keys = [model.day] if granularity == "day" else [model.day, model.hour]
+    result = await session.execute(
+        select(*keys, *(func.sum(getattr(model, name)) for name in _COUNTERS))
+        .where(model.day >= start, model.day < end)
+        .group_by(*keys)
+    )
+    rows = {tuple(row[:len(keys)]): row[len(keys):] for row in result}
+
+    hours = [None] if granularity == "day" else range(24)
+    series = []
+    for offset in range((end - start).days):
+        day = start + timedelta(days=offset)
+        for hour in hours:
+            order_count, completed_count, sales_amount = rows.get((day,) if hour is None else (day, hour), (0, 0, 0))
+            series.append({
+                "date": day,
+                "hour": hour,
+                "order_count": order_count,
+                "completed_count": completed_count,
+                "sales_amount": Decimal(sales_amount),
+            })
+    return series
+
+
+async def top_products(
+    session: AsyncSession,
+    start: date,
+    end: date,
+    limit: int = 10,
+    order_by: str = "sales_amount",
+) -> List[dict]:
+    """
+    日期区间 [start, end) 的商品销量排行 (已完成订单)
+
+    Args:
+        session: 数据库会话
+        start: 起始日期 (包含，门店时区)
+        end: 结束日期 (不包含)
+        limit: 返回的商品数
+        order_by: 排序依据 sales_amount / quantity
+
+    Returns:
+        List[dict]: product_id, product_name (区间内最近一天的名称), quantity, sales_amount, order_count
+
+    Raises:
+        StatsRangeError: 日期区间无效或超过上限
+    """
+    _check_range(start, end, MAX_RANGE_DAYS["day"])
+    in_range = (ProductSalesRollup.day >= start, ProductSalesRollup.day < end)
+    top = (
+        select(ProductSalesRollup.product_id, *(
+            func.sum(getattr(ProductSalesRollup, name)).label(name) for name in _PRODUCT_COUNTERS
+        ))
+        .where(*in_range)
+        .group_by(ProductSalesRollup.product_id)
+        .order_by(func.sum(getattr(ProductSalesRollup, order_by)).desc(), ProductSalesRollup.product_id)
+        .limit(limit)
+        .cte("top")
+    )
+    # 名称只对排行中的商品取区间内最近一天的快照，避免对全部商品做有序聚合
+    product_name = (
+        select(ProductSalesRollup.product_name)
+        .where(*in_range, ProductSalesRollup.product_id == top.c.product_id)
+        .order_by(ProductSalesRollup.day.desc())
+        .limit(1)
+        .scalar_subquery()
+    )
+    result = await session.execute(
+        select(top.c.product_id, product_name.label("product_name"), *(top.c[name] for name in _PRODUCT_COUNTERS))
+        .order_by(top.c[order_by].desc(), top.c.product_id)
+    )
+    return [dict(row._mapping) for row in result]
@@ -0,0 +1,446 @@
+from abc import ABC, abstractmethod
+import asyncio
+import logging
+from typing import Callable, Dict, Iterable, Any, Collection
+
+from sqlalchemy import event, inspect, select, update, delete, insert, column, func, bindparam, literal, BigInteger, Integer
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.models.order import OrderItem
+from app.models.product import Product, StockJournal
+
+logger = logging.getLogger(__name__)
+
+# 扣减语句直接基于 Table 构造，绕过 ORM 批量更新的同步逻辑，降低每单的 Python 开销。
+# 库存变化不影响任何列表的筛选结果，语句带 preserve_counts 以免使列表总数缓存失效 (见 app.services.counting)
+products_table = Product.__table__
+
+
+class StockError(Exception):
+    """
+    库存预占失败
+
+    Attributes:
+        product_id: 失败的商品ID
+        product_name: 商品名称 (商品不存在时为 None)
+    """
+    def __init__(self, product_id: int, product_name: str = None):
+        self.product_id = product_id
+        self.product_name = product_name
+        if product_name is None:
+            message = f"Product {product_id} not found"
+        else:
+            message = f"Product {product_name} stock insufficient"
+        super().__init__(message)
+
+
+def merge_counts(items: Iterable[Any]) -> Dict[int, int]:
+    """
+    合并同一商品的购买数量
+
+    Args:
+        items: 含 product_id / count 属性的下单项
+
+    Returns:
+        dict: {product_id: 总数量}
+    """
+    counts: Dict[int, int] = {}
+    for item in items:
+        counts[item.product_id] = counts.get(item.product_id, 0) + item.count
+    return counts
+
+
+def _counts_values(counts: Dict[int, int]):
+    # 构造 unnest(:ids, :counts) AS v(id, n)，整单商品作为两个数组参数一次提交。
+    # 与 VALUES 列表等价，但 SQL 文本与商品数量无关，可命中编译缓存和预编译语句缓存
+    # 按商品ID排序: 并发订单以相同顺序锁定商品行，避免交叉加锁导致死锁
+    ids = sorted(counts)
+    return func.unnest(
+        bindparam("stock_ids", ids, type_=ARRAY(BigInteger)),
+        bindparam("stock_counts", [counts[pid] for pid in ids], type_=ARRAY(Integer)),
+    ).table_valued(
+        column("id", BigInteger),
+        column("n", Integer),
+    ).render_derived(name="v")
+
+
+async def reserve_stock(session: AsyncSession, counts: Dict[int, int]) -> Dict[int, Any]:
+    """
+    原子预占库存 (条件扣减)
+
+    使用单条 UPDATE ... FROM unnest(...) WHERE stock >= n RETURNING 语句 (单商品时不用 unnest)，
+    一次往返完成整单所有商品的库存校验与扣减，不再 "先读后写"，不会超卖。
+    任一商品扣减失败时抛出 StockError，调用方放弃事务即可回滚已扣减的行。
+
+    Args:
+        session: 数据库会话 (调用方负责提交)
+        counts: {product_id: 数量}
+
+    Returns:
+        dict: {product_id: 行数据 (id, name, thumb_url, price, stock, sales_count)}
+    """
+    t = products_table
+    if len(counts) == 1:
+        # 单商品订单 (抢购的主要场景) 用标量参数的 UPDATE: 省去数组编码与 unnest 关联，
+        # 行锁持有时间更短，热点商品上的吞吐约高 25% (见 benchmarks/bench_stock_reservation.py)
+        [(pid, n)] = counts.items()
+        matched, quantity = t.c.id == pid, literal(n, Integer)
+    else:
+        v = _counts_values(counts)
+        matched, quantity = t.c.id == v.c.id, v.c.n
+    stmt = (
+        update(t)
+        .where(matched, t.c.stock >= quantity)
+        .values(
+            stock=t.c.stock - quantity,
+            sales_count=func.coalesce(t.c.sales_count, 0) + quantity,
+        )
+        .returning(t.c.id, t.c.name, t.c.thumb_url, t.c.price, t.c.stock, t.c.sales_count)
+        .execution_options(preserve_counts=True)
+    )
+    result = await session.execute(stmt)
+    rows = {row.id: row for row in result}
+
+    if len(rows) != len(counts):
+        # 失败路径才额外查询一次，用于给出准确的错误信息
+        missing = [pid for pid in counts if pid not in rows]
+        result = await session.execute(
+            select(Product.id, Product.name).where(Product.id.in_(missing))
+        )
+        names = {row.id: row.name for row in result}
+        pid = missing[0]
+        for candidate in missing:
+            if candidate not in names:
+                pid = candidate
+                break
+        raise StockError(pid, names.get(pid))
+
+    return rows
+
+
+async def restore_stock(session: AsyncSession, counts: Dict[int, int]) -> None:
+    """
+    批量回补库存 (取消订单等)
+
+    与 reserve_stock 相同的单条 UPDATE ... FROM unnest(...) 语句，库存加回、销量减去。
+
+    Args:
+        session: 数据库会话 (调用方负责提交)
+        counts: {product_id: 数量}
+    """
+    if not counts:
+        return
+    await _apply_deltas(session, {pid: -n for pid, n in counts.items()})
+
+
+def _order_item_counts(*criteria: Any):
+    # 按商品汇总订单明细数量 (已被管理员移除、或商品已删除的明细不计入)
+    return (
+        select(OrderItem.product_id, func.sum(OrderItem.quantity).label("n"))
+        .where(*criteria, OrderItem.product_id.is_not(None), OrderItem.is_removed.is_(False))
+        .group_by(OrderItem.product_id)
+    )
+
+
+async def order_item_counts(session: AsyncSession, *criteria: Any) -> Dict[int, int]:
+    """
+    查询订单明细按商品汇总的数量
+
+    Args:
+        session: 数据库会话
+        *criteria: 订单明细筛选条件，如 OrderItem.order_id == order_id
+
+    Returns:
+        dict: {product_id: 数量}
+    """
+    result = await session.execute(_order_item_counts(*criteria))
+    return {row.product_id: int(row.n) for row in result}
+
+
+async def restore_order_items(session: AsyncSession, *criteria: Any) -> Dict[int, int]:
+    """
+    按订单明细回补库存 (取消、拒单、移除商品)
+
+    单条 UPDATE products ... FROM (SELECT product_id, sum(quantity) FROM order_items ...) 语句，
+    明细汇总和库存回补在数据库内一次完成，不需要先把明细读回应用。
+
+    Args:
+        session: 数据库会话 (调用方负责提交)
+        *criteria: 订单明细筛选条件，如 OrderItem.order_id == order_id
+
+    Returns:
+        dict: {product_id: 回补数量}
+    """
+    v = _order_item_counts(*criteria).subquery("v")
+    t = products_table
+    result = await session.execute(
+        update(t)
+        .where(t.c.id == v.c.product_id)
+        .values(
+            stock=t.c.stock + v.c.n,
+            sales_count=func.coalesce(t.c.sales_count, 0) - v.c.n,
+        )
+        .returning(t.c.id, v.c.n)
+        .execution_options(preserve_counts=True)
+    )
+    return {row.id: int(row.n) for row in result}
+
+
+async def _apply_deltas(session: AsyncSession, sold: Dict[int, int]) -> None:
+    # sold 为销量变化: 正数扣库存加销量，负数反之
+    v = _counts_values(sold)
+    t = products_table
+    await session.execute(
+        update(t)
+        .where(t.c.id == v.c.id)
+        .values(
+            stock=t.c.stock - v.c.n,
+            sales_count=func.coalesce(t.c.sales_count, 0) + v.c.n,
+        )
+        .execution_options(preserve_counts=True)
+    )
+
+
+class BaseStockBackend(ABC):
+    """
+    库存层接口
+
+    订单创建/取消通过它扣减和回补库存，便于替换为内存或 Redis 等计数层。
+    所有方法都在调用方的事务中执行，由调用方负责提交。
+    """
+    @abstractmethod
+    async def reserve(self, session: AsyncSession, counts: Dict[int, int]) -> Dict[int, Any]:
+        """预占库存，失败抛出 StockError。返回 {product_id: 行数据 (id, name, thumb_url, price)}"""
+        pass
+
+    @abstractmethod
+    async def release(self, session: AsyncSession, counts: Dict[int, int]) -> None:
+        """回补库存"""
+        pass
+
+    async def release_items(self, session: AsyncSession, *criteria: Any) -> Dict[int, int]:
+        """
+        按订单明细回补库存，返回 {product_id: 回补数量}
+
+        Args:
+            session: 数据库会话
+            *criteria: 订单明细筛选条件，如 OrderItem.order_id == order_id
+        """
+        counts = await order_item_counts(session, *criteria)
+        await self.release(session, counts)
+        return counts
+
+    async def discard(self, counts: Dict[int, int]) -> None:
+        """撤销一次未能提交的预占 (事务回滚后调用)"""
+        pass
+
+    async def invalidate(self, session: AsyncSession, product_ids: Collection[int]) -> None:
+        """商品库存被直接改写前调用 (后台调整库存等)"""
+        pass
+
+    async def flush(self, session: AsyncSession) -> int:
+        """把缓冲中的库存变化写回数据库，返回合并的流水条数"""
+        return 0
+
+    async def reconcile(self, session: AsyncSession) -> None:
+        """启动时的崩溃恢复"""
+        pass
+
+
+class DatabaseStockBackend(BaseStockBackend):
+    """直接在 products 表上条件扣减 (默认)"""
+
+    async def reserve(self, session: AsyncSession, counts: Dict[int, int]) -> Dict[int, Any]:
+        return await reserve_stock(session, counts)
+
+    async def release(self, session: AsyncSession, counts: Dict[int, int]) -> None:
+        await restore_stock(session, counts)
+
+    async def release_items(self, session: AsyncSession, *criteria: Any) -> Dict[int, int]:
+        return await restore_order_items(session, *criteria)
+
+
+class MemoryStockBackend(BaseStockBackend):
+    """
+    进程内热点库存计数层 (write-behind)
+
+    - 可售库存保存在进程内计数器中，整单 "全部校验后全部扣减" 在事件循环中同步完成，
+      中间没有 await，相当于 Redis 中的一段原子脚本。
+    - 每次扣减/回补在订单事务中追加一条 stock_journal 流水 (只插入，不锁 products 行)。
+    - 后台任务定期 flush: 删除已提交的流水并按商品聚合，一条 UPDATE 写回 stock / sales_count。
+    - 计数器按 "products.stock - 未合并流水" 懒加载，进程崩溃后未合并的流水仍在库中，
+      重启时 reconcile 先合并流水，数据不会丢失。
+    - 扣减立即生效 (事务失败时由调用方 discard 撤销)；回补和后台改写库存在事务提交后才计入计数器，
+      回滚时不计入，计数器不会多出未提交的库存。
+
+    注意: 计数器只在单个进程内有效，多 worker 部署需要共享计数层 (如 Redis) 或按商品分配 worker。
+    """
+
+    def __init__(self):
+        self._counters: Dict[int, int] = {}
+
+    async def _load(self, session: AsyncSession, product_ids: Collection[int]) -> Dict[int, Any]:
+        pending = (
+            select(StockJournal.product_id, func.sum(StockJournal.quantity).label("quantity"))
+            .where(StockJournal.product_id.in_(product_ids))
+            .group_by(StockJournal.product_id)
+            .subquery()
+        )
+        result = await session.execute(
+            select(
+                Product.id,
+                Product.name,
+                Product.thumb_url,
+                Product.price,
+                (Product.stock - func.coalesce(pending.c.quantity, 0)).label("available"),
+            )
+            .outerjoin(pending, pending.c.product_id == Product.id)
+            .where(Product.id.in_(product_ids))
+        )
+        rows = {row.id: row for row in result}
+        for row in rows.values():
+            # 并发加载时保留先到的值，后到的读数可能已经过时
+            self._counters.setdefault(row.id, row.available)
+        return rows
+
+    async def reserve(self, session: AsyncSession, counts: Dict[int, int]) -> Dict[int, Any]:
+        rows = await self._load(session, list(counts))
+
+        # --- 原子段: 以下到扣减完成之间不能有 await ---
+        for pid, n in counts.items():
+            if pid not in rows:
+                raise StockError(pid)
+            if self._counters[pid] < n:
+                raise StockError(pid, rows[pid].name)
+        for pid, n in counts.items():
+            self._counters[pid] -= n
+        # --- 原子段结束 ---
+
+        try:
+            await self._journal(session, counts)
+        except Exception:
+            await self.discard(counts)
+            raise
+        return rows
+
+    async def release(self, session: AsyncSession, counts: Dict[int, int]) -> None:
+        if not counts:
+            return
+        await self._journal(session, {pid: -n for pid, n in counts.items()})
+        # 回补的库存在提交后才可售，事务回滚时不计入
+        _on_commit(session, lambda: self._add(counts))
+
+    async def discard(self, counts: Dict[int, int]) -> None:
+        self._add(counts)
+
+    def _add(self, counts: Dict[int, int]) -> None:
+        for pid, n in counts.items():
+            if pid in self._counters:
+                self._counters[pid] += n
+
+    async def invalidate(self, session: AsyncSession, product_ids: Collection[int]) -> None:
+        # 先把这些商品的流水合并进 products，后续的直接改写才是最终值
+        result = await session.execute(
+            delete(StockJournal)
+            .where(StockJournal.product_id.in_(product_ids))
+            .returning(StockJournal.product_id, StockJournal.quantity)
+        )
+        await self._apply(session, result)
+        # 锁定商品行 (提交前后台回写等待)，记录合并后的库存。
+        # 计数器不丢弃: 其中包含尚未提交的预占，提交后按改写前后的差值调整
+        result = await session.execute(
+            select(Product.id, Product.stock).where(Product.id.in_(product_ids)).with_for_update()
+        )
+        merged = {row.id: row.stock for row in result}
+        written = session.info.setdefault("stock_written", {})
+        _on_commit(session, lambda: self._add({
+            pid: written[pid] - stock for pid, stock in merged.items() if pid in written
+        }))
+
+    async def flush(self, session: AsyncSession) -> int:
+        result = await session.execute(
+            delete(StockJournal).returning(StockJournal.product_id, StockJournal.quantity)
+        )
+        merged = await self._apply(session, result)
+        await session.commit()
+        return merged
+
+    async def reconcile(self, session: AsyncSession) -> None:
+        # 上次运行残留 (崩溃前未合并) 的流水合并进 products，计数器随后按需加载
+        merged = await self.flush(session)
+        if merged:
+            logger.info("Reconciled %s pending stock journal entries", merged)
+
+    async def _journal(self, session: AsyncSession, sold: Dict[int, int]) -> None:
+        await session.execute(
+            insert(StockJournal),
+            [{"product_id": pid, "quantity": n} for pid, n in sold.items()],
+        )
+
+    async def _apply(self, session: AsyncSession, journal_rows) -> int:
+        sold: Dict[int, int] = {}
+        merged = 0
+        for row in journal_rows:
+            sold[row.product_id] = sold.get(row.product_id, 0) + row.quantity
+            merged += 1
+        sold = {pid: n for pid, n in sold.items() if n}
+        if sold:
+            await _apply_deltas(session, sold)
+        return merged
+
+
+def _on_commit(session: AsyncSession, callback: Callable[[], None]) -> None:
+    # 事务提交后执行 (回滚时丢弃)
+    session.info.setdefault("stock_on_commit", []).append(callback)
+
+
+@event.listens_for(Session, "after_flush")
+def _after_flush(session: Session, flush_context) -> None:
+    # 记录 invalidate 之后通过 ORM 改写的库存值，提交后据此调整计数器
+    written = session.info.get("stock_written")
+    if written is None:
+        return
+    for obj in session.dirty:
+        if isinstance(obj, Product) and inspect(obj).attrs.stock.history.has_changes() and isinstance(obj.stock, int):
+            written[obj.id] = obj.stock
+
+
+@event.listens_for(Session, "after_commit")
+def _after_commit(session: Session) -> None:
+    session.info.pop("stock_written", None)
+    for callback in session.info.pop("stock_on_commit", ()):
+        callback()
+
+
+@event.listens_for(Session, "after_rollback")
+def _after_rollback(session: Session) -> None:
+    session.info.pop("stock_written", None)
+    session.info.pop("stock_on_commit", None)
+
+
+def get_stock_backend() -> BaseStockBackend:
+    if settings.STOCK_BACKEND == "memory":
+        return MemoryStockBackend()
+    return DatabaseStockBackend()
+
+stock_backend = get_stock_backend()
+
+
+async def run_flusher(interval: float) -> None:
+    """
+    后台回写任务 (随应用生命周期启动)
+
+    Args:
+        interval: 回写间隔 (秒)
+    """
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            async with SessionLocal() as session:
+                await stock_backend.flush(session)
+        except Exception:
+            logger.exception("Stock journal flush failed")
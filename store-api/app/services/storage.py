@@ -1,21 +1,109 @@
 from abc import ABC, abstractmethod
+import asyncio
+import logging
 import os
 import uuid
 import oss2
 import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+from functools import partial
+from typing import Any, Callable, Dict, Iterable, Optional
 from fastapi import UploadFile
+from fastapi.staticfiles import StaticFiles
+from oss2.models import PartInfo
+from app.core import metrics
+from app.core.cache import TTLCache
 from app.core.config import settings
 
+logger = logging.getLogger(__name__)
+
+# 本地存储每次写入的块大小
+LOCAL_CHUNK_SIZE = 1024 * 1024
+
+# 上传线程池: 同步的存储 SDK 调用在这里执行，大小限制了同时进行的上传数
+upload_executor = ThreadPoolExecutor(max_workers=settings.UPLOAD_THREADS, thread_name_prefix="upload")
+
+
+async def run_upload(func: Callable, *args: Any) -> Any:
+    """在上传线程池中执行同步调用"""
+    return await asyncio.get_running_loop().run_in_executor(upload_executor, partial(func, *args))
+
+
+def build_object_name(file: UploadFile, folder: str = "uploads") -> str:
+    """
+    生成文件存储路径
+
+    格式: {folder}/{type_folder}/{YYYYMMDD}/{HHMMSS}_{uuid}{ext}
+    例如: uploads/images/20231220/143000_a1b2c3d4.png
+    """
+    # Determine file type folder
+    content_type = file.content_type or ""
+    if content_type.startswith("image/"):
+        type_folder = "images"
+    elif content_type.startswith("video/"):
+        type_folder = "videos"
+    elif content_type.startswith("audio/"):
+        type_folder = "audios"
+    else:
+        type_folder = "files"
+        
+    ext = os.path.splitext(file.filename or "")[1]
+    now = datetime.now()
+    date_folder = now.strftime("%Y%m%d")
+    time_prefix = now.strftime("%H%M%S")
+    unique_id = uuid.uuid4().hex[:8] # Shorten uuid to 8 chars
+    return f"{folder}/{type_folder}/{date_folder}/{time_prefix}_{unique_id}{ext}"
+
+
+def _file_size(file: UploadFile) -> int:
+    if file.size is not None:
+        return file.size
+    position = file.file.tell()
+    file.file.seek(0, os.SEEK_END)
+    size = file.file.tell()
+    file.file.seek(position)
+    return size
+
+
 class BaseStorage(ABC):
     @abstractmethod
     async def upload(self, file: UploadFile, folder: str = "uploads") -> str:
         pass
 
+    @abstractmethod
+    async def put_bytes(self, path: str, data: bytes, content_type: Optional[str] = None) -> None:
+        """
+        以指定路径保存内容 (如服务端生成的缩略图)
+
+        Args:
+            path: 存储路径
+            data: 文件内容
+            content_type: MIME 类型
+        """
+        pass
+
+    @abstractmethod
+    async def exists(self, path: str) -> bool:
+        """文件是否存在"""
+        pass
+
     @abstractmethod
     def get_file_url(self, path: str) -> str:
         pass
 
+    def get_file_urls(self, paths: Iterable[str]) -> Dict[str, str]:
+        """
+        批量获取文件访问链接 (重复的路径只处理一次)
+
+        Args:
+            paths: 文件存储路径
+
+        Returns:
+            dict: {路径: 访问链接}
+        """
+        return {path: self.get_file_url(path) for path in dict.fromkeys(paths) if path}
+
 
 class AliyunOSSStorage(BaseStorage):
     def __init__(self):
@@ -28,55 +116,97 @@ class AliyunOSSStorage(BaseStorage):
             settings.ALIYUN_OSS_ENDPOINT, 
             settings.ALIYUN_OSS_BUCKET_NAME
         )
-        # Use simple upload for now, maybe multipart for large files later
+
+        # 公开访问域名 (CDN): 设置后直接拼接 URL，不需要签名
+        self.public_url = settings.ALIYUN_OSS_PUBLIC_URL.rstrip("/")
+        self.url_expires = settings.ALIYUN_OSS_URL_EXPIRES
+        # 签名 URL 缓存: 路径 -> URL。缓存时间不超过有效期的一半，保证返回的链接仍有足够的剩余有效期
+        self.url_cache = TTLCache(
+            maxsize=settings.ALIYUN_OSS_URL_CACHE_SIZE,
+            ttl=min(settings.ALIYUN_OSS_URL_CACHE_TTL, self.url_expires // 2),
+        )
         
     async def upload(self, file: UploadFile, folder: str = "uploads") -> str:
-        # Determine file type folder
-        content_type = file.content_type
-        if content_type.startswith("image/"):
-            type_folder = "images"
-        elif content_type.startswith("video/"):
-            type_folder = "videos"
-        elif content_type.startswith("audio/"):
-            type_folder = "audios"
+        """
+        上传文件到 OSS
+
+        - OSS SDK 是同步的，所有调用都在有界线程池中执行，不阻塞事件循环
+        - 小文件: put_object 直接读取上传的临时文件，分块发送，不整体读入内存
+        - 超过 UPLOAD_MULTIPART_THRESHOLD 的文件: 分片上传，失败的分片单独重试，
+          不需要从头重传；最终失败时取消分片任务，不留下碎片
+
+        Returns:
+            str: 文件存储路径 (object name)
+        """
+        object_name = build_object_name(file, folder)
+        if _file_size(file) >= settings.UPLOAD_MULTIPART_THRESHOLD:
+            await self._multipart_upload(object_name, file)
         else:
-            type_folder = "files"
-            
-        # Generate filename with timestamp
-        # Format: {folder}/{type_folder}/{YYYYMMDD}/{HHMMSS}_{uuid}{ext}
-        ext = os.path.splitext(file.filename)[1]
-        now = datetime.now()
-        date_folder = now.strftime("%Y%m%d")
-        time_prefix = now.strftime("%H%M%S")
-        unique_id = uuid.uuid4().hex[:8] # Shorten uuid to 8 chars
-        
-        # Example: uploads/images/20231220/143000_a1b2c3d4.png
-        object_name = f"{folder}/{type_folder}/{date_folder}/{time_prefix}_{unique_id}{ext}"
-        
-        # Read file content
-        content = await file.read()
-        
-        # Upload
-        # put_object is synchronous in oss2, so it might block the event loop slightly. 
-        # Ideally run in threadpool for large files, but for small images it's ok.
-        self.bucket.put_object(object_name, content)
+            await file.seek(0)
+            await run_upload(self.bucket.put_object, object_name, file.file)
         
         # Return relative path (object_name) for flexible storage
         # The full URL can be generated using get_file_url(object_name)
         return object_name
 
+    async def _multipart_upload(self, object_name: str, file: UploadFile) -> None:
+        await file.seek(0)
+        upload_id = (await run_upload(self.bucket.init_multipart_upload, object_name)).upload_id
+        try:
+            parts = []
+            part_number = 1
+            while True:
+                # 每次只读入一个分片，内存占用不超过 UPLOAD_PART_SIZE
+                chunk = await file.read(settings.UPLOAD_PART_SIZE)
+                if not chunk:
+                    break
+                etag = await self._upload_part(object_name, upload_id, part_number, chunk)
+                parts.append(PartInfo(part_number, etag))
+                part_number += 1
+            await run_upload(self.bucket.complete_multipart_upload, object_name, upload_id, parts)
+        except Exception:
+            await run_upload(self.bucket.abort_multipart_upload, object_name, upload_id)
+            raise
+
+    async def _upload_part(self, object_name: str, upload_id: str, part_number: int, chunk: bytes) -> str:
+        for attempt in range(settings.UPLOAD_PART_RETRIES + 1):
+            try:
+                result = await run_upload(self.bucket.upload_part, object_name, upload_id, part_number, chunk)
+                return result.etag
+            except oss2.exceptions.OssError:
+                if attempt == settings.UPLOAD_PART_RETRIES:
+                    raise
+                logger.warning("Retrying part %s of %s (attempt %s)", part_number, object_name, attempt + 1)
+
+    async def put_bytes(self, path: str, data: bytes, content_type: Optional[str] = None) -> None:
+        headers = {"Content-Type": content_type} if content_type else None
+        await run_upload(self.bucket.put_object, path, data, headers)
+
+    async def exists(self, path: str) -> bool:
+        return await run_upload(self.bucket.object_exists, path)
+
     def get_file_url(self, path: str) -> str:
         """
-        获取文件的完整访问链接 (签名 URL)
+        获取文件的完整访问链接
+
+        - 配置了 ALIYUN_OSS_PUBLIC_URL 时返回公开链接
+        - 否则返回签名 URL，同一路径的签名结果会被缓存复用
         """
-        # Return Signed URL (valid for 1 year = 31536000 seconds)
-        # This is required if the bucket is private (ACL=private)
-        
-        # Ensure endpoint starts with https for the signed URL
-        if not self.bucket.endpoint.startswith("http"):
-             pass
+        if self.public_url:
+            return f"{self.public_url}/{path.lstrip('/')}"
 
-        url = self.bucket.sign_url('GET', path, 31536000)
+        url = self.url_cache.get(path)
+        if url is None:
+            started = time.perf_counter()
+            url = self._sign_url(path)
+            self.url_cache.record_load(time.perf_counter() - started)
+            self.url_cache.set(path, url)
+        return url
+
+    def _sign_url(self, path: str) -> str:
+        # Return Signed URL (valid for ALIYUN_OSS_URL_EXPIRES, default 1 year)
+        # This is required if the bucket is private (ACL=private)
+        url = self.bucket.sign_url('GET', path, self.url_expires)
         
         # Force HTTPS if the generated URL is HTTP and endpoint didn't specify
         if url.startswith("http://") and "aliyuncs.com" in url:
@@ -85,13 +215,62 @@ class AliyunOSSStorage(BaseStorage):
         return url
 
 class LocalStorage(BaseStorage):
-    # Fallback or dev usage
+    """
+    本地文件系统存储 (开发环境或不使用 OSS 的私有化部署)
+
+    - 文件保存在 LOCAL_STORAGE_DIR 下，路径格式与 OSS 相同
+    - 写入在上传线程池中分块进行，先写临时文件再重命名，不会留下写了一半的文件
+    - 通过 static_app() 挂载的静态路由访问 (见 main.py)
+    """
+    def __init__(self, root: Optional[str] = None, base_url: Optional[str] = None):
+        self.root = os.path.abspath(root or settings.LOCAL_STORAGE_DIR)
+        # 静态路由要求目录存在，不能等到首次上传时才创建
+        os.makedirs(self.root, exist_ok=True)
+        self.base_url = (settings.LOCAL_STORAGE_URL if base_url is None else base_url).rstrip("/")
+
     async def upload(self, file: UploadFile, folder: str = "uploads") -> str:
-        # Implementation skipped for now as user requested OSS
-        pass
+        object_name = build_object_name(file, folder)
+        destination = os.path.join(self.root, object_name)
+        temp_path = f"{destination}.part"
+        await run_upload(partial(os.makedirs, os.path.dirname(destination), exist_ok=True))
+
+        await file.seek(0)
+        handle = await run_upload(open, temp_path, "wb")
+        try:
+            while chunk := await file.read(LOCAL_CHUNK_SIZE):
+                await run_upload(handle.write, chunk)
+            await run_upload(handle.close)
+            await run_upload(os.replace, temp_path, destination)
+        except BaseException:
+            handle.close()
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+        return object_name
+
+    async def put_bytes(self, path: str, data: bytes, content_type: Optional[str] = None) -> None:
+        await run_upload(self._write, os.path.join(self.root, path), data)
+
+    @staticmethod
+    def _write(destination: str, data: bytes) -> None:
+        os.makedirs(os.path.dirname(destination), exist_ok=True)
+        temp_path = f"{destination}.part"
+        with open(temp_path, "wb") as handle:
+            handle.write(data)
+        os.replace(temp_path, destination)
+
+    async def exists(self, path: str) -> bool:
+        return await run_upload(os.path.isfile, os.path.join(self.root, path))
 
     def get_file_url(self, path: str) -> str:
-        return path
+        return f"{self.base_url}/{path.lstrip('/')}"
+
+    def static_app(self) -> StaticFiles:
+        """
+        静态文件路由: 支持 ETag / Last-Modified 条件请求 (304) 和 Range 请求 (206)。
+        服务器支持 ASGI pathsend 扩展时由服务器直接发送文件 (零拷贝)，否则分块读取发送
+        """
+        return StaticFiles(directory=self.root)
 
 def get_storage() -> BaseStorage:
     if settings.UPLOAD_STORAGE_TYPE == "aliyun":
@@ -99,3 +278,5 @@ def get_storage() -> BaseStorage:
     return LocalStorage()
 
 storage = get_storage()
+if isinstance(storage, AliyunOSSStorage):
+    metrics.register("signed_url_cache", storage.url_cache.stats)
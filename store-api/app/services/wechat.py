@@ -1,13 +1,148 @@
+import asyncio
+import importlib.util
+import logging
+import random
+import time
+import zlib
+from datetime import datetime, timezone
+from typing import Any, Callable, Optional
+
 import httpx
+from sqlalchemy import func, select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core import metrics
 from app.core.config import settings
+from app.core.database import SessionLocal
+from app.models.wechat import WeChatToken
+
+logger = logging.getLogger(__name__)
+
+# 可安全重试的连接阶段错误: 请求尚未发出，重试不会导致重复提交
+_CONNECT_ERRORS = (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout)
+# 微信返回 errcode=-1 表示系统繁忙，可稍后重试
+_BUSY_ERRCODE = -1
+# access_token 无效或已过期 (被其他调用方刷新、或已超过有效期)
+_TOKEN_ERRCODES = {40001, 40014, 42001}
+
+
+class WeChatError(Exception):
+    """微信接口返回了错误码"""
+    def __init__(self, errcode: int, errmsg: str):
+        super().__init__(f"WeChat API error {errcode}: {errmsg}")
+        self.errcode = errcode
+        self.errmsg = errmsg
+
+
+class WeChatClient:
+    """
+    微信服务端 API 客户端
+
+    - 进程内复用一个 httpx.AsyncClient，保持长连接，登录等请求不再每次建立 TCP/TLS 连接
+    - 限制连接数，设置连接/读取超时，安装 h2 时使用 HTTP/2
+    - 失败时按指数退避重试: 连接阶段的错误总是重试；超时、5xx 和系统繁忙只对幂等请求重试
+    - 由应用生命周期关闭 (main.py)，测试可传入 httpx.MockTransport
+
+    Args:
+        base_url: 微信 API 地址
+        transport: 自定义传输层 (测试用)
+    """
+    def __init__(self, base_url: Optional[str] = None, transport: Optional[httpx.AsyncBaseTransport] = None):
+        self.base_url = base_url or settings.WECHAT_API_BASE
+        self.transport = transport
+        self._client: Optional[httpx.AsyncClient] = None
+        self.retries = 0
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        if self._client is None or self._client.is_closed:
+            self._client = self._create_client()
+        return self._client
+
+    def _create_client(self) -> httpx.AsyncClient:
+        http2 = settings.WECHAT_HTTP2 and importlib.util.find_spec("h2") is not None
+        if settings.WECHAT_HTTP2 and not http2:
+            logger.warning("h2 is not installed, WeChat client falls back to HTTP/1.1")
+        return httpx.AsyncClient(
+            base_url=self.base_url,
+            http2=http2,
+            transport=self.transport,
+            limits=httpx.Limits(
+                max_connections=settings.WECHAT_MAX_CONNECTIONS,
+                max_keepalive_connections=settings.WECHAT_MAX_KEEPALIVE,
+                keepalive_expiry=settings.WECHAT_KEEPALIVE_EXPIRY,
+            ),
+            timeout=httpx.Timeout(settings.WECHAT_TIMEOUT, connect=settings.WECHAT_CONNECT_TIMEOUT),
+        )
+
+    async def request(self, method: str, path: str, *, idempotent: Optional[bool] = None, **kwargs: Any) -> dict:
+        """
+        发送请求并返回 JSON
+
+        Args:
+            method: HTTP 方法
+            path: 接口路径，如 /sns/jscode2session
+            idempotent: 是否可在请求已发出后重试，默认 GET 为 True。
+                支付等有副作用的 POST 应保持 False
+            **kwargs: 传给 httpx 的参数 (params, json 等)
+
+        Returns:
+            dict: 微信 API 返回的 JSON 数据
+
+        Raises:
+            httpx.HTTPError: 重试次数用尽后仍失败
+        """
+        if idempotent is None:
+            idempotent = method.upper() == "GET"
+        attempt = 0
+        while True:
+            try:
+                response = await self.client.request(method, path, **kwargs)
+                if idempotent and response.status_code >= 500 and attempt < settings.WECHAT_RETRIES:
+                    raise _Retry(f"HTTP {response.status_code}")
+                response.raise_for_status()
+                data = response.json()
+                if idempotent and data.get("errcode") == _BUSY_ERRCODE and attempt < settings.WECHAT_RETRIES:
+                    raise _Retry("system busy")
+                return data
+            except (_Retry, httpx.TransportError) as e:
+                retryable = isinstance(e, (_Retry, *_CONNECT_ERRORS)) or idempotent
+                if not retryable or attempt >= settings.WECHAT_RETRIES:
+                    raise
+                delay = settings.WECHAT_RETRY_BACKOFF * (2 ** attempt) * random.uniform(0.5, 1.5)
+                logger.warning("WeChat %s %s failed (%s), retrying in %.2fs", method, path, e, delay)
+                attempt += 1
+                self.retries += 1
+                await asyncio.sleep(delay)
+
+    async def get(self, path: str, **kwargs: Any) -> dict:
+        return await self.request("GET", path, **kwargs)
+
+    async def post(self, path: str, **kwargs: Any) -> dict:
+        return await self.request("POST", path, **kwargs)
+
+    async def aclose(self) -> None:
+        """关闭连接池 (应用停止时调用)"""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+
+class _Retry(Exception):
+    """内部使用: 响应表明可以重试"""
+
+
+wechat_client = WeChatClient()
+
 
 async def code_to_session(code: str) -> dict:
     """
     微信小程序登录凭证校验 (jscode2session)
-    
+
     Args:
         code: 小程序端通过 wx.login 获取的 code
-        
+
     Returns:
         dict: 微信 API 返回的 JSON 数据
         - openid: 用户唯一标识
@@ -15,13 +150,139 @@ async def code_to_session(code: str) -> dict:
         - errcode: 错误码 (0表示成功)
         - errmsg: 错误信息
     """
-    url = "https://api.weixin.qq.com/sns/jscode2session"
     params = {
         "appid": settings.WECHAT_APP_ID,
         "secret": settings.WECHAT_APP_SECRET,
         "js_code": code,
         "grant_type": "authorization_code"
     }
-    async with httpx.AsyncClient() as client:
-        response = await client.get(url, params=params)
-        return response.json()
+    return await wechat_client.get("/sns/jscode2session", params=params)
+
+
+class AccessTokenManager:
+    """
+    微信 access_token 管理 (接口调用凭证，有效期 2 小时，获取次数有限)
+
+    - 进程内缓存，距离过期不足 WECHAT_TOKEN_REFRESH_MARGIN 秒时提前刷新
+    - 单飞 (single-flight): 同一进程内并发的刷新请求合并为一次
+    - 多 worker 协调: 凭证保存在 wechat_tokens 表，刷新时持有 PostgreSQL 事务级咨询锁，
+      拿到锁后先检查其他 worker 是否已刷新，是则直接使用，避免重复获取导致旧凭证失效
+    - run_refresher 在后台定期提前刷新，业务请求通常不需要等待刷新
+
+    Args:
+        session_factory: 数据库会话工厂 (需连接主库)
+        name: 凭证名称
+    """
+    def __init__(self, session_factory: Callable[[], AsyncSession] = SessionLocal, name: Optional[str] = None):
+        self.session_factory = session_factory
+        self.name = name or f"access_token:{settings.WECHAT_APP_ID}"
+        self.lock_id = zlib.crc32(self.name.encode())
+        self.token: Optional[str] = None
+        self.expires_at = 0.0
+        self._refreshing: Optional[asyncio.Task] = None
+        self.fetches = 0
+        self.shared_hits = 0
+
+    def _is_fresh(self, expires_at: float) -> bool:
+        return expires_at - time.time() > settings.WECHAT_TOKEN_REFRESH_MARGIN
+
+    async def get_token(self, stale_token: Optional[str] = None) -> str:
+        """
+        获取有效的 access_token
+
+        Args:
+            stale_token: 微信提示已失效的凭证，传入时强制刷新 (除非已被其他调用方刷新)
+
+        Returns:
+            str: access_token
+
+        Raises:
+            WeChatError: 微信接口返回错误
+        """
+        if self.token and self.token != stale_token and self._is_fresh(self.expires_at):
+            return self.token
+        if self._refreshing is None or self._refreshing.done():
+            self._refreshing = asyncio.create_task(self._refresh(stale_token))
+        # shield: 某个调用方被取消时，不影响其他等待同一次刷新的调用方
+        return await asyncio.shield(self._refreshing)
+
+    async def _refresh(self, stale_token: Optional[str]) -> str:
+        async with self.session_factory() as session:
+            async with session.begin():
+                # 同一时间只有一个 worker 刷新，锁在事务结束时释放
+                await session.execute(select(func.pg_advisory_xact_lock(self.lock_id)))
+                row = await session.get(WeChatToken, self.name)
+                if row is not None and row.token != stale_token and self._is_fresh(row.expires_at.timestamp()):
+                    self.shared_hits += 1
+                    token, expires_at = row.token, row.expires_at.timestamp()
+                else:
+                    token, expires_at = await self._fetch()
+                    await session.execute(
+                        insert(WeChatToken)
+                        .values(name=self.name, token=token, expires_at=datetime.fromtimestamp(expires_at, timezone.utc))
+                        .on_conflict_do_update(
+                            index_elements=[WeChatToken.name],
+                            set_={"token": token, "expires_at": datetime.fromtimestamp(expires_at, timezone.utc), "updated_at": func.now()},
+                        )
+                    )
+        self.token, self.expires_at = token, expires_at
+        return token
+
+    async def _fetch(self) -> tuple:
+        started = time.time()
+        data = await wechat_client.get("/cgi-bin/token", params={
+            "grant_type": "client_credential",
+            "appid": settings.WECHAT_APP_ID,
+            "secret": settings.WECHAT_APP_SECRET,
+        })
+        if "access_token" not in data:
+            raise WeChatError(data.get("errcode", -1), data.get("errmsg", ""))
+        self.fetches += 1
+        logger.info("WeChat access_token refreshed, expires in %ss", data["expires_in"])
+        return data["access_token"], started + data["expires_in"]
+
+    async def run_refresher(self) -> None:
+        """后台任务: 在凭证进入刷新窗口时提前刷新，失败后稍后重试"""
+        while True:
+            try:
+                await self.get_token()
+                delay = self.expires_at - settings.WECHAT_TOKEN_REFRESH_MARGIN - time.time()
+            except Exception:
+                logger.warning("Failed to refresh WeChat access_token", exc_info=True)
+                delay = 0
+            await asyncio.sleep(max(delay, settings.WECHAT_TOKEN_RETRY_INTERVAL))
+
+    def stats(self) -> dict:
+        return {
+            "fetches": self.fetches,
+            "shared_hits": self.shared_hits,
+            "expires_in": max(int(self.expires_at - time.time()), 0) if self.token else None,
+        }
+
+
+token_manager = AccessTokenManager()
+metrics.register("wechat_token", token_manager.stats)
+
+
+async def call_api(method: str, path: str, **kwargs: Any) -> dict:
+    """
+    调用需要 access_token 的微信接口 (如订阅消息、小程序码)
+
+    凭证被微信判定失效时刷新并重试一次。
+
+    Args:
+        method: HTTP 方法
+        path: 接口路径，如 /cgi-bin/message/subscribe/send
+        **kwargs: 传给 WeChatClient.request 的参数
+
+    Returns:
+        dict: 微信 API 返回的 JSON 数据
+    """
+    params = dict(kwargs.pop("params", None) or {})
+    token = await token_manager.get_token()
+    for attempt in range(2):
+        data = await wechat_client.request(method, path, params={**params, "access_token": token}, **kwargs)
+        if data.get("errcode") not in _TOKEN_ERRCODES or attempt == 1:
+            return data
+        logger.warning("WeChat rejected access_token (%s), refreshing", data.get("errcode"))
+        token = await token_manager.get_token(stale_token=token)
@@ -0,0 +1,67 @@
+import io
+import os
+from typing import Dict, Sequence
+
+from PIL import Image, ImageOps
+
+# 可生成缩略图的图片类型 (GIF 可能是动图，保持原样)
+PROCESSABLE_TYPES = {"image/jpeg", "image/png", "image/webp"}
+PROCESSABLE_EXTENSIONS = {".jpg", ".jpeg", ".png", ".webp"}
+
+FORMAT_EXTENSIONS = {"webp": ".webp", "jpeg": ".jpg"}
+
+
+def variant_path(path: str, size: int, fmt: str = "webp") -> str:
+    """
+    缩略图存储路径: 与原图同目录，文件名追加尺寸
+
+    例如: uploads/images/20231220/143000_a1b2c3d4.png -> uploads/images/20231220/143000_a1b2c3d4_200.webp
+
+    Args:
+        path: 原图存储路径
+        size: 缩略图最长边 (像素)
+        fmt: 缩略图格式 (webp / jpeg)
+    """
+    return f"{os.path.splitext(path)[0]}_{size}{FORMAT_EXTENSIONS[fmt]}"
+
+
+def render_variants(data: bytes, sizes: Sequence[int], fmt: str = "webp", quality: int = 80) -> Dict[int, bytes]:
+    """
+    生成多个尺寸的缩略图 (CPU 密集，在进程池中执行)
+
+    - 按 EXIF 方向旋转，去除元数据
+    - 等比缩放到最长边不超过 size，原图更小时不放大，只重新编码
+
+    Args:
+        data: 原图内容
+        sizes: 缩略图最长边列表 (像素)
+        fmt: 输出格式 (webp / jpeg)
+        quality: 编码质量 (1-100)
+
+    Returns:
+        dict: {尺寸: 编码后的图片内容}
+    """
+    with Image.open(io.BytesIO(data)) as source:
+        # JPEG 可在解码时直接按 1/2~1/8 缩小，大图解码耗时和内存大幅减少
+        source.draft("RGB", (max(sizes), max(sizes)))
+        image = ImageOps.exif_transpose(source)
+        if fmt == "jpeg":
+            image = image.convert("RGB")
+        elif image.mode not in ("RGB", "RGBA"):
+            image = image.convert("RGBA" if "transparency" in image.info or image.mode in ("LA", "PA") else "RGB")
+
+        variants = {}
+        # 从大到小依次缩放，每次以上一个尺寸的结果为输入，减少重采样的计算量
+        for size in sorted(sizes, reverse=True):
+            if max(image.size) > size:
+                image = _resized(image, size)
+            buffer = io.BytesIO()
+            image.save(buffer, format=fmt.upper(), quality=quality, optimize=fmt == "jpeg")
+            variants[size] = buffer.getvalue()
+        return variants
+
+
+def _resized(image: Image.Image, size: int) -> Image.Image:
+    resized = image.copy()
+    resized.thumbnail((size, size), Image.Resampling.LANCZOS)
+    return resized
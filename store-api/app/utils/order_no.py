@@ -0,0 +1,71 @@
+import threading
+import time
+from typing import Callable
+
+MAX_WORKER_ID = 9999
+MAX_SEQUENCE = 9999
+
+
+class ClockSkewError(Exception):
+    """系统时钟回拨超过允许范围，暂停生成订单号"""
+
+
+class OrderNoGenerator:
+    """
+    Snowflake 风格的订单号生成器
+
+    格式 (定长 25 位数字，字符串顺序即生成顺序):
+        YYYYMMDDHHMMSS (UTC + utc_offset) + 毫秒(3) + worker id(4) + 序列号(4)
+
+    - worker id 区分进程，不同进程生成的订单号不会重复
+    - 同一毫秒内序列号递增，用尽后借用下一毫秒，单进程每毫秒最多 10000 个
+    - 时钟回拨不超过 max_skew_ms 时沿用上次的时间继续递增 (逻辑时钟)，
+      超过时抛出 ClockSkewError，避免与回拨前生成的订单号重复
+    - 时间前缀按固定偏移计算，不随夏令时切换: 夏令时结束时本地时间会重复一小时，
+      按本地时间格式化会生成与一小时前相同的前缀
+
+    Args:
+        worker_id: 进程编号 (0-9999)
+        max_skew_ms: 允许的时钟回拨(毫秒)
+        clock: 返回当前时间(秒)的函数 (测试用)
+        utc_offset: 时间前缀相对 UTC 的固定偏移(秒)
+    """
+    def __init__(self, worker_id: int, max_skew_ms: int = 1000, clock: Callable[[], float] = time.time, utc_offset: int = 0):
+        if not 0 <= worker_id <= MAX_WORKER_ID:
+            raise ValueError(f"worker_id must be between 0 and {MAX_WORKER_ID}")
+        self.worker_id = worker_id
+        self.max_skew_ms = max_skew_ms
+        self._clock = clock
+        self.utc_offset = utc_offset
+        self._lock = threading.Lock()
+        self._last_ms = 0
+        self._sequence = 0
+        self.issued = 0
+        self.skewed = 0
+
+    def next(self) -> str:
+        """
+        生成下一个订单号
+
+        Raises:
+            ClockSkewError: 时钟回拨超过 max_skew_ms
+        """
+        with self._lock:
+            now = int(self._clock() * 1000)
+            if now < self._last_ms:
+                if self._last_ms - now > self.max_skew_ms:
+                    raise ClockSkewError(f"Clock moved backwards by {self._last_ms - now}ms")
+                self.skewed += 1
+                now = self._last_ms
+            if now == self._last_ms:
+                self._sequence += 1
+                if self._sequence > MAX_SEQUENCE:
+                    now += 1
+                    self._sequence = 0
+            else:
+                self._sequence = 0
+            self._last_ms = now
+            self.issued += 1
+            sequence = self._sequence
+        seconds, millis = divmod(now, 1000)
+        return f"{time.strftime('%Y%m%d%H%M%S', time.gmtime(seconds + self.utc_offset))}{millis:03d}{self.worker_id:04d}{sequence:04d}"
@@ -0,0 +1,97 @@
+import base64
+import json
+from datetime import datetime
+from typing import Any, List, Optional, Sequence, Tuple
+
+from sqlalchemy import Select, tuple_
+
+
+def encode_cursor(values: Sequence[Any]) -> str:
+    """
+    将排序键的值编码为游标字符串 (URL 安全的 base64 JSON)
+
+    Args:
+        values: 最后一条记录的排序键值，如 (created_at, id)
+    """
+    payload = [v.isoformat() if isinstance(v, datetime) else v for v in values]
+    raw = json.dumps(payload, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, columns: Sequence[Any]) -> List[Any]:
+    """
+    解析游标字符串为排序键的值
+
+    Args:
+        cursor: encode_cursor 生成的游标
+        columns: 排序键对应的列 (用于还原值的类型)
+
+    Raises:
+        ValueError: 游标格式错误
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        payload = json.loads(raw)
+    except (ValueError, TypeError) as e:
+        raise ValueError("Invalid cursor") from e
+    if not isinstance(payload, list) or len(payload) != len(columns):
+        raise ValueError("Invalid cursor")
+
+    values = []
+    for column, value in zip(columns, payload):
+        if value is None:
+            raise ValueError("Invalid cursor")
+        python_type = column.type.python_type
+        if python_type is datetime:
+            if not isinstance(value, str):
+                raise ValueError("Invalid cursor")
+            value = datetime.fromisoformat(value)
+        elif not isinstance(value, python_type):
+            raise ValueError("Invalid cursor")
+        values.append(value)
+    return values
+
+
+def paginate_keyset(query: Select, columns: Sequence[Any], cursor: str, size: int) -> Select:
+    """
+    游标 (keyset) 分页: 按 columns 降序，取排在游标之后的 size + 1 条
+
+    与 offset 分页不同，数据库直接从索引中的游标位置开始扫描，
+    任意深度的翻页耗时都与第一页相同。columns 需要有对应的联合索引，
+    且最后一列必须唯一 (通常为 id)。
+
+    Args:
+        query: 已添加筛选条件、未排序的查询
+        columns: 排序键，如 (Order.created_at, Order.id)
+        cursor: 上一页返回的 next_cursor，空字符串表示第一页
+        size: 每页数量
+
+    Raises:
+        ValueError: 游标格式错误
+    """
+    query = query.order_by(*(column.desc() for column in columns))
+    if cursor:
+        values = decode_cursor(cursor, columns)
+        query = query.where(tuple_(*columns) < tuple_(*values))
+    # 多取一条用于判断是否还有下一页
+    return query.limit(size + 1)
+
+
+def keyset_page(rows: Sequence[Any], columns: Sequence[Any], size: int) -> Tuple[List[Any], Optional[str]]:
+    """
+    截取 paginate_keyset 的查询结果并生成下一页游标
+
+    Args:
+        rows: 查询结果 (最多 size + 1 条)
+        columns: 与 paginate_keyset 相同的排序键
+        size: 每页数量
+
+    Returns:
+        tuple: (当前页记录, next_cursor)，没有下一页时 next_cursor 为 None
+    """
+    rows = list(rows)
+    if len(rows) <= size:
+        return rows, None
+    rows = rows[:size]
+    last = rows[-1]
+    return rows, encode_cursor([getattr(last, column.key) for column in columns])
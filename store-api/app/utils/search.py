@@ -0,0 +1,137 @@
+import unicodedata
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy import cast, func, literal
+from sqlalchemy.dialects.postgresql import TSQUERY, TSVECTOR
+
+# 中文没有空格分词，按字切分 n-gram 后建立倒排索引:
+# 名称的每个 1~n 字片段都是一个词元，关键字拆成 n 字片段后全部命中即为候选，
+# 再用 ILIKE 对候选复核，结果与原来的 "%keyword%" 完全一致。
+#
+# 词元直接以 tsvector / tsquery 字面量写入，不经过 to_tsvector 的分词器，
+# 因此与数据库的编码和 locale 无关 (C locale 下分词器会丢弃中文)。
+
+DEFAULT_NGRAM_SIZES = (1, 2)
+
+
+def _runs(text: str) -> List[str]:
+    # 全角转半角、统一小写，按非字母数字字符切分
+    text = unicodedata.normalize("NFKC", text or "").lower()
+    runs, current = [], []
+    for ch in text:
+        if ch.isalnum():
+            current.append(ch)
+        elif current:
+            runs.append("".join(current))
+            current = []
+    if current:
+        runs.append("".join(current))
+    return runs
+
+
+def _quote(token: str) -> str:
+    return "'" + token.replace("\\", "\\\\").replace("'", "''") + "'"
+
+
+def tokenize(text: str, sizes: Sequence[int] = DEFAULT_NGRAM_SIZES) -> Dict[str, List[int]]:
+    """
+    将文本切分为 n-gram 词元
+
+    Args:
+        text: 原文 (如商品名称)
+        sizes: 切分长度
+
+    Returns:
+        dict: {词元: [位置, ...]}，位置从 1 开始
+    """
+    tokens: Dict[str, List[int]] = {}
+    position = 1
+    for run in _runs(text):
+        for i in range(len(run)):
+            for n in sizes:
+                if i + n <= len(run):
+                    tokens.setdefault(run[i:i + n], []).append(position + i)
+        # 不同片段之间空一个位置，避免跨片段的词元被视为相邻
+        position += len(run) + 1
+    return tokens
+
+
+def tsvector_literal(text: str, sizes: Sequence[int] = DEFAULT_NGRAM_SIZES) -> str:
+    """
+    生成 tsvector 字面量，如 "'苹':1 '苹果':1 '果':2"
+
+    Args:
+        text: 原文
+        sizes: 切分长度
+    """
+    tokens = tokenize(text, sizes)
+    return " ".join(
+        f"{_quote(token)}:{','.join(str(p) for p in positions[:256])}"
+        for token, positions in tokens.items()
+    )
+
+
+def search_vector(text: str, sizes: Sequence[int] = DEFAULT_NGRAM_SIZES):
+    """
+    生成写入检索列的 tsvector 表达式
+
+    Args:
+        text: 原文
+        sizes: 切分长度
+    """
+    return cast(literal(tsvector_literal(text, sizes)), TSVECTOR)
+
+
+def search_query(keyword: str, sizes: Sequence[int] = DEFAULT_NGRAM_SIZES) -> Optional[str]:
+    """
+    将关键字转换为 tsquery 字面量，每个片段取不超过其长度的最大 n 切分
+
+    Args:
+        keyword: 搜索关键字
+        sizes: 与 search_vector 相同的切分长度
+
+    Returns:
+        str: 如 "'苹果' & '果汁'"；关键字不含字母数字时返回 None
+    """
+    terms: List[str] = []
+    for run in _runs(keyword):
+        n = max((size for size in sizes if size <= len(run)), default=None)
+        if n is None:
+            continue
+        for i in range(len(run) - n + 1):
+            term = _quote(run[i:i + n])
+            if term not in terms:
+                terms.append(term)
+    return " & ".join(terms) if terms else None
+
+
+def keyword_search(vector_column, text_column, keyword: str, sizes: Sequence[int] = DEFAULT_NGRAM_SIZES) -> Tuple[list, list]:
+    """
+    构造关键字检索的筛选条件与相关度排序
+
+    - 筛选: 检索列 @@ 关键字 (走 GIN 索引)，再以 ILIKE 复核
+    - 排序: 关键字出现位置越靠前越优先 (以关键字开头的排最前)，其次名称越短越优先。
+      只使用原文列计算，不读取检索向量，命中较多时排序开销也很小
+
+    Args:
+        vector_column: tsvector 检索列
+        text_column: 原文列
+        keyword: 搜索关键字
+        sizes: 与 search_vector 相同的切分长度
+
+    Returns:
+        tuple: (where 条件列表, order_by 表达式列表)
+    """
+    contains = text_column.icontains(keyword, autoescape=True)
+    query = search_query(keyword, sizes)
+    if query is None:
+        # 关键字只有符号，无法使用索引
+        return [contains], []
+    tsquery = cast(literal(query), TSQUERY)
+    return (
+        [vector_column.op("@@")(tsquery), contains],
+        [
+            func.strpos(func.lower(text_column), keyword.lower()),
+            func.length(text_column),
+        ],
+    )
@@ -0,0 +1,109 @@
+"""
+商品目录快照压测 (Catalog Snapshot Benchmark)
+
+通过 httpx ASGITransport 在进程内调用应用，对比关闭/开启目录快照时
+/category/list、/product/list 和 /product/{id} 的吞吐量 (requests/sec):
+- db: catalog.enabled = False，每次请求查询数据库
+- snapshot: catalog.enabled = True，直接由内存快照返回
+
+测试数据写入一个临时分类，结束后删除。
+
+用法 (需要可连接的 PostgreSQL, 读取 .env 配置):
+    python benchmarks/bench_catalog.py --products 2000 --requests 2000 --concurrency 20
+"""
+import argparse
+import asyncio
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from httpx import ASGITransport, AsyncClient
+from sqlalchemy import delete, insert
+
+from app.core.config import settings
+from app.core.database import SessionLocal, engine
+from app.models.product import Category, Product
+from app.services.catalog import catalog
+from main import app
+
+
+async def seed(products: int) -> int:
+    async with SessionLocal() as session:
+        category = Category(name="bench catalog")
+        session.add(category)
+        await session.flush()
+        category_id = category.id
+        await session.execute(insert(Product), [
+            {
+                "category_id": category_id, "name": f"bench product {i}", "price": 1,
+                "stock": 100, "sales_count": 0, "status": 1,
+            }
+            for i in range(products)
+        ])
+        await session.commit()
+        return category_id
+
+
+async def cleanup(category_id: int) -> None:
+    async with SessionLocal() as session:
+        await session.execute(delete(Product).where(Product.category_id == category_id))
+        await session.execute(delete(Category).where(Category.id == category_id))
+        await session.commit()
+
+
+async def throughput(client: AsyncClient, urls, requests: int, concurrency: int) -> float:
+    queue = iter(random.choice(urls) for _ in range(requests))
+
+    async def worker() -> None:
+        for url in queue:
+            res = await client.get(url)
+            assert res.status_code == 200 and res.json()["code"] == 200, res.text
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return requests / (time.perf_counter() - started)
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--products", type=int, default=2000)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=20)
+    args = parser.parse_args()
+    random.seed(42)
+
+    category_id = await seed(args.products)
+    prefix = settings.API_V1_STR
+    async with SessionLocal() as session:
+        await catalog.ensure_fresh(session)
+    product_ids = list(catalog.products)
+    cases = {
+        "category list": [f"{prefix}/category/list"],
+        "product list": [
+            f"{prefix}/product/list?category_id={category_id}&page={page}&size=10" for page in range(1, 21)
+        ],
+        "product detail": [f"{prefix}/product/{pid}" for pid in random.sample(product_ids, min(100, len(product_ids)))],
+    }
+
+    print(f"products={args.products} requests={args.requests} concurrency={args.concurrency} (req/s)")
+    print(f"{'endpoint':>15} {'db':>9} {'snapshot':>9} {'speedup':>8}")
+    try:
+        async with AsyncClient(transport=ASGITransport(app=app), base_url="http://bench") as client:
+            for name, urls in cases.items():
+                results = {}
+                for enabled in (False, True):
+                    catalog.enabled = enabled
+                    # 预热一轮，排除首次连接和快照刷新的开销
+                    await throughput(client, urls, args.concurrency, args.concurrency)
+                    results[enabled] = await throughput(client, urls, args.requests, args.concurrency)
+                print(f"{name:>15} {results[False]:>9.0f} {results[True]:>9.0f} {results[True] / results[False]:>7.1f}x")
+    finally:
+        await cleanup(category_id)
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,156 @@
+"""
+下单吞吐压测 (Create Order Benchmark)
+
+对比两种写入方式在并发下单时的吞吐量 (orders/sec):
+- orm: 旧版实现，flush 取得订单ID后逐个 session.add 明细和时间轴，提交后再 refresh(order)
+- pipeline: app.api.v1.endpoints.order.create_order，INSERT ... RETURNING id 后
+  明细和时间轴各一条批量插入，提交后不再查询
+
+两种方式都先用 stock_backend 原子扣减库存，差异只在订单写入部分。
+同时输出每单发送到数据库的语句数: 本机压测时往返几乎为零，
+生产环境中每少一条语句，每单就少一次 API 与数据库之间的网络往返。
+测试数据写入临时分类和用户，结束后删除。
+
+用法 (需要可连接的 PostgreSQL, 读取 .env 配置):
+    python benchmarks/bench_create_order.py --orders 2000 --items 5 --concurrency 20
+"""
+import argparse
+import asyncio
+import os
+import random
+import sys
+import time
+import uuid
+from decimal import Decimal
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import delete, event, insert, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from app.api.v1.endpoints import order as order_endpoints
+from app.core.config import settings
+from app.models.order import Order, OrderItem, OrderTimeline
+from app.models.product import Category, Product
+from app.models.user import User
+from app.schemas.order import OrderCreateRequest
+from app.schemas.token import TokenUser
+from app.services import order_state, stock
+from app.services.order_no import next_order_no
+
+
+async def create_orm(session, order_in: OrderCreateRequest, user: TokenUser) -> int:
+    counts = stock.merge_counts(order_in.items)
+    products = await stock.stock_backend.reserve(session, counts)
+    total = Decimal(0)
+    items = []
+    for item in order_in.items:
+        product = products[item.product_id]
+        total += product.price * item.count
+        items.append(OrderItem(
+            product_id=product.id, product_name=product.name, product_image=product.thumb_url,
+            price=product.price, quantity=item.count,
+        ))
+    order = Order(
+        order_no=next_order_no(), user_id=user.id, total_amount=total,
+        delivery_fee=0, final_amount=total, status=order_state.initial_status(order_in.delivery_type),
+        delivery_type=order_in.delivery_type.value, pickup_code=str(random.randint(100000, 999999)),
+    )
+    session.add(order)
+    await session.flush()
+    for item in items:
+        item.order_id = order.id
+        session.add(item)
+    session.add(OrderTimeline(order_id=order.id, status="下单成功"))
+    session.add(OrderTimeline(order_id=order.id, status="支付成功", remark="Mock Payment"))
+    await session.commit()
+    await session.refresh(order)
+    return order.id
+
+
+async def create_pipeline(session, order_in: OrderCreateRequest, user: TokenUser) -> int:
+    response = await order_endpoints.create_order(order_in, session, user)
+    return response["data"]["order_id"]
+
+
+async def run(mode: str, args, product_ids, user: TokenUser) -> None:
+    engine = create_async_engine(str(settings.SQLALCHEMY_DATABASE_URI), pool_size=args.concurrency, max_overflow=0)
+    Session = async_sessionmaker(bind=engine, autoflush=False)
+    create = {"orm": create_orm, "pipeline": create_pipeline}[mode]
+    semaphore = asyncio.Semaphore(args.concurrency)
+    statements = 0
+    failed = 0
+
+    @event.listens_for(engine.sync_engine, "before_cursor_execute")
+    def count(*_):
+        nonlocal statements
+        statements += 1
+
+    async def buyer() -> None:
+        order_in = OrderCreateRequest(
+            items=[{"product_id": pid, "count": 1} for pid in random.sample(product_ids, args.items)],
+            delivery_type="pickup",
+        )
+        nonlocal failed
+        async with semaphore:
+            async with Session() as session:
+                try:
+                    await create(session, order_in, user)
+                except IntegrityError:
+                    await session.rollback()
+                    failed += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(buyer() for _ in range(args.orders)))
+    elapsed = time.perf_counter() - started
+    await engine.dispose()
+    created = args.orders - failed
+    print(
+        f"{mode:>9}: {created / elapsed:8.1f} orders/s, "
+        f"{statements / args.orders:5.1f} statements/order, failed={failed}"
+    )
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--orders", type=int, default=2000)
+    parser.add_argument("--items", type=int, default=5)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--mode", choices=["orm", "pipeline", "all"], default="all")
+    args = parser.parse_args()
+
+    engine = create_async_engine(str(settings.SQLALCHEMY_DATABASE_URI))
+    Session = async_sessionmaker(bind=engine)
+    async with Session() as session:
+        category = Category(name="bench orders")
+        user_row = User(openid=f"bench_{uuid.uuid4().hex[:8]}", nickname="bench")
+        session.add_all([category, user_row])
+        await session.flush()
+        category_id, user_id = category.id, user_row.id
+        result = await session.execute(insert(Product).returning(Product.id), [
+            {"category_id": category_id, "name": f"bench order product {i}", "price": 1,
+             "stock": 10 ** 7, "sales_count": 0, "status": 1}
+            for i in range(max(args.items * 4, 20))
+        ])
+        product_ids = list(result.scalars().all())
+        await session.commit()
+
+    try:
+        for mode in (["orm", "pipeline"] if args.mode == "all" else [args.mode]):
+            await run(mode, args, product_ids, TokenUser(id=user_id))
+    finally:
+        async with Session() as session:
+            order_ids = select(Order.id).where(Order.user_id == user_id)
+            await session.execute(delete(OrderTimeline).where(OrderTimeline.order_id.in_(order_ids)))
+            await session.execute(delete(OrderItem).where(OrderItem.order_id.in_(order_ids)))
+            await session.execute(delete(Order).where(Order.user_id == user_id))
+            await session.execute(delete(Product).where(Product.category_id == category_id))
+            await session.execute(delete(Category).where(Category.id == category_id))
+            await session.execute(delete(User).where(User.id == user_id))
+            await session.commit()
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
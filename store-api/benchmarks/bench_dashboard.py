@@ -0,0 +1,116 @@
+"""
+数据看板耗时压测 (Dashboard Benchmark)
+
+逐步写入历史订单 (分布在过去一年，状态随机)，在每个规模下对比看板查询的耗时 (ms, p50/p95):
+- scan: 旧版实现，func.date(created_at) == today 的三条查询，每条都要扫描整个订单表
+- rollup: app.api.v1.endpoints.admin.get_dashboard_stats，读取 daily_sales_rollup
+  并用状态索引统计待处理订单，合并为一条语句
+
+历史订单用 generate_series 直接插入，不经过下单接口，因此不计入汇总表；
+汇总表的行数只与天数和分片数有关，不影响 rollup 的结果。
+测试数据写入临时用户，结束后删除。
+
+用法 (需要可连接的 PostgreSQL, 读取 .env 配置):
+    python benchmarks/bench_dashboard.py --steps 10000,100000,1000000 --runs 50
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+import uuid
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import delete, func, select, text
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from app.api.v1.endpoints.admin import get_dashboard_stats
+from app.core.config import settings
+from app.models.order import Order
+from app.models.user import User
+
+
+async def dashboard_scan(session) -> dict:
+    today = datetime.now().date()
+    today_orders = (await session.execute(
+        select(func.count(Order.id)).where(func.date(Order.created_at) == today)
+    )).scalar_one()
+    today_sales = (await session.execute(
+        select(func.sum(Order.final_amount)).where(func.date(Order.created_at) == today).where(Order.status == 4)
+    )).scalar_one() or 0
+    pending_orders = (await session.execute(
+        select(func.count(Order.id)).where(Order.status.in_([1, 2]))
+    )).scalar_one()
+    return {"today_orders": today_orders, "today_sales": str(today_sales), "pending_orders": pending_orders}
+
+
+async def dashboard_rollup(session) -> dict:
+    return (await get_dashboard_stats(db=session))["data"]
+
+
+async def measure(Session, query, runs: int) -> list:
+    timings = []
+    async with Session() as session:
+        for _ in range(runs):
+            started = time.perf_counter()
+            await query(session)
+            timings.append((time.perf_counter() - started) * 1000)
+            await session.rollback()
+    return timings
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--steps", default="10000,100000,1000000", help="逐步累计到的历史订单数")
+    parser.add_argument("--runs", type=int, default=50)
+    args = parser.parse_args()
+    steps = [int(n) for n in args.steps.split(",")]
+
+    engine = create_async_engine(str(settings.SQLALCHEMY_DATABASE_URI))
+    Session = async_sessionmaker(bind=engine)
+    prefix = f"BENCH_DASH_{uuid.uuid4().hex[:8]}_"
+    async with Session() as session:
+        user = User(openid=f"bench_{uuid.uuid4().hex[:8]}", nickname="bench")
+        session.add(user)
+        await session.flush()
+        user_id = user.id
+        await session.commit()
+
+    try:
+        inserted = 0
+        for total in steps:
+            async with Session() as session:
+                # 历史订单均已完结: 大部分已完成，少量取消
+                await session.execute(text("""
+                    INSERT INTO orders (order_no, user_id, total_amount, delivery_fee, final_amount,
+                                        status, delivery_type, created_at, updated_at)
+                    SELECT :prefix || n, :user_id, 20, 0, 20,
+                           (ARRAY[4, 4, 4, 4, 4, 4, 4, 4, -1, -1])[1 + n % 10], 'pickup',
+                           now() - random() * interval '365 days', now()
+                    FROM generate_series(CAST(:start AS bigint), CAST(:stop AS bigint)) AS n
+                """), {"prefix": prefix, "user_id": user_id, "start": inserted, "stop": total - 1})
+                await session.commit()
+                await session.execute(text("ANALYZE orders"))
+                await session.commit()
+            inserted = total
+
+            results = {}
+            for mode, query in (("scan", dashboard_scan), ("rollup", dashboard_rollup)):
+                timings = await measure(Session, query, args.runs)
+                results[mode] = (statistics.median(timings), statistics.quantiles(timings, n=20)[-1])
+            print(f"{total:>9} orders: " + ", ".join(
+                f"{mode} p50={p50:7.2f}ms p95={p95:7.2f}ms" for mode, (p50, p95) in results.items()
+            ))
+    finally:
+        async with Session() as session:
+            await session.execute(delete(Order).where(Order.user_id == user_id))
+            await session.execute(delete(User).where(User.id == user_id))
+            await session.commit()
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,94 @@
+"""
+分页方式压测 (Pagination Benchmark)
+
+对比 offset 分页与游标 (keyset) 分页在第 1 页和深度翻页时的查询耗时:
+- offset: ORDER BY ... OFFSET (page - 1) * size LIMIT size，需要扫描并丢弃前面所有行
+- cursor: app.utils.pagination.paginate_keyset，从索引中的游标位置直接开始扫描
+
+测试数据在事务中批量插入，结束后回滚，不会留在数据库中。
+需要先执行 alembic upgrade head 创建游标分页索引。
+
+用法 (需要可连接的 PostgreSQL, 读取 .env 配置):
+    python benchmarks/bench_pagination.py --rows 200000 --size 10 --pages 1,100,10000
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import select, text
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+
+from app.core.config import settings
+from app.models.product import Category, Product
+from app.utils.pagination import paginate_keyset, encode_cursor
+
+
+async def timed(session, query, repeat: int) -> float:
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        (await session.execute(query)).all()
+        samples.append(time.perf_counter() - started)
+    return statistics.median(samples) * 1000
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=200000)
+    parser.add_argument("--size", type=int, default=10)
+    parser.add_argument("--pages", default="1,100,10000")
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+    pages = [int(p) for p in args.pages.split(",")]
+
+    engine = create_async_engine(str(settings.SQLALCHEMY_DATABASE_URI))
+    Session = async_sessionmaker(bind=engine)
+
+    async with Session() as session:
+        category = Category(name="bench")
+        session.add(category)
+        await session.flush()
+        await session.execute(
+            text(
+                "INSERT INTO products (category_id, name, price, stock, sales_count, status, created_at) "
+                "SELECT :cid, 'bench ' || g, 1, 1, 0, 1, now() - g * interval '1 second' "
+                "FROM generate_series(1, :rows) AS g"
+            ),
+            {"cid": category.id, "rows": args.rows},
+        )
+        await session.execute(text("ANALYZE products"))
+
+        base = select(Product.id, Product.name).where(Product.category_id == category.id, Product.status == 1)
+        keyset = (Product.id,)
+        print(f"rows={args.rows} size={args.size} (median of {args.repeat}, ms)")
+        for page in pages:
+            offset = (page - 1) * args.size
+            if offset >= args.rows:
+                print(f"page {page:>6}: skipped (beyond {args.rows} rows)")
+                continue
+            offset_query = base.order_by(Product.id.desc()).offset(offset).limit(args.size)
+
+            # 游标取自上一页最后一条 (不计时)
+            cursor = ""
+            if offset:
+                last_id = (await session.execute(
+                    base.with_only_columns(Product.id).order_by(Product.id.desc()).offset(offset - 1).limit(1)
+                )).scalar_one()
+                cursor = encode_cursor([last_id])
+            cursor_query = paginate_keyset(base, keyset, cursor, args.size)
+
+            offset_ms = await timed(session, offset_query, args.repeat)
+            cursor_ms = await timed(session, cursor_query, args.repeat)
+            print(f"page {page:>6}: offset {offset_ms:8.3f}  cursor {cursor_ms:8.3f}")
+
+        await session.rollback()
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,100 @@
+"""
+自提码分配压测 (Pickup Code Allocation Benchmark)
+
+预先写入不同数量的未完结自提订单 (占用对应数量的自提码)，再用
+app.services.pickup_code.allocator 分配自提码，统计每次分配的平均尝试次数和耗时。
+每次分配都在事务中插入一个订单后回滚，占用数量在测试过程中保持不变。
+
+分配只依赖部分唯一索引上的一次插入，耗时不随未完结订单数量增长；
+尝试次数只取决于占用率 p (约 1 / (1 - p))，90 万个码中占用 30 万时平均约 1.5 次。
+
+用法 (需要可连接的 PostgreSQL, 读取 .env 配置):
+    python benchmarks/bench_pickup_code.py --levels 0 10000 100000 300000 --allocations 500
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+import uuid
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import delete, func, select, text
+
+from app.core.database import SessionLocal, engine
+from app.models.order import ACTIVE_PICKUP_CODE, Order
+from app.models.user import User
+from app.services.pickup_code import allocator
+
+
+async def seed(user_id: int, count: int) -> None:
+    async with SessionLocal() as session:
+        await session.execute(delete(Order).where(Order.user_id == user_id))
+        # 从尚未被占用的码中随机取 count 个
+        await session.execute(text(f"""
+            INSERT INTO orders (order_no, user_id, total_amount, final_amount, status, delivery_type, pickup_code, created_at)
+            SELECT 'bench_pc_' || code, :user_id, 1, 1, 2, 'pickup', code::text, now()
+            FROM generate_series(100000, 999999) AS code
+            WHERE code::text NOT IN (SELECT pickup_code FROM orders WHERE {ACTIVE_PICKUP_CODE.text})
+            ORDER BY random()
+            LIMIT :count
+        """), {"user_id": user_id, "count": count})
+        await session.commit()
+        await session.execute(text("ANALYZE orders"))
+
+
+async def allocate(user_id: int, allocations: int) -> tuple:
+    samples = []
+    attempts = allocator.attempts
+    async with SessionLocal() as session:
+        for i in range(allocations):
+            started = time.perf_counter()
+            await allocator.insert_order(
+                session, order_no=f"bench_pc_new_{uuid.uuid4().hex[:16]}", user_id=user_id,
+                total_amount=1, final_amount=1, status=2, delivery_type="pickup",
+            )
+            samples.append(time.perf_counter() - started)
+            await session.rollback()
+    return (allocator.attempts - attempts) / allocations, samples
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--levels", type=int, nargs="+", default=[0, 10000, 100000, 300000])
+    parser.add_argument("--allocations", type=int, default=500)
+    args = parser.parse_args()
+
+    async with SessionLocal() as session:
+        user = User(openid=f"bench_pc_{uuid.uuid4().hex[:8]}", nickname="bench")
+        session.add(user)
+        await session.flush()
+        user_id = user.id
+        await session.commit()
+
+    print(f"{'active':>8} {'occupancy':>9} {'attempts':>8} {'mean ms':>8} {'p99 ms':>8}")
+    try:
+        for level in args.levels:
+            await seed(user_id, level)
+            async with SessionLocal() as session:
+                active = (await session.execute(
+                    select(func.count()).select_from(Order).where(ACTIVE_PICKUP_CODE)
+                )).scalar_one()
+            attempts, samples = await allocate(user_id, args.allocations)
+            samples.sort()
+            p99 = samples[max(int(len(samples) * 0.99) - 1, 0)]
+            print(
+                f"{active:>8} {active / 900000:>9.1%} {attempts:>8.2f} "
+                f"{statistics.mean(samples) * 1000:>8.2f} {p99 * 1000:>8.2f}"
+            )
+    finally:
+        async with SessionLocal() as session:
+            await session.execute(delete(Order).where(Order.user_id == user_id))
+            await session.execute(delete(User).where(User.id == user_id))
+            await session.commit()
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
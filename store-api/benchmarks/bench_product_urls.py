@@ -0,0 +1,73 @@
+"""
+商品列表序列化压测 (Product URL Signing Benchmark)
+
+对比一页商品 (默认 100 条) 序列化为 ProductListOut 的耗时:
+- sign: 每条商品都重新计算签名 URL (旧版行为，缓存关闭)
+- cached: 签名 URL 缓存命中
+- public: 配置 ALIYUN_OSS_PUBLIC_URL，直接拼接公开链接
+
+签名只在本地计算 HMAC，不访问 OSS，无需真实的 AccessKey 和数据库。
+
+用法:
+    python benchmarks/bench_product_urls.py --size 100 --repeat 200
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.core.config import settings
+from app.schemas import product as product_schemas
+from app.services.storage import AliyunOSSStorage
+
+
+def make_storage(public_url: str = "", cache_ttl: int = 86400) -> AliyunOSSStorage:
+    settings.ALIYUN_OSS_ACCESS_KEY_ID = "bench-key"
+    settings.ALIYUN_OSS_ACCESS_KEY_SECRET = "bench-secret"
+    settings.ALIYUN_OSS_ENDPOINT = "oss-cn-hangzhou.aliyuncs.com"
+    settings.ALIYUN_OSS_BUCKET_NAME = "bench-bucket"
+    settings.ALIYUN_OSS_PUBLIC_URL = public_url
+    settings.ALIYUN_OSS_URL_CACHE_TTL = cache_ttl
+    return AliyunOSSStorage()
+
+
+def timed(products, repeat: int) -> float:
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        product_schemas.ProductListOut(list=products, total=len(products), page=1, size=len(products))
+        samples.append(time.perf_counter() - started)
+    return statistics.median(samples) * 1000
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--size", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    products = [
+        {
+            "id": i, "category_id": 1, "name": f"product {i}", "price": "9.90", "stock": 10,
+            "sales_count": 0, "thumb_url": f"uploads/images/20240101/120000_{i:08x}.jpg",
+        }
+        for i in range(args.size)
+    ]
+    cases = {
+        "sign": make_storage(cache_ttl=0),
+        "cached": make_storage(),
+        "public": make_storage(public_url="https://cdn.example.com"),
+    }
+
+    print(f"size={args.size} (median of {args.repeat}, ms per page)")
+    for name, storage in cases.items():
+        product_schemas.storage = storage
+        timed(products, 1)  # 预热缓存
+        print(f"{name:>8} {timed(products, args.repeat):>8.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,213 @@
+"""
+销售统计接口压测 (Sales Stats Benchmark)
+
+写入大量历史订单 (默认 500 万单，分布在过去一年，每单 1-3 个商品)，
+对比不同查询区间下两种实现的耗时 (ms, p50):
+- scan: 直接在 orders / order_items 上按区间分组聚合 (created_at 范围条件可走索引，
+  但耗时与区间内的订单数成正比)
+- rollup: app.services.sales_rollup.sales_series / top_products，
+  只读取汇总表，耗时只与天数和商品数有关
+
+历史订单用 generate_series 分批插入，再按与迁移回填相同的方式一次性累加到汇总表
+(正常运行时由下单和订单完成增量维护)。结束后从汇总表中减去并删除测试数据。
+
+用法 (需要可连接的 PostgreSQL, 读取 .env 配置):
+    python benchmarks/bench_sales_stats.py --orders 5000000 --products 200 --runs 20
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+import uuid
+from datetime import timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import BigInteger, bindparam, delete, insert, select, text
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from app.core.config import settings
+from app.models.order import Order, OrderItem
+from app.models.product import Category, Product
+from app.models.stats import ProductSalesRollup
+from app.models.user import User
+from app.services import sales_rollup
+
+BATCH = 200000
+
+# 测试订单按下单时间累加到每日/每小时汇总，sign 为 -1 时减去
+ROLLUP_SQL = """
+    INSERT INTO {table} (day, {hour}shard, order_count, completed_count, sales_amount)
+    SELECT (created_at AT TIME ZONE :tz)::date, {hour_expr}0, :sign * count(*),
+           :sign * count(*) FILTER (WHERE status = 4),
+           :sign * coalesce(sum(final_amount) FILTER (WHERE status = 4), 0)
+    FROM orders
+    WHERE user_id = :user_id
+    GROUP BY {group}
+    ON CONFLICT ({keys}) DO UPDATE SET
+        order_count = {table}.order_count + EXCLUDED.order_count,
+        completed_count = {table}.completed_count + EXCLUDED.completed_count,
+        sales_amount = {table}.sales_amount + EXCLUDED.sales_amount
+"""
+
+SCAN_SALES = """
+    SELECT (created_at AT TIME ZONE :tz)::date, count(*),
+           count(*) FILTER (WHERE status = 4), coalesce(sum(final_amount) FILTER (WHERE status = 4), 0)
+    FROM orders
+    WHERE created_at >= :start AND created_at < :end
+    GROUP BY 1
+"""
+
+SCAN_PRODUCTS = """
+    SELECT i.product_id, sum(i.quantity), sum(i.price * i.quantity) AS amount, count(DISTINCT i.order_id)
+    FROM orders o
+    JOIN order_items i ON i.order_id = o.id
+    WHERE o.status = 4 AND o.created_at >= :start AND o.created_at < :end
+      AND i.product_id IS NOT NULL AND NOT i.is_removed
+    GROUP BY i.product_id
+    ORDER BY amount DESC
+    LIMIT 10
+"""
+
+
+async def apply_rollups(session, user_id: int, sign: int) -> None:
+    params = {"tz": settings.SHOP_TIMEZONE, "user_id": user_id, "sign": sign}
+    await session.execute(text(ROLLUP_SQL.format(
+        table="daily_sales_rollup", hour="", hour_expr="", group="1", keys="day, shard",
+    )), params)
+    await session.execute(text(ROLLUP_SQL.format(
+        table="hourly_sales_rollup", hour="hour, ",
+        hour_expr="extract(hour FROM created_at AT TIME ZONE :tz), ", group="1, 2", keys="day, hour, shard",
+    )), params)
+
+
+async def generate(Session, args, user_id: int, product_ids: list, prefix: str) -> None:
+    # 每批一条语句: 先生成订单和明细，按明细计算订单金额后写入订单，再按订单号关联写入明细
+    generate_batch = text("""
+        WITH src AS (
+            SELECT n, now() - random() * interval '365 days' AS created_at,
+                   (ARRAY[4, 4, 4, 4, 4, 4, 4, 4, -1, 2])[1 + n % 10] AS status
+            FROM generate_series(CAST(:start AS bigint), CAST(:stop AS bigint)) AS n
+        ),
+        items AS MATERIALIZED (
+            SELECT src.n, p.id AS product_id, p.name, p.price, 1 + (src.n + k) % 3 AS quantity
+            FROM src
+            CROSS JOIN LATERAL generate_series(1, 1 + (src.n % 3)::int) AS k
+            JOIN products p ON p.id = (:product_ids)[1 + ((src.n * 7 + k * 13) % :product_count)::int]
+        ),
+        new AS (
+            INSERT INTO orders (order_no, user_id, total_amount, delivery_fee, final_amount,
+                                status, delivery_type, created_at, updated_at)
+            SELECT :prefix || src.n, :user_id, a.amount, 0, a.amount, src.status, 'pickup', src.created_at, now()
+            FROM src
+            JOIN (SELECT n, sum(price * quantity) AS amount FROM items GROUP BY n) a ON a.n = src.n
+            RETURNING id, order_no
+        )
+        INSERT INTO order_items (order_id, product_id, product_name, price, quantity, is_removed)
+        SELECT new.id, items.product_id, items.name, items.price, items.quantity, false
+        FROM new
+        JOIN items ON items.n = substr(new.order_no, length(:prefix) + 1)::bigint
+    """).bindparams(bindparam("product_ids", type_=ARRAY(BigInteger)))
+    # 历史订单: 80% 已完成，10% 已取消，10% 待处理
+    for start in range(0, args.orders, BATCH):
+        stop = min(start + BATCH, args.orders) - 1
+        async with Session() as session:
+            await session.execute(generate_batch, {
+                "prefix": prefix, "user_id": user_id, "start": start, "stop": stop,
+                "product_ids": product_ids, "product_count": len(product_ids),
+            })
+            await session.commit()
+        print(f"  generated {stop + 1} orders", flush=True)
+
+    async with Session() as session:
+        await apply_rollups(session, user_id, 1)
+        await session.execute(text("""
+            INSERT INTO product_sales_rollup (day, product_id, product_name, quantity, sales_amount, order_count)
+            SELECT (o.created_at AT TIME ZONE :tz)::date, i.product_id, max(i.product_name),
+                   sum(i.quantity), sum(i.price * i.quantity), count(DISTINCT i.order_id)
+            FROM orders o
+            JOIN order_items i ON i.order_id = o.id
+            WHERE o.user_id = :user_id AND o.status = 4
+            GROUP BY 1, 2
+        """), {"tz": settings.SHOP_TIMEZONE, "user_id": user_id})
+        await session.commit()
+        await session.execute(text("ANALYZE orders"))
+        await session.execute(text("ANALYZE order_items"))
+        await session.commit()
+
+
+async def measure(Session, query, runs: int) -> float:
+    timings = []
+    async with Session() as session:
+        for _ in range(runs):
+            started = time.perf_counter()
+            await query(session)
+            timings.append((time.perf_counter() - started) * 1000)
+            await session.rollback()
+    return statistics.median(timings)
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--orders", type=int, default=5000000)
+    parser.add_argument("--products", type=int, default=200)
+    parser.add_argument("--ranges", default="7,30,365", help="查询区间 (天)")
+    parser.add_argument("--runs", type=int, default=20)
+    args = parser.parse_args()
+
+    engine = create_async_engine(str(settings.SQLALCHEMY_DATABASE_URI))
+    Session = async_sessionmaker(bind=engine)
+    prefix = f"BENCH_STATS_{uuid.uuid4().hex[:8]}_"
+    async with Session() as session:
+        category = Category(name="bench stats")
+        user = User(openid=f"bench_{uuid.uuid4().hex[:8]}", nickname="bench")
+        session.add_all([category, user])
+        await session.flush()
+        category_id, user_id = category.id, user.id
+        result = await session.execute(insert(Product).returning(Product.id), [
+            {"category_id": category_id, "name": f"bench stats product {i}", "price": 1 + i % 50,
+             "stock": 0, "sales_count": 0, "status": 1}
+            for i in range(args.products)
+        ])
+        product_ids = list(result.scalars().all())
+        await session.commit()
+
+    try:
+        started = time.perf_counter()
+        await generate(Session, args, user_id, product_ids, prefix)
+        print(f"generated {args.orders} orders in {time.perf_counter() - started:.0f}s")
+
+        today = sales_rollup.local_today()
+        end = today + timedelta(days=1)
+        for days in (int(n) for n in args.ranges.split(",")):
+            start = end - timedelta(days=days)
+            bounds = dict(zip(("start", "end"), sales_rollup.day_bounds(start, end)))
+            granularity = "hour" if days <= sales_rollup.MAX_RANGE_DAYS["hour"] else "day"
+            results = {
+                "scan sales": await measure(Session, lambda s: s.execute(
+                    text(SCAN_SALES), {"tz": settings.SHOP_TIMEZONE, **bounds}), args.runs),
+                f"rollup sales ({granularity})": await measure(Session, lambda s: sales_rollup.sales_series(
+                    s, start, end, granularity), args.runs),
+                "scan top10": await measure(Session, lambda s: s.execute(text(SCAN_PRODUCTS), bounds), args.runs),
+                "rollup top10": await measure(Session, lambda s: sales_rollup.top_products(s, start, end), args.runs),
+            }
+            print(f"{days:>4} days: " + ", ".join(f"{name} {ms:8.2f}ms" for name, ms in results.items()))
+    finally:
+        async with Session() as session:
+            await apply_rollups(session, user_id, -1)
+            await session.execute(delete(ProductSalesRollup).where(ProductSalesRollup.product_id.in_(product_ids)))
+            order_ids = select(Order.id).where(Order.user_id == user_id)
+            await session.execute(delete(OrderItem).where(OrderItem.order_id.in_(order_ids)))
+            await session.execute(delete(Order).where(Order.user_id == user_id))
+            await session.execute(delete(Product).where(Product.category_id == category_id))
+            await session.execute(delete(Category).where(Category.id == category_id))
+            await session.execute(delete(User).where(User.id == user_id))
+            await session.commit()
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
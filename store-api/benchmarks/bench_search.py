@@ -0,0 +1,122 @@
+"""
+商品关键字搜索压测 (Product Search Benchmark)
+
+对比两种关键字筛选方式的查询耗时:
+- ilike: 旧版 name ILIKE '%keyword%'，每次搜索顺序扫描整张表
+- ngram: app.utils.search.keyword_search，n-gram 检索向量 + GIN 索引筛选候选，再以 ILIKE 复核并按相关度排序
+
+每种方式分别测量 "第一页 (LIMIT 20)" 和 "命中总数 (COUNT)" 两条查询。
+测试数据在事务中批量导入，结束后回滚，不会留在数据库中。
+需要先执行 alembic upgrade head 创建检索列和索引。
+
+用法 (需要可连接的 PostgreSQL, 读取 .env 配置):
+    python benchmarks/bench_search.py --rows 100000,1000000
+"""
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import select, func, text
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+
+from app.core.config import settings
+from app.models.product import Category, Product
+from app.utils.search import keyword_search, tsvector_literal
+
+ORIGINS = ["进口", "国产", "新疆", "山东", "云南", "海南", "泰国", "智利", "东北", "本地"]
+ADJECTIVES = ["新鲜", "有机", "精选", "特级", "冷冻", "散装", "礼盒装", "家庭装", "当季", "脆甜"]
+GOODS = [
+    "苹果", "香蕉", "橙子", "葡萄", "西瓜", "草莓", "芒果", "菠萝", "猕猴桃", "火龙果",
+    "大米", "面粉", "鸡蛋", "牛奶", "酸奶", "面包", "饺子", "汤圆", "牛肉", "猪肉",
+    "鸡胸肉", "三文鱼", "虾仁", "土豆", "西红柿", "黄瓜", "白菜", "生菜", "洋葱", "大蒜",
+    "可乐", "矿泉水", "果汁", "啤酒", "薯片", "饼干", "巧克力", "花生油", "酱油", "食醋",
+]
+RARE_GOODS = ["榴莲干", "车厘子"]
+KEYWORDS = ["苹果", "牛奶", "有机", "鸡胸肉", "榴莲干", "500g", "果"]
+
+
+def product_name(i: int) -> str:
+    goods = random.choice(RARE_GOODS) if i % 5000 == 0 else random.choice(GOODS)
+    return f"{random.choice(ORIGINS)}{random.choice(ADJECTIVES)}{goods} {random.choice([250, 500, 1000])}g"
+
+
+async def load(session, category_id: int, rows: int) -> None:
+    connection = await session.connection()
+    raw = (await connection.get_raw_connection()).driver_connection
+    await raw.execute("CREATE TEMP TABLE bench_names (name text, vector text) ON COMMIT DROP")
+    batch = 50000
+    for start in range(0, rows, batch):
+        records = []
+        for i in range(start, min(start + batch, rows)):
+            name = product_name(i)
+            records.append((name, tsvector_literal(name)))
+        await raw.copy_records_to_table("bench_names", records=records)
+    await raw.execute(
+        "INSERT INTO products (category_id, name, price, stock, sales_count, status, search_vector) "
+        f"SELECT {category_id}, name, 1, 1, 0, 1, vector::tsvector FROM bench_names"
+    )
+    await raw.execute("ANALYZE products")
+
+
+async def timed(session, query, repeat: int) -> float:
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        (await session.execute(query)).all()
+        samples.append(time.perf_counter() - started)
+    return statistics.median(samples) * 1000
+
+
+async def run(Session, rows: int, repeat: int) -> None:
+    async with Session() as session:
+        category = Category(name="bench")
+        session.add(category)
+        await session.flush()
+        started = time.perf_counter()
+        await load(session, category.id, rows)
+        print(f"\nrows={rows} (loaded in {time.perf_counter() - started:.1f}s, median of {repeat}, ms)")
+        print(f"{'keyword':>8} {'hits':>8} {'ilike page':>11} {'ngram page':>11} {'ilike count':>12} {'ngram count':>12}")
+
+        base = select(Product.id, Product.name).where(Product.status == 1)
+        for keyword in KEYWORDS:
+            ilike = base.where(Product.name.ilike(f"%{keyword}%"))
+            conditions, relevance = keyword_search(Product.search_vector, Product.name, keyword)
+            ngram = base.where(*conditions)
+
+            ilike_page = ilike.order_by(Product.id.desc()).limit(20)
+            ngram_page = ngram.order_by(*relevance, Product.id.desc()).limit(20)
+            ilike_count = select(func.count()).select_from(ilike.subquery())
+            ngram_count = select(func.count()).select_from(ngram.subquery())
+
+            hits = (await session.execute(ngram_count)).scalar_one()
+            assert hits == (await session.execute(ilike_count)).scalar_one()
+            print(
+                f"{keyword:>8} {hits:>8} "
+                f"{await timed(session, ilike_page, repeat):>11.2f} {await timed(session, ngram_page, repeat):>11.2f} "
+                f"{await timed(session, ilike_count, repeat):>12.2f} {await timed(session, ngram_count, repeat):>12.2f}"
+            )
+        await session.rollback()
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", default="100000,1000000")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    random.seed(42)
+
+    engine = create_async_engine(str(settings.SQLALCHEMY_DATABASE_URI))
+    Session = async_sessionmaker(bind=engine)
+    for rows in (int(r) for r in args.rows.split(",")):
+        await run(Session, rows, args.repeat)
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,99 @@
+"""
+商品图片缩略图压测 (Thumbnail Pipeline Benchmark)
+
+- 体积: 手机拍摄尺寸的原图与各尺寸缩略图的字节数 (商品列表每个格子的下载量)
+- 耗时: 逐张在当前进程中生成 vs 在 app.services.images 的进程池中并发生成
+
+测试图片为合成的照片级内容 (渐变 + 噪点)，不需要数据库和存储。
+
+用法:
+    python benchmarks/bench_thumbnails.py --images 8 --width 4032 --height 3024
+"""
+import argparse
+import asyncio
+import io
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PIL import Image
+
+from app.core.config import settings
+from app.services import images
+from app.utils.images import render_variants
+
+
+def make_photo(width: int, height: int, seed: int) -> bytes:
+    detail = Image.effect_mandelbrot((width, height), (-2.0 + seed * 0.05, -1.2, 1.0, 1.2), 64)
+    gradient = Image.linear_gradient("L").resize((width, height)).rotate(seed * 37 % 360)
+    grain = Image.blend(gradient, Image.effect_noise((width, height), 12), 0.15)
+    photo = Image.merge("RGB", (detail, grain, Image.blend(detail, gradient, 0.5)))
+    buffer = io.BytesIO()
+    photo.save(buffer, format="JPEG", quality=90)
+    return buffer.getvalue()
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--images", type=int, default=8)
+    parser.add_argument("--width", type=int, default=4032)
+    parser.add_argument("--height", type=int, default=3024)
+    args = parser.parse_args()
+
+    sizes = settings.IMAGE_VARIANT_SIZES
+    fmt, quality = settings.IMAGE_VARIANT_FORMAT, settings.IMAGE_VARIANT_QUALITY
+    photos = [make_photo(args.width, args.height, i) for i in range(args.images)]
+
+    variants = render_variants(photos[0], sizes, fmt, quality)
+    print(f"original {args.width}x{args.height} JPEG: {len(photos[0]) / 1024:>8.1f} KB")
+    for size in sorted(variants):
+        ratio = len(photos[0]) / len(variants[size])
+        print(f"{fmt} {size:>4}px: {len(variants[size]) / 1024:>8.1f} KB ({ratio:.0f}x smaller)")
+
+    async def inline() -> None:
+        for photo in photos:
+            render_variants(photo, sizes, fmt, quality)
+
+    loop = asyncio.get_running_loop()
+    executor = images.get_executor()
+    await loop.run_in_executor(executor, render_variants, photos[0], sizes, fmt, quality)  # 预热子进程
+
+    async def pooled() -> None:
+        await asyncio.gather(*(
+            loop.run_in_executor(executor, render_variants, photo, sizes, fmt, quality) for photo in photos
+        ))
+
+    print(f"\n{args.images} images, sizes={sizes}, cpus={os.cpu_count()}")
+    print(f"{'mode':>8} {'ms/image':>9} {'max loop stall ms':>18}")
+    for name, job in (("inline", inline), (f"pool({settings.IMAGE_PROCESS_WORKERS})", pooled)):
+        elapsed, stall = await with_stall_monitor(job)
+        print(f"{name:>8} {elapsed / args.images * 1000:>9.1f} {stall * 1000:>18.1f}")
+    images.shutdown()
+
+
+async def with_stall_monitor(job):
+    """执行 job，同时每 5ms 唤醒一次，记录事件循环最长的阻塞时间"""
+    stall = 0.0
+    done = False
+
+    async def monitor() -> None:
+        nonlocal stall
+        while not done:
+            started = time.perf_counter()
+            await asyncio.sleep(0.005)
+            stall = max(stall, time.perf_counter() - started - 0.005)
+
+    watcher = asyncio.create_task(monitor())
+    await asyncio.sleep(0)
+    started = time.perf_counter()
+    await job()
+    elapsed = time.perf_counter() - started
+    done = True
+    await watcher
+    return elapsed, stall
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,144 @@
+"""
+上传并发压测 (Upload Load Test)
+
+在上传视频的同时每 10ms 发起一次 /health 请求，统计从计划发起时间到收到响应的延迟
+(事件循环被阻塞时请求无法按时发出，这段等待也计入延迟)，对比两种上传实现:
+- blocking: 旧版实现，await file.read() 整体读入内存后在事件循环中同步调用 put_object
+- pooled: AliyunOSSStorage.upload，SDK 调用在上传线程池中执行，大文件分片上传
+
+OSS 由本地替身 SlowBucket 代替: 按给定带宽 time.sleep 模拟同步 SDK 的网络传输耗时，
+无需真实的 OSS 和数据库。
+
+用法:
+    python benchmarks/bench_upload.py --uploads 4 --size-mb 20 --bandwidth-mb 50
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from httpx import ASGITransport, AsyncClient
+
+from app.api.v1.endpoints import common
+from app.core.config import settings
+from app.services.storage import AliyunOSSStorage, build_object_name
+from main import app
+
+
+class SlowBucket:
+    """模拟同步 OSS SDK: 每次调用按数据量阻塞当前线程"""
+
+    def __init__(self, bandwidth: float):
+        self.bandwidth = bandwidth
+
+    def _transfer(self, size: int) -> None:
+        time.sleep(size / self.bandwidth)
+
+    def put_object(self, key, data, headers=None):
+        if isinstance(data, bytes):
+            self._transfer(len(data))
+            return
+        # 与 SDK 一样分块读取并发送文件
+        while chunk := data.read(64 * 1024):
+            self._transfer(len(chunk))
+
+    def init_multipart_upload(self, key, headers=None):
+        return SimpleNamespace(upload_id="bench")
+
+    def upload_part(self, key, upload_id, part_number, data):
+        self._transfer(len(data))
+        return SimpleNamespace(etag=str(part_number))
+
+    def complete_multipart_upload(self, key, upload_id, parts):
+        pass
+
+    def abort_multipart_upload(self, key, upload_id):
+        pass
+
+
+class BlockingStorage(AliyunOSSStorage):
+    """旧版上传实现"""
+
+    async def upload(self, file, folder: str = "uploads") -> str:
+        object_name = build_object_name(file, folder)
+        content = await file.read()
+        self.bucket.put_object(object_name, content)
+        return object_name
+
+
+def make_storage(cls, bandwidth: float) -> AliyunOSSStorage:
+    settings.ALIYUN_OSS_ACCESS_KEY_ID = "bench-key"
+    settings.ALIYUN_OSS_ACCESS_KEY_SECRET = "bench-secret"
+    settings.ALIYUN_OSS_ENDPOINT = "oss-cn-hangzhou.aliyuncs.com"
+    settings.ALIYUN_OSS_BUCKET_NAME = "bench-bucket"
+    settings.ALIYUN_OSS_PUBLIC_URL = "https://cdn.example.com"
+    storage = cls()
+    storage.bucket = SlowBucket(bandwidth)
+    return storage
+
+
+async def run(client: AsyncClient, payload: bytes, uploads: int) -> dict:
+    latencies = []
+    done = asyncio.Event()
+
+    async def probe() -> None:
+        scheduled = time.perf_counter()
+        while not done.is_set():
+            await client.get("/health")
+            latencies.append(time.perf_counter() - scheduled)
+            # 下一次请求的计划时间; 已经错过的计划按 "立即发起" 计算
+            scheduled = max(scheduled + 0.01, time.perf_counter())
+            await asyncio.sleep(scheduled - time.perf_counter())
+
+    async def upload() -> None:
+        res = await client.post(
+            f"{settings.API_V1_STR}/upload",
+            files={"file": ("clip.mp4", payload, "video/mp4")},
+        )
+        assert res.json()["code"] == 200, res.text
+
+    prober = asyncio.create_task(probe())
+    started = time.perf_counter()
+    await asyncio.gather(*(upload() for _ in range(uploads)))
+    elapsed = time.perf_counter() - started
+    done.set()
+    await prober
+
+    latencies.sort()
+    return {
+        "elapsed": elapsed,
+        "probes": len(latencies),
+        "p50": statistics.median(latencies) * 1000,
+        "p99": latencies[max(int(len(latencies) * 0.99) - 1, 0)] * 1000,
+        "max": latencies[-1] * 1000,
+    }
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--uploads", type=int, default=4)
+    parser.add_argument("--size-mb", type=float, default=20)
+    parser.add_argument("--bandwidth-mb", type=float, default=50)
+    args = parser.parse_args()
+
+    payload = os.urandom(int(args.size_mb * 1024 * 1024))
+    bandwidth = args.bandwidth_mb * 1024 * 1024
+    print(
+        f"uploads={args.uploads} size={args.size_mb}MB bandwidth={args.bandwidth_mb}MB/s "
+        f"threads={settings.UPLOAD_THREADS} (/health latency, ms)"
+    )
+    print(f"{'mode':>9} {'total s':>8} {'probes':>7} {'p50':>8} {'p99':>8} {'max':>8}")
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://bench", timeout=None) as client:
+        for name, cls in (("blocking", BlockingStorage), ("pooled", AliyunOSSStorage)):
+            common.storage = make_storage(cls, bandwidth)
+            r = await run(client, payload, args.uploads)
+            print(f"{name:>9} {r['elapsed']:>8.2f} {r['probes']:>7} {r['p50']:>8.2f} {r['p99']:>8.2f} {r['max']:>8.2f}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,129 @@
+"""
+微信 API 客户端压测 (WeChat Client Benchmark)
+
+在本地启动一个 HTTPS 服务模拟 jscode2session，对比两种调用方式的单次登录请求耗时:
+- per-request: 旧版实现，每次登录新建 httpx.AsyncClient (每次都要建立 TCP 连接和 TLS 握手)
+- pooled: app.services.wechat.WeChatClient，复用长连接
+
+本地回环网络的往返时间接近 0，测得的差值主要是 TLS 握手的计算开销；
+到微信服务器的真实链路上，每次新建连接还要额外付出 2~3 个网络往返。
+
+用法:
+    python benchmarks/bench_wechat_client.py --requests 200
+"""
+import argparse
+import asyncio
+import datetime
+import os
+import socket
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import httpx
+import uvicorn
+from cryptography import x509
+from cryptography.hazmat.primitives import hashes, serialization
+from cryptography.hazmat.primitives.asymmetric import ec
+from cryptography.x509.oid import NameOID
+from starlette.applications import Starlette
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+
+
+def write_certificate(directory: str) -> tuple:
+    key = ec.generate_private_key(ec.SECP256R1())
+    name = x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, "localhost")])
+    now = datetime.datetime.now(datetime.timezone.utc)
+    cert = (
+        x509.CertificateBuilder()
+        .subject_name(name).issuer_name(name).public_key(key.public_key())
+        .serial_number(x509.random_serial_number())
+        .not_valid_before(now).not_valid_after(now + datetime.timedelta(days=1))
+        .add_extension(x509.SubjectAlternativeName([x509.DNSName("localhost")]), critical=False)
+        .add_extension(x509.BasicConstraints(ca=True, path_length=None), critical=True)
+        .sign(key, hashes.SHA256())
+    )
+    cert_file, key_file = os.path.join(directory, "cert.pem"), os.path.join(directory, "key.pem")
+    with open(cert_file, "wb") as f:
+        f.write(cert.public_bytes(serialization.Encoding.PEM))
+    with open(key_file, "wb") as f:
+        f.write(key.private_bytes(
+            serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8, serialization.NoEncryption()
+        ))
+    return cert_file, key_file
+
+
+async def jscode2session(request):
+    return JSONResponse({"openid": f"openid_{request.query_params['js_code']}", "session_key": "key"})
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+async def timed(call, requests: int) -> list:
+    samples = []
+    for i in range(requests):
+        started = time.perf_counter()
+        data = await call(f"code_{i}")
+        samples.append(time.perf_counter() - started)
+        assert data["openid"] == f"openid_code_{i}"
+    return samples
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=200)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        cert_file, key_file = write_certificate(directory)
+        # httpx 信任 SSL_CERT_FILE 指定的证书 (自签名的本地服务)
+        os.environ["SSL_CERT_FILE"] = cert_file
+        port = free_port()
+        base_url = f"https://localhost:{port}"
+
+        from app.services import wechat
+
+        server = uvicorn.Server(uvicorn.Config(
+            Starlette(routes=[Route("/sns/jscode2session", jscode2session)]),
+            host="127.0.0.1", port=port, ssl_certfile=cert_file, ssl_keyfile=key_file, log_level="warning",
+        ))
+        serving = asyncio.create_task(server.serve())
+        while not server.started:
+            await asyncio.sleep(0.01)
+
+        async def per_request(code: str) -> dict:
+            async with httpx.AsyncClient() as client:
+                response = await client.get(f"{base_url}/sns/jscode2session", params={"js_code": code})
+                return response.json()
+
+        client = wechat.WeChatClient(base_url=base_url)
+
+        async def pooled(code: str) -> dict:
+            return await client.get("/sns/jscode2session", params={"js_code": code})
+
+        print(f"requests={args.requests} (ms per login request)")
+        print(f"{'mode':>12} {'p50':>7} {'p99':>7} {'mean':>7}")
+        for name, call in (("per-request", per_request), ("pooled", pooled)):
+            await call("warmup")
+            samples = sorted(await timed(call, args.requests))
+            p99 = samples[max(int(len(samples) * 0.99) - 1, 0)]
+            print(
+                f"{name:>12} {statistics.median(samples) * 1000:>7.2f} {p99 * 1000:>7.2f} "
+                f"{statistics.mean(samples) * 1000:>7.2f}"
+            )
+
+        await client.aclose()
+        server.should_exit = True
+        await serving
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -1,16 +1,70 @@
+import asyncio
+from contextlib import asynccontextmanager
+from urllib.parse import urlparse
+
 from fastapi import FastAPI, Request
 from fastapi.responses import JSONResponse
 from fastapi.exceptions import RequestValidationError
+from fastapi.exception_handlers import http_exception_handler as default_http_exception_handler
 from starlette.exceptions import HTTPException as StarletteHTTPException
 from fastapi.middleware.cors import CORSMiddleware
 from app.core.config import settings
 from app.api.v1.api import api_router
+from app.core.database import SessionLocal
 from app.schemas.response import error
+from app.services import images, order_events, order_no, stock, wechat
+from app.services.storage import LocalStorage, storage
+from app.services.catalog import catalog
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """应用生命周期: 启动/停止后台任务"""
+    flusher = None
+    if settings.STOCK_BACKEND == "memory":
+        # 内存库存层: 启动时先对账，之后定期回写数据库
+        async with SessionLocal() as session:
+            await stock.stock_backend.reconcile(session)
+        flusher = asyncio.create_task(stock.run_flusher(settings.STOCK_FLUSH_INTERVAL))
+    async with SessionLocal() as session:
+        # 订单号: 租用本进程的 worker id，多进程生成的订单号互不重复
+        await order_no.assign_worker_id(session)
+        await session.commit()
+    lease_renewer = asyncio.create_task(order_no.run_lease_renewer())
+    token_refresher = None
+    if settings.WECHAT_APP_ID:
+        # 微信 access_token: 后台提前刷新，业务请求不必等待
+        token_refresher = asyncio.create_task(wechat.token_manager.run_refresher())
+    if catalog.enabled:
+        # 商品目录快照: 启动时预先构建，避免首个请求承担加载开销
+        async with SessionLocal() as session:
+            await catalog.ensure_fresh(session)
+    # 订单事件: 监听 PostgreSQL 通知，分发给本进程的推送连接
+    order_events.broker.start()
+    yield
+    await order_events.broker.stop()
+    if token_refresher:
+        token_refresher.cancel()
+    if flusher:
+        # 等待后台回写结束 (被取消的回写事务先回滚)，再做最后一次回写
+        flusher.cancel()
+        try:
+            await flusher
+        except asyncio.CancelledError:
+            pass
+        async with SessionLocal() as session:
+            await stock.stock_backend.flush(session)
+    lease_renewer.cancel()
+    async with SessionLocal() as session:
+        await order_no.release_worker_id(session)
+        await session.commit()
+    images.shutdown()
+    await wechat.wechat_client.aclose()
 
 app = FastAPI(
     title=settings.PROJECT_NAME,
     openapi_url=f"{settings.API_V1_STR}/openapi.json",
-    description="Store API 接口文档"
+    description="Store API 接口文档",
+    lifespan=lifespan,
 )
 
 # 配置 CORS
@@ -36,8 +90,11 @@ async def validation_exception_handler(request: Request, exc: RequestValidationE
 
 # 2. 捕获 HTTP 异常 (代码中主动抛出的 HTTPException)
 # 保持 HTTP 状态码为 200，通过 body 中的 code 区分业务错误
+# 仅限 API 路由: 静态文件等其他路由保留真实的状态码 (如 404)，浏览器和 CDN 才不会把错误信息当作文件内容
 @app.exception_handler(StarletteHTTPException)
 async def http_exception_handler(request: Request, exc: StarletteHTTPException):
+    if not request.url.path.startswith(settings.API_V1_STR):
+        return await default_http_exception_handler(request, exc)
     return JSONResponse(
         status_code=200,
         content=error(
@@ -63,6 +120,10 @@ async def global_exception_handler(request: Request, exc: Exception):
 # 注册 API 路由
 app.include_router(api_router, prefix=settings.API_V1_STR)
 
+# 本地存储: 挂载上传文件的静态路由
+if isinstance(storage, LocalStorage):
+    app.mount(urlparse(storage.base_url).path or "/files", storage.static_app(), name="files")
+
 @app.get("/")
 async def root():
     return {"message": "Welcome to Store API"}
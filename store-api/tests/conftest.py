@@ -1,8 +1,10 @@
+import httpx
 import pytest
 import pytest_asyncio
 from typing import AsyncGenerator, Dict, Generator
 from fastapi.testclient import TestClient
 from httpx import AsyncClient
+from sqlalchemy import event
 from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine, async_sessionmaker
 from sqlalchemy.pool import NullPool
 import sys
@@ -15,6 +17,7 @@ from main import app
 from app.core.config import settings
 from app.core.database import Base
 from app.api import deps
+from app.services import wechat
 
 # Use the same database for simplicity in this environment, 
 # or use a separate test DB URL if available.
@@ -41,13 +44,32 @@ async def db_session() -> AsyncGenerator[AsyncSession, None]:
 
 from httpx import AsyncClient, ASGITransport
 
+@pytest.fixture
+def statements() -> Generator[list, None, None]:
+    # SQL statements sent to the test database while the fixture is active
+    recorded = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        recorded.append(statement)
+
+    event.listen(engine.sync_engine, "before_cursor_execute", record)
+    yield recorded
+    event.remove(engine.sync_engine, "before_cursor_execute", record)
+
+@pytest.fixture
+def session_factory() -> async_sessionmaker:
+    # Extra sessions for queries that run concurrently within one request
+    return TestingSessionLocal
+
 @pytest_asyncio.fixture
-async def client(db_session: AsyncSession) -> AsyncGenerator[AsyncClient, None]:
+async def client(db_session: AsyncSession, session_factory: async_sessionmaker) -> AsyncGenerator[AsyncClient, None]:
     # Override the dependency
     async def override_get_db():
         yield db_session
     
     app.dependency_overrides[deps.get_db] = override_get_db
+    app.dependency_overrides[deps.get_read_db] = override_get_db
+    app.dependency_overrides[deps.get_read_session_factory] = lambda: session_factory
     
     # Newer httpx versions use transport=ASGITransport(app=app) instead of app=app
     async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as c:
@@ -73,3 +95,57 @@ async def admin_token_headers(client: AsyncClient) -> Dict[str, str]:
     response = await client.post(f"{settings.API_V1_STR}/auth/login", json=login_data)
     token = response.json()["data"]["token"]
     return {"Authorization": f"Bearer {token}"}
+
+class FakeWeChat:
+    """
+    本地微信 API 替身 (httpx.MockTransport)
+
+    - routes: 路径 -> 处理函数 (request -> httpx.Response)，测试可替换或新增
+    - failures: 依次取出并抛出/返回的失败 (异常或 httpx.Response)，用于测试重试
+    - requests: 收到的请求
+    - tokens: 已签发的 access_token，只有最后一个有效
+    """
+    def __init__(self):
+        self.requests = []
+        self.failures = []
+        self.tokens = []
+        self.routes = {
+            "/sns/jscode2session": self.jscode2session,
+            "/cgi-bin/token": self.issue_token,
+            "/cgi-bin/message/subscribe/send": self.subscribe_send,
+        }
+
+    @staticmethod
+    def jscode2session(request: httpx.Request) -> httpx.Response:
+        code = request.url.params["js_code"]
+        if code.startswith("mock_code"):
+            # 与真实接口一样拒绝无效 code，由登录接口的开发环境逻辑处理
+            return httpx.Response(200, json={"errcode": 40029, "errmsg": "invalid code"})
+        return httpx.Response(200, json={"openid": f"openid_{code}", "session_key": "key"})
+
+    def issue_token(self, request: httpx.Request) -> httpx.Response:
+        # 与真实接口一样，新凭证签发后旧凭证失效
+        self.tokens.append(f"token-{len(self.tokens) + 1}")
+        return httpx.Response(200, json={"access_token": self.tokens[-1], "expires_in": 7200})
+
+    def subscribe_send(self, request: httpx.Request) -> httpx.Response:
+        if not self.tokens or request.url.params.get("access_token") != self.tokens[-1]:
+            return httpx.Response(200, json={"errcode": 40001, "errmsg": "invalid credential"})
+        return httpx.Response(200, json={"errcode": 0, "errmsg": "ok"})
+
+    def handle(self, request: httpx.Request) -> httpx.Response:
+        self.requests.append(request)
+        if self.failures:
+            failure = self.failures.pop(0)
+            if isinstance(failure, Exception):
+                raise failure
+            return failure
+        return self.routes[request.url.path](request)
+
+@pytest.fixture(autouse=True)
+def fake_wechat(monkeypatch) -> FakeWeChat:
+    # Tests never reach the real WeChat API
+    fake = FakeWeChat()
+    monkeypatch.setattr(wechat, "wechat_client", wechat.WeChatClient(transport=httpx.MockTransport(fake.handle)))
+    monkeypatch.setattr(settings, "WECHAT_RETRY_BACKOFF", 0)
+    return fake
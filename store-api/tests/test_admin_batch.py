@@ -0,0 +1,118 @@
+import pytest
+import uuid
+from sqlalchemy import select
+from app.models.order import Order, OrderTimeline
+from app.models.user import User
+from app.core.config import settings
+
+
+async def create_orders(db_session, statuses, delivery_type="delivery"):
+    unique_suffix = str(uuid.uuid4())[:8]
+    user = User(openid=f"test_batch_{unique_suffix}", nickname="Batch User")
+    db_session.add(user)
+    await db_session.flush()
+    orders = [
+        Order(
+            order_no=f"TEST_BATCH_{unique_suffix}_{i}",
+            user_id=user.id,
+            total_amount=10.00,
+            delivery_fee=0,
+            final_amount=10.00,
+            status=status,
+            delivery_type=delivery_type,
+            address_snapshot={},
+        )
+        for i, status in enumerate(statuses)
+    ]
+    db_session.add_all(orders)
+    await db_session.flush()
+    order_ids = [order.id for order in orders]
+    await db_session.commit()
+    return order_ids
+
+
+async def get_order(db_session, order_id):
+    return await db_session.get(Order, order_id, populate_existing=True)
+
+
+@pytest.mark.asyncio
+async def test_batch_audit_orders(client, db_session, admin_token_headers):
+    pending, accepted, other = await create_orders(db_session, [1, 3, 1])
+    missing = other + 100000
+
+    response = await client.post(
+        f"{settings.API_V1_STR}/admin/order/batch/audit",
+        headers=admin_token_headers,
+        json={"order_ids": [pending, accepted, missing, other, pending], "action": "accept"},
+    )
+    assert response.status_code == 200, response.text
+    data = response.json()["data"]
+    assert data["succeeded"] == 2
+    assert data["failed"] == 2
+    assert [r["order_id"] for r in data["results"]] == [pending, accepted, missing, other]
+    results = {r["order_id"]: r for r in data["results"]}
+    assert results[pending]["success"] and results[other]["success"]
+    assert results[accepted]["msg"] == "当前订单状态不可操作"
+    assert results[missing]["msg"] == "订单不存在"
+
+    assert (await get_order(db_session, pending)).status == 3
+    assert (await get_order(db_session, other)).status == 3
+    timeline = (await db_session.execute(
+        select(OrderTimeline.order_id).where(OrderTimeline.order_id.in_([pending, accepted, other]))
+    )).scalars().all()
+    assert sorted(timeline) == sorted([pending, other])
+
+    # Reject requires a reason
+    response = await client.post(
+        f"{settings.API_V1_STR}/admin/order/batch/audit",
+        headers=admin_token_headers,
+        json={"order_ids": [pending], "action": "reject"},
+    )
+    assert response.json()["code"] == 400
+
+
+@pytest.mark.asyncio
+async def test_batch_reject_and_complete(client, db_session, admin_token_headers):
+    first, second = await create_orders(db_session, [1, 3])
+
+    response = await client.post(
+        f"{settings.API_V1_STR}/admin/order/batch/audit",
+        headers=admin_token_headers,
+        json={"order_ids": [first], "action": "reject", "reject_reason": "缺货"},
+    )
+    assert response.json()["data"]["succeeded"] == 1
+
+    response = await client.post(
+        f"{settings.API_V1_STR}/admin/order/batch/complete_delivery",
+        headers=admin_token_headers,
+        json={"order_ids": [first, second]},
+    )
+    data = response.json()["data"]
+    assert [r["success"] for r in data["results"]] == [False, True]
+
+    rejected = await get_order(db_session, first)
+    assert rejected.status == -1 and rejected.reject_reason == "缺货"
+    delivered = await get_order(db_session, second)
+    assert delivered.status == 4 and delivered.verified_at is not None
+
+
+@pytest.mark.asyncio
+async def test_batch_verify_pickup(client, db_session, admin_token_headers):
+    pickup = await create_orders(db_session, [2, 2], delivery_type="pickup")
+    delivery = await create_orders(db_session, [2])
+
+    response = await client.post(
+        f"{settings.API_V1_STR}/admin/order/batch/verify",
+        headers=admin_token_headers,
+        json={"order_ids": pickup + delivery},
+    )
+    data = response.json()["data"]
+    assert data["succeeded"] == 2
+    assert data["results"][2] == {"order_id": delivery[0], "success": False, "msg": "订单状态不满足核销条件"}
+
+    response = await client.post(
+        f"{settings.API_V1_STR}/admin/order/batch/verify",
+        headers=admin_token_headers,
+        json={"order_ids": []},
+    )
+    assert response.json()["code"] != 200
@@ -27,3 +27,18 @@ async def test_admin_order_list(client: AsyncClient, admin_token_headers):
             assert "nickname" in first_order["user"]
             assert "phone" in first_order["user"]
 
+
+@pytest.mark.asyncio
+async def test_admin_order_list_cursor(client: AsyncClient, admin_token_headers):
+    url = f"{settings.API_V1_STR}/admin/order/list"
+    res = await client.get(url, params={"size": 1000000}, headers=admin_token_headers)
+    expected = [o["id"] for o in res.json()["data"]["list"]]
+
+    # Walking the cursor visits every order exactly once, in the same order
+    seen, cursor = [], ""
+    while cursor is not None:
+        res = await client.get(url, params={"size": 2, "cursor": cursor}, headers=admin_token_headers)
+        data = res.json()["data"]
+        seen.extend(o["id"] for o in data["list"])
+        cursor = data["next_cursor"]
+    assert seen == expected
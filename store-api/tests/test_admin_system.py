@@ -105,3 +105,57 @@ async def test_admin_user_list(client: AsyncClient, admin_token_headers):
     res = await client.get(f"{settings.API_V1_STR}/admin/user/list", headers=admin_token_headers)
     assert res.json()["code"] == 200
     assert "list" in res.json()["data"]
+
+@pytest.mark.asyncio
+async def test_admin_user_phone_search(client: AsyncClient, admin_token_headers, db_session):
+    import random
+    from app.models.user import User
+
+    phone = f"137{random.randint(10000000, 99999999)}"
+    db_session.add(User(nickname="Phone Search", phone=phone))
+    await db_session.commit()
+
+    url = f"{settings.API_V1_STR}/admin/user/list"
+    for fragment in (phone, phone[3:9], phone[-4:]):
+        res = await client.get(url, params={"phone": fragment, "size": 100}, headers=admin_token_headers)
+        assert phone in [u["phone"] for u in res.json()["data"]["list"]]
+
+@pytest.mark.asyncio
+async def test_db_pool_stats(client: AsyncClient, admin_token_headers, monkeypatch):
+    from sqlalchemy import exc
+    from sqlalchemy.engine import make_url
+    from app.core import database
+
+    # Throwaway engines, so the shared app engine is never disposed mid-suite
+    monkeypatch.setattr(settings, "DB_POOL_SIZE", 1)
+    monkeypatch.setattr(settings, "DB_MAX_OVERFLOW", 0)
+    monkeypatch.setattr(settings, "DB_POOL_TIMEOUT", 0.1)
+    engine = database.create_engine(str(settings.SQLALCHEMY_DATABASE_URI))
+    try:
+        async with engine.connect():
+            assert engine.pool.stats()["checked_out"] == 1
+            with pytest.raises(exc.TimeoutError):
+                await engine.connect()
+        stats = engine.pool.stats()
+        assert (stats["checkouts"], stats["timeouts"], stats["errors"]) == (2, 1, 0)
+    finally:
+        await engine.dispose()
+
+    # A failed connect is an error, not a pool timeout
+    url = make_url(str(settings.SQLALCHEMY_DATABASE_URI)).set(port=1)
+    engine = database.create_engine(url.render_as_string(hide_password=False))
+    try:
+        with pytest.raises(Exception):
+            await engine.connect()
+        stats = engine.pool.stats()
+        assert (stats["timeouts"], stats["errors"]) == (0, 1)
+    finally:
+        await engine.dispose()
+    # The endpoint reports the shared engine, built from the real settings
+    monkeypatch.undo()
+
+    response = await client.get(f"{settings.API_V1_STR}/admin/db/pool", headers=admin_token_headers)
+    data = response.json()["data"]
+    assert data["pool"]["pool_size"] == settings.DB_POOL_SIZE
+    assert data["server"]["max_connections"] > 0
+    assert data["per_worker_max_connections"] == settings.DB_POOL_SIZE + settings.DB_MAX_OVERFLOW
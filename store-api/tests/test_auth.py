@@ -1,8 +1,10 @@
+import httpx
 import pytest
 from httpx import AsyncClient
 from app.core.config import settings
 import random
 import string
+import time
 
 def generate_random_phone():
     return f"139{random.randint(10000000, 99999999)}"
@@ -104,3 +106,103 @@ async def test_user_update_validation(client: AsyncClient, normal_user_token_hea
         headers=normal_user_token_headers
     )
     assert response.json()["code"] == 400
+
+@pytest.mark.asyncio
+async def test_profile_update_invalidates_user_cache(client: AsyncClient, normal_user_token_headers):
+    # First lookup fills the cache, second is served from it
+    await client.get(f"{settings.API_V1_STR}/auth/profile", headers=normal_user_token_headers)
+    await client.get(f"{settings.API_V1_STR}/auth/profile", headers=normal_user_token_headers)
+
+    nickname = f"Cached_{random.randint(1000, 9999)}"
+    response = await client.put(
+        f"{settings.API_V1_STR}/auth/profile",
+        json={"nickname": nickname},
+        headers=normal_user_token_headers
+    )
+    assert response.json()["data"]["nickname"] == nickname
+
+    response = await client.get(f"{settings.API_V1_STR}/auth/profile", headers=normal_user_token_headers)
+    assert response.json()["data"]["nickname"] == nickname
+
+    response = await client.get(f"{settings.API_V1_STR}/admin/metrics")
+    stats = response.json()["data"]["user_cache"]
+    assert stats["hits"] >= 1
+    assert 0 < stats["hit_rate"] <= 1
+
+@pytest.mark.asyncio
+async def test_claims_only_rejects_non_user_token(client: AsyncClient):
+    response = await client.post(
+        f"{settings.API_V1_STR}/auth/admin/login",
+        json={"username": settings.ADMIN_USERNAME, "password": settings.ADMIN_PASSWORD}
+    )
+    headers = {"Authorization": f"Bearer {response.json()['data']['token']}"}
+    response = await client.get(f"{settings.API_V1_STR}/cart/list", headers=headers)
+    assert response.json()["code"] == 403
+
+def test_decoded_token_cache_respects_expiry():
+    from datetime import timedelta
+    from jose import JWTError
+    from app.core import security
+
+    token = security.create_access_token(42)
+    hits = security.token_cache.hits
+    assert security.decode_access_token(token).sub == "42"
+    assert security.decode_access_token(token).sub == "42"
+    assert security.token_cache.hits == hits + 1
+
+    # Cached lifetime never outlives the token's own exp
+    short = security.create_access_token(42, expires_delta=timedelta(seconds=1))
+    security.decode_access_token(short)
+    _, expires_at = security.token_cache._data[short]
+    assert expires_at - time.monotonic() <= 1
+
+    expired = security.create_access_token(42, expires_delta=timedelta(seconds=-1))
+    with pytest.raises(JWTError):
+        security.decode_access_token(expired)
+    assert expired not in security.token_cache._data
+
+def test_pyjwt_backend_requires_pyjwt(monkeypatch):
+    import sys
+    from app.core import security
+
+    # A missing optional backend fails when the decoder is chosen, not on each decode
+    monkeypatch.setattr(security.settings, "JWT_BACKEND", "pyjwt")
+    monkeypatch.setitem(sys.modules, "jwt", None)
+    with pytest.raises(RuntimeError, match="PyJWT"):
+        security.get_jwt_decoder()
+
+    monkeypatch.setattr(security.settings, "JWT_BACKEND", "jose")
+    assert security.get_jwt_decoder() is security._jose_decode
+
+@pytest.mark.asyncio
+async def test_wechat_client(client: AsyncClient, fake_wechat, monkeypatch):
+    from app.services import wechat
+
+    res = await client.post(f"{settings.API_V1_STR}/auth/login", json={"code": "wx_code_1"})
+    assert res.json()["code"] == 200
+    request = fake_wechat.requests[-1]
+    assert request.url.path == "/sns/jscode2session"
+    assert request.url.params["js_code"] == "wx_code_1"
+
+    # One long-lived client is reused across logins
+    http_client = wechat.wechat_client.client
+    await client.post(f"{settings.API_V1_STR}/auth/login", json={"code": "wx_code_2"})
+    assert wechat.wechat_client.client is http_client
+
+    # Connection errors, 5xx and "system busy" are retried with backoff
+    fake_wechat.failures = [
+        httpx.ConnectError("connection refused"),
+        httpx.Response(502),
+        httpx.Response(200, json={"errcode": -1, "errmsg": "system busy"}),
+    ]
+    monkeypatch.setattr(settings, "WECHAT_RETRIES", 3)
+    data = await wechat.code_to_session("wx_code_3")
+    assert data["openid"] == "openid_wx_code_3"
+    assert wechat.wechat_client.retries == 3
+
+    # Non-idempotent requests are not retried once they may have reached the server
+    fake_wechat.failures = [httpx.ReadTimeout("timed out")]
+    with pytest.raises(httpx.ReadTimeout):
+        await wechat.wechat_client.post("/sns/jscode2session")
+
+    await wechat.wechat_client.aclose()
@@ -1,3 +1,4 @@
+import re
 import pytest
 from httpx import AsyncClient
 from app.core.config import settings
@@ -187,3 +188,39 @@ async def test_order_validation(client: AsyncClient, normal_user_token_headers):
         headers=normal_user_token_headers
     )
     assert res.json()["code"] == 400
+
+@pytest.mark.asyncio
+async def test_create_order_statement_count(client: AsyncClient, normal_user_token_headers, statements):
+    cat_res = await client.post(f"{settings.API_V1_STR}/category", json={"name": "Order Stmt Cat"})
+    cat_id = cat_res.json()["data"]["id"]
+    prod_ids = []
+    for i in range(5):
+        prod_res = await client.post(f"{settings.API_V1_STR}/product", json={
+            "category_id": cat_id, "name": f"Stmt Prod {i}", "price": "10.00", "stock": 50
+        })
+        prod_ids.append(prod_res.json()["data"]["id"])
+
+    statements.clear()
+    res = await client.post(f"{settings.API_V1_STR}/order/create", json={
+        "items": [{"product_id": prod_id, "count": 1} for prod_id in prod_ids],
+        "delivery_type": "pickup",
+    }, headers=normal_user_token_headers)
+    assert res.json()["code"] == 200
+    order_id = res.json()["data"]["order_id"]
+
+    # Stock UPDATE, order INSERT ... RETURNING, one batch each for items and timeline,
+    # then the order event notification and one upsert for the daily and hourly rollups
+    # - independent of item count
+    sql = [re.match(r"(WITH|SELECT|UPDATE|INSERT INTO)\s+(\w+)", s) for s in statements]
+    assert [m.group(1) + " " + m.group(2) for m in sql if m] == [
+        "UPDATE products", "INSERT INTO orders", "INSERT INTO order_items", "INSERT INTO order_timeline",
+        "SELECT pg_notify", "WITH daily",
+    ]
+
+    res = await client.get(
+        f"{settings.API_V1_STR}/order/detail?order_id={order_id}",
+        headers=normal_user_token_headers
+    )
+    detail = res.json()["data"]
+    assert len(detail["items"]) == 5
+    assert len(detail["timeline"]) == 2
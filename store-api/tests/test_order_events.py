@@ -0,0 +1,103 @@
+import asyncio
+import json
+import pytest
+from httpx import AsyncClient
+from app.api.v1.endpoints import admin
+from app.core.config import settings
+from app.services import order_events
+from app.services.order_events import OrderEventBroker
+
+
+async def _next(queue: asyncio.Queue, order_id: int) -> dict:
+    # Skip events of orders created by other tests
+    while True:
+        event = await asyncio.wait_for(queue.get(), 5)
+        if event["order_id"] == order_id:
+            return event
+
+
+def test_dispatch_drops_slow_subscriber():
+    broker = OrderEventBroker(queue_size=2)
+    fast, slow = broker.subscribe(), broker.subscribe()
+    for order_id in (1, 2):
+        broker.dispatch({"type": "order_created", "order_id": order_id})
+        fast.get_nowait()
+
+    broker.dispatch({"type": "order_created", "order_id": 3})
+    # The slow subscriber keeps what it had, then gets the end marker and is removed
+    assert [slow.get_nowait()["order_id"] for _ in range(2)] == [1, 2]
+    assert slow.get_nowait() is None
+    assert broker.subscribers == {fast}
+    assert fast.get_nowait()["order_id"] == 3
+    assert broker.stats()["dropped"] == 1
+
+
+@pytest.mark.asyncio
+async def test_stream_format(monkeypatch):
+    monkeypatch.setattr(settings, "ORDER_EVENTS_HEARTBEAT", 0.01)
+    broker = OrderEventBroker()
+    stream = broker.stream()
+    assert await stream.__anext__() == f"retry: {settings.ORDER_EVENTS_CLIENT_RETRY_MS}\n\n"
+    assert await stream.__anext__() == ": ping\n\n"
+
+    broker.dispatch({"type": "order_created", "order_id": 1, "order_no": "单号"})
+    message = await stream.__anext__()
+    event, data = message.rstrip("\n").split("\n")
+    assert event == "event: order_created"
+    assert json.loads(data.removeprefix("data: ")) == {"type": "order_created", "order_id": 1, "order_no": "单号"}
+
+    await stream.aclose()
+    assert not broker.subscribers
+
+
+@pytest.mark.asyncio
+async def test_events_are_published_on_commit(client: AsyncClient, normal_user_token_headers, admin_token_headers):
+    broker = OrderEventBroker()
+    broker.start()
+    try:
+        await asyncio.wait_for(broker.listening.wait(), 5)
+        queue = broker.subscribe()
+
+        cat_res = await client.post(f"{settings.API_V1_STR}/category", json={"name": "Events Cat"})
+        prod_res = await client.post(f"{settings.API_V1_STR}/product", json={
+            "category_id": cat_res.json()["data"]["id"], "name": "Events Product", "price": "6.00", "stock": 10
+        })
+        res = await client.post(f"{settings.API_V1_STR}/order/create", json={
+            "items": [{"product_id": prod_res.json()["data"]["id"], "count": 1}],
+            "delivery_type": "delivery",
+            "address_id": None,
+        }, headers=normal_user_token_headers)
+        # Rejected before any write: no event
+        assert res.json()["code"] == 400
+
+        res = await client.post(f"{settings.API_V1_STR}/order/create", json={
+            "items": [{"product_id": prod_res.json()["data"]["id"], "count": 1}],
+            "delivery_type": "pickup",
+        }, headers=normal_user_token_headers)
+        order_id = res.json()["data"]["order_id"]
+        event = await _next(queue, order_id)
+        assert event["type"] == "order_created"
+        assert event["order_no"] == res.json()["data"]["order_no"]
+        assert event["status"] == 2 and event["delivery_type"] == "pickup"
+
+        res = await client.post(
+            f"{settings.API_V1_STR}/admin/order/batch/verify", json={"order_ids": [order_id]}, headers=admin_token_headers
+        )
+        assert res.json()["data"]["succeeded"] == 1
+        event = await _next(queue, order_id)
+        assert event == {"type": "order_status_changed", "order_id": order_id, "event": "verify", "status": 4}
+        assert broker.stats()["received"] >= 2
+    finally:
+        await broker.stop()
+    assert not broker.listening.is_set()
+
+
+@pytest.mark.asyncio
+async def test_events_endpoint_streams_from_broker():
+    response = await admin.stream_order_events()
+    assert response.media_type == "text/event-stream"
+    assert response.headers["cache-control"] == "no-cache"
+    assert await response.body_iterator.__anext__() == f"retry: {settings.ORDER_EVENTS_CLIENT_RETRY_MS}\n\n"
+    assert order_events.broker.stats()["subscribers"] == 1
+    await response.body_iterator.aclose()
+    assert order_events.broker.stats()["subscribers"] == 0
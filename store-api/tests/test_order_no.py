@@ -0,0 +1,117 @@
+import multiprocessing
+from datetime import timedelta
+from concurrent.futures import ProcessPoolExecutor
+
+import pytest
+
+from app.utils.order_no import ClockSkewError, OrderNoGenerator
+
+
+def _generate(worker_id: int, count: int) -> list:
+    generator = OrderNoGenerator(worker_id)
+    return [generator.next() for _ in range(count)]
+
+
+def test_order_no_unique_across_processes():
+    workers, count = 4, 20000
+    with ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+        batches = list(pool.map(_generate, range(workers), [count] * workers))
+
+    numbers = [n for batch in batches for n in batch]
+    assert len(set(numbers)) == workers * count
+    for batch in batches:
+        # Fixed width, so string order is generation order within a process
+        assert all(len(n) == 25 and n.isdigit() for n in batch)
+        assert batch == sorted(batch)
+
+
+class FakeClock:
+    def __init__(self, now: float):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_order_no_sequence_and_clock_skew():
+    clock = FakeClock(1700000000.0)
+    generator = OrderNoGenerator(7, max_skew_ms=100, clock=clock)
+
+    first = generator.next()
+    assert first[14:17] == "000" and first[17:21] == "0007" and first[21:] == "0000"
+
+    # Sequence exhaustion borrows the next millisecond instead of repeating
+    numbers = [generator.next() for _ in range(10000)]
+    assert numbers[-1][14:17] == "001" and numbers[-1][21:] == "0000"
+    assert numbers == sorted(numbers) and len(set(numbers)) == 10000
+
+    # Small backwards step: keep counting on the logical clock
+    clock.now -= 0.05
+    skewed = generator.next()
+    assert skewed > numbers[-1]
+    assert generator.skewed == 1
+
+    # Large backwards step: refuse rather than risk duplicates
+    clock.now -= 1
+    with pytest.raises(ClockSkewError):
+        generator.next()
+    clock.now += 2
+    assert generator.next() > skewed
+
+
+def test_order_no_prefix_ignores_dst():
+    # 2026-11-01 05:30 UTC is 01:30 EDT; half an hour later New York falls back
+    # to EST and 01:00-02:00 local time repeats.
+    clock = FakeClock(1793511000.0)
+    generator = OrderNoGenerator(1, clock=clock, utc_offset=-5 * 3600)
+    numbers = []
+    for _ in range(120):
+        numbers.append(generator.next())
+        clock.now += 60
+    assert numbers == sorted(numbers) and len(set(numbers)) == len(numbers)
+    assert numbers[0].startswith("20261101003000")
+
+
+def test_prefix_utc_offset(monkeypatch):
+    from app.services import order_no
+
+    for zone, offset in [("Asia/Shanghai", 8), ("America/New_York", -5), ("Australia/Sydney", 10)]:
+        monkeypatch.setattr(order_no.settings, "SHOP_TIMEZONE", zone)
+        assert order_no.prefix_utc_offset() == offset * 3600
+
+
+@pytest.mark.asyncio
+async def test_assign_worker_id(db_session, monkeypatch):
+    from sqlalchemy import delete, func, update
+    from app.models.order import OrderNoWorkerLease
+    from app.services import order_no
+
+    monkeypatch.setattr(order_no, "generator", order_no.generator)
+    monkeypatch.setattr(order_no, "lease", None)
+    monkeypatch.setattr(order_no.settings, "ORDER_NO_WORKERS", 3)
+    await db_session.execute(delete(OrderNoWorkerLease))
+
+    first = await order_no.assign_worker_id(db_session)
+    first_lease = order_no.lease
+    second = await order_no.assign_worker_id(db_session)
+    assert (first, second) == (0, 1)
+    assert order_no.generator.worker_id == second
+    assert order_no.next_order_no()[17:21] == f"{second:04d}"
+    assert await order_no.renew_worker_id(db_session)
+
+    # A live lease is never handed out again, however many processes have started
+    third = await order_no.assign_worker_id(db_session)
+    assert third == 2
+    with pytest.raises(RuntimeError):
+        await order_no.assign_worker_id(db_session)
+
+    # An expired lease is reclaimed, and its former holder can no longer renew it
+    await db_session.execute(
+        update(OrderNoWorkerLease).where(OrderNoWorkerLease.worker_id == first)
+        .values(expires_at=func.now() - timedelta(seconds=1))
+    )
+    assert await order_no.assign_worker_id(db_session) == first
+    monkeypatch.setattr(order_no, "lease", first_lease)
+    assert not await order_no.renew_worker_id(db_session)
+
+    await db_session.rollback()
@@ -0,0 +1,89 @@
+import asyncio
+import pytest
+from httpx import AsyncClient
+from sqlalchemy import select
+from app.core.config import settings
+from app.models.order import Order, OrderTimeline
+from app.services import order_state
+from tests.conftest import TestingSessionLocal
+
+
+def test_transition_table():
+    assert order_state.status_text(2, "pickup") == "待自提"
+    assert order_state.status_text(2, "delivery") == "待发货"
+    assert order_state.status_text(9, "pickup") == "未知状态"
+    assert order_state.can_transition(1, "delivery", "accept")
+    assert order_state.can_transition(2, "pickup", "verify")
+    assert not order_state.can_transition(2, "delivery", "verify")
+    assert not order_state.can_transition(4, "pickup", "cancel")
+    # The conditional UPDATEs are built from the same table
+    assert order_state.EVENT_SOURCES["verify"] == [(order_state.PENDING_PICKUP, "pickup")]
+    assert order_state.EVENT_SOURCES["cancel"] == sorted(
+        (status, delivery_type) for status in (0, 1, 2) for delivery_type in order_state.DELIVERY_TYPES
+    )
+
+
+async def _create_order(client: AsyncClient, headers):
+    cat_res = await client.post(f"{settings.API_V1_STR}/category", json={"name": "State Cat"})
+    prod_res = await client.post(f"{settings.API_V1_STR}/product", json={
+        "category_id": cat_res.json()["data"]["id"], "name": "State Product", "price": "10.00", "stock": 5
+    })
+    prod_id = prod_res.json()["data"]["id"]
+    res = await client.post(f"{settings.API_V1_STR}/order/create", json={
+        "items": [{"product_id": prod_id, "count": 2}],
+        "delivery_type": "pickup",
+    }, headers=headers)
+    assert res.json()["code"] == 200, res.text
+    return res.json()["data"]["order_id"], prod_id
+
+
+@pytest.mark.asyncio
+async def test_cancel_order(client: AsyncClient, normal_user_token_headers):
+    order_id, prod_id = await _create_order(client, normal_user_token_headers)
+
+    res = await client.post(f"{settings.API_V1_STR}/order/cancel", json={"order_id": order_id},
+                            headers=normal_user_token_headers)
+    assert res.json()["code"] == 200
+    res = await client.get(f"{settings.API_V1_STR}/product/{prod_id}")
+    assert res.json()["data"]["stock"] == 5
+
+    # A cancelled order cannot be cancelled again, stock is not released twice
+    res = await client.post(f"{settings.API_V1_STR}/order/cancel", json={"order_id": order_id},
+                            headers=normal_user_token_headers)
+    assert res.json()["code"] == 400
+    assert res.json()["msg"] == "当前订单状态不可取消"
+    res = await client.get(f"{settings.API_V1_STR}/product/{prod_id}")
+    assert res.json()["data"]["stock"] == 5
+
+    res = await client.post(f"{settings.API_V1_STR}/order/cancel", json={"order_id": 999999999},
+                            headers=normal_user_token_headers)
+    assert res.json()["code"] == 404
+
+
+@pytest.mark.asyncio
+async def test_concurrent_transitions(client: AsyncClient, normal_user_token_headers):
+    order_id, _ = await _create_order(client, normal_user_token_headers)
+
+    async def apply(event: str):
+        async with TestingSessionLocal() as session:
+            try:
+                await order_state.transition(
+                    session, event, Order.id == order_id, timeline_status=event,
+                )
+            except order_state.TransitionError as e:
+                return e.status
+            await session.commit()
+            return event
+
+    # Verify and cancel race: the conditional UPDATE lets exactly one win
+    results = await asyncio.gather(apply("verify"), apply("cancel"))
+    winners = [r for r in results if isinstance(r, str)]
+    assert len(winners) == 1
+
+    async with TestingSessionLocal() as session:
+        status = (await session.execute(select(Order.status).where(Order.id == order_id))).scalar_one()
+        timeline = (await session.execute(
+            select(OrderTimeline.status).where(OrderTimeline.order_id == order_id, OrderTimeline.status.in_(["verify", "cancel"]))
+        )).scalars().all()
+    assert status == order_state.TRANSITIONS[winners[0]].target
+    assert timeline == winners
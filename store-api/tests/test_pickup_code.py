@@ -0,0 +1,95 @@
+import pytest
+import uuid
+from httpx import AsyncClient
+from sqlalchemy import update
+from app.core.config import settings
+from app.models.order import Order
+from app.services import pickup_code
+
+
+async def _create_product(client: AsyncClient) -> int:
+    cat_res = await client.post(f"{settings.API_V1_STR}/category", json={"name": "Pickup Code Cat"})
+    prod_res = await client.post(f"{settings.API_V1_STR}/product", json={
+        "category_id": cat_res.json()["data"]["id"], "name": "Pickup Code Product", "price": "5.00", "stock": 100
+    })
+    return prod_res.json()["data"]["id"]
+
+
+async def _create_pickup_order(client: AsyncClient, headers, prod_id: int) -> dict:
+    res = await client.post(f"{settings.API_V1_STR}/order/create", json={
+        "items": [{"product_id": prod_id, "count": 1}],
+        "delivery_type": "pickup",
+    }, headers=headers)
+    return res.json()
+
+
+@pytest.mark.asyncio
+async def test_pickup_code_unique_among_active_orders(
+    client: AsyncClient, db_session, normal_user_token_headers, admin_token_headers, monkeypatch
+):
+    prod_id = await _create_product(client)
+    # Codes that may be left over by other tests' active orders
+    base = 100000 + int(uuid.uuid4().int % 800000)
+    first_code, second_code = str(base), str(base + 1)
+    await db_session.execute(
+        update(Order).where(Order.pickup_code.in_([first_code, second_code])).values(pickup_code=None)
+    )
+    await db_session.commit()
+
+    codes = iter([first_code, first_code, first_code, second_code, first_code])
+    monkeypatch.setattr(pickup_code, "generate_code", lambda: next(codes))
+    allocator = pickup_code.allocator
+    attempts = allocator.attempts
+
+    first = await _create_pickup_order(client, normal_user_token_headers, prod_id)
+    assert first["code"] == 200
+    # The active order holds the first code: the second order retries until it gets a free one
+    second = await _create_pickup_order(client, normal_user_token_headers, prod_id)
+    assert second["code"] == 200
+    assert allocator.attempts - attempts == 4
+
+    res = await client.get(
+        f"{settings.API_V1_STR}/order/detail?order_id={second['data']['order_id']}",
+        headers=normal_user_token_headers,
+    )
+    assert res.json()["data"]["pickup_code"] == second_code
+
+    # Verifying the first order frees its code for the next order
+    res = await client.post(f"{settings.API_V1_STR}/admin/order/verify", json={"code": first_code},
+                            headers=admin_token_headers)
+    assert res.json()["data"]["success"] is True
+    third = await _create_pickup_order(client, normal_user_token_headers, prod_id)
+    assert third["code"] == 200
+    res = await client.get(
+        f"{settings.API_V1_STR}/order/detail?order_id={third['data']['order_id']}",
+        headers=normal_user_token_headers,
+    )
+    assert res.json()["data"]["pickup_code"] == first_code
+
+    # A reused code verifies the active order; the completed one is not touched again
+    res = await client.post(f"{settings.API_V1_STR}/admin/order/verify", json={"code": first_code},
+                            headers=admin_token_headers)
+    assert res.json()["data"]["success"] is True
+    res = await client.post(f"{settings.API_V1_STR}/admin/order/verify", json={"code": first_code},
+                            headers=admin_token_headers)
+    assert res.json()["msg"] == "该订单已核销"
+
+
+@pytest.mark.asyncio
+async def test_pickup_code_exhausted(client: AsyncClient, normal_user_token_headers, monkeypatch):
+    prod_id = await _create_product(client)
+    first = await _create_pickup_order(client, normal_user_token_headers, prod_id)
+    res = await client.get(
+        f"{settings.API_V1_STR}/order/detail?order_id={first['data']['order_id']}",
+        headers=normal_user_token_headers,
+    )
+    taken = res.json()["data"]["pickup_code"]
+
+    monkeypatch.setattr(pickup_code, "generate_code", lambda: taken)
+    monkeypatch.setattr(settings, "PICKUP_CODE_ATTEMPTS", 3)
+    res = await _create_pickup_order(client, normal_user_token_headers, prod_id)
+    assert res["code"] == 503
+
+    # The failed order released its stock reservation
+    res = await client.get(f"{settings.API_V1_STR}/product/{prod_id}")
+    assert res.json()["data"]["stock"] == 99
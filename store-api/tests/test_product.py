@@ -77,3 +77,176 @@ async def test_product_validation(client: AsyncClient):
         "status": 2
     })
     assert res.json()["code"] == 400
+
+@pytest.mark.asyncio
+async def test_product_cursor_pagination(client: AsyncClient):
+    cat_res = await client.post(f"{settings.API_V1_STR}/category", json={"name": "Cursor Cat"})
+    cat_id = cat_res.json()["data"]["id"]
+    ids = []
+    for i in range(3):
+        res = await client.post(f"{settings.API_V1_STR}/product", json={
+            "category_id": cat_id, "name": f"Cursor Product {i}", "price": "1.00", "stock": 1
+        })
+        ids.append(res.json()["data"]["id"])
+
+    url = f"{settings.API_V1_STR}/product/list"
+    res = await client.get(url, params={"category_id": cat_id, "size": 2, "cursor": ""})
+    data = res.json()["data"]
+    assert [p["id"] for p in data["list"]] == ids[:0:-1]
+    assert data["total"] is None
+    assert data["next_cursor"]
+
+    res = await client.get(url, params={"category_id": cat_id, "size": 2, "cursor": data["next_cursor"]})
+    data = res.json()["data"]
+    assert [p["id"] for p in data["list"]] == ids[:1]
+    assert data["next_cursor"] is None
+
+    res = await client.get(url, params={"cursor": "not-a-cursor"})
+    assert res.json()["code"] == 400
+
+@pytest.mark.asyncio
+async def test_product_list_count_modes(client: AsyncClient, monkeypatch):
+    from app.services.catalog import catalog
+    from app.services.counting import count_cache
+
+    # Exercise the database path rather than the catalogue snapshot
+    monkeypatch.setattr(catalog, "enabled", False)
+
+    cat_res = await client.post(f"{settings.API_V1_STR}/category", json={"name": "Count Cat"})
+    cat_id = cat_res.json()["data"]["id"]
+
+    async def add_product(name: str):
+        await client.post(f"{settings.API_V1_STR}/product", json={
+            "category_id": cat_id, "name": name, "price": "1.00", "stock": 1
+        })
+
+    async def list_products(**params):
+        res = await client.get(f"{settings.API_V1_STR}/product/list", params={"category_id": cat_id, **params})
+        return res.json()["data"]
+
+    await add_product("Count A")
+    await add_product("Count B")
+
+    data = await list_products(size=1, count_mode="exact")
+    assert data["total"] == 2
+    assert data["has_more"] is True
+    assert len(data["list"]) == 1
+
+    # Served from the count cache until the products table is written again
+    hits = count_cache.hits
+    assert (await list_products(size=1))["total"] == 2
+    assert count_cache.hits == hits + 1
+
+    await add_product("Count C")
+    assert (await list_products(size=1))["total"] == 3
+
+    data = await list_products(page=3, size=1, count_mode="none")
+    assert data["total"] is None
+    assert data["has_more"] is False
+    assert len(data["list"]) == 1
+
+    data = await list_products(size=1, count_mode="estimate")
+    assert isinstance(data["total"], int)
+
+@pytest.mark.asyncio
+async def test_exact_count_with_in_filter(db_session):
+    from sqlalchemy import select
+    from app.models.product import Product
+    from app.services.counting import CountMode, count_cache, fetch_page
+
+    # Expanding IN binds a list parameter, which must still make a usable cache key
+    query = select(Product).where(Product.id.in_([-1, -2])).order_by(Product.id)
+    page = await fetch_page(db_session, query, 1, 10, mode=CountMode.EXACT)
+    assert page.total == 0 and page.items == [] and page.has_more is False
+
+    hits = count_cache.hits
+    assert (await fetch_page(db_session, query, 1, 10, mode=CountMode.EXACT)).total == 0
+    assert count_cache.hits == hits + 1
+
+@pytest.mark.asyncio
+async def test_product_keyword_search(client: AsyncClient):
+    cat_res = await client.post(f"{settings.API_V1_STR}/category", json={"name": "Search Cat"})
+    cat_id = cat_res.json()["data"]["id"]
+    ids = {}
+    for name in ["新鲜苹果汁", "苹果", "青苹果 500g", "香蕉"]:
+        res = await client.post(f"{settings.API_V1_STR}/product", json={
+            "category_id": cat_id, "name": name, "price": "1.00", "stock": 1
+        })
+        ids[name] = res.json()["data"]["id"]
+
+    async def search(keyword):
+        res = await client.get(f"{settings.API_V1_STR}/product/list", params={"category_id": cat_id, "keyword": keyword})
+        return [p["name"] for p in res.json()["data"]["list"]]
+
+    names = await search("苹果")
+    assert names[0] == "苹果"
+    assert set(names) == {"新鲜苹果汁", "苹果", "青苹果 500g"}
+    # Candidates from the n-gram index are rechecked with ILIKE: "果苹" is not a substring
+    assert await search("果苹") == []
+    assert await search("500G") == ["青苹果 500g"]
+    assert await search("g") == ["青苹果 500g"]
+    assert await search("%") == []
+
+    # Renaming a product refreshes its search vector
+    await client.put(f"{settings.API_V1_STR}/product/{ids['香蕉']}", json={"name": "进口香蕉苹果"})
+    assert "进口香蕉苹果" in await search("苹果")
+    assert await search("香蕉") == ["进口香蕉苹果"]
+
+@pytest.mark.asyncio
+async def test_catalog_snapshot(client: AsyncClient, db_session, admin_token_headers):
+    from app.services.catalog import Catalog, catalog
+
+    cat_res = await client.post(f"{settings.API_V1_STR}/category", json={"name": "Snapshot Cat"})
+    cat_id = cat_res.json()["data"]["id"]
+    res = await client.post(f"{settings.API_V1_STR}/product", json={
+        "category_id": cat_id, "name": "Snapshot Product", "price": "3.00", "stock": 10
+    })
+    prod_id = res.json()["data"]["id"]
+
+    url = f"{settings.API_V1_STR}/product/list"
+    res = await client.get(url, params={"category_id": cat_id})
+    assert res.json()["data"]["list"][0]["stock"] == 10
+    etag = res.headers["ETag"]
+    assert etag == catalog.etag
+
+    # Unchanged snapshot: conditional request is answered with 304
+    res = await client.get(url, params={"category_id": cat_id}, headers={"If-None-Match": etag})
+    assert res.status_code == 304
+
+    # The ETag comes from the content: a snapshot built by another worker or after a restart agrees
+    other = Catalog(enabled=True, ttl=60)
+    await other.ensure_fresh(db_session)
+    assert other.etag == etag
+
+    res = await client.get(f"{settings.API_V1_STR}/category/list")
+    assert cat_id in [c["id"] for c in res.json()["data"]]
+
+    # Admin changes are visible on the next read and change the ETag
+    await client.post(
+        f"{settings.API_V1_STR}/admin/product/stock",
+        params={"product_id": prod_id, "stock": 7}, headers=admin_token_headers,
+    )
+    res = await client.get(url, params={"category_id": cat_id}, headers={"If-None-Match": etag})
+    assert res.status_code == 200
+    assert res.json()["data"]["list"][0]["stock"] == 7
+
+    # Orders reserve stock with a Core UPDATE and notify the snapshot explicitly
+    await client.post(f"{settings.API_V1_STR}/order/create", json={
+        "items": [{"product_id": prod_id, "count": 2}],
+        "delivery_type": "pickup",
+        "pickup_time": "2023-12-30 10:00:00",
+        "user_phone": "13800000000",
+    }, headers=admin_token_headers)
+    res = await client.get(f"{settings.API_V1_STR}/product/{prod_id}")
+    assert res.json()["data"]["stock"] == 5
+
+    await client.post(
+        f"{settings.API_V1_STR}/admin/product/status",
+        params={"id": prod_id, "status": 0}, headers=admin_token_headers,
+    )
+    res = await client.get(url, params={"category_id": cat_id})
+    assert res.json()["data"]["list"] == []
+    assert res.json()["data"]["total"] == 0
+    # Off-shelf products fall back to the database for detail
+    res = await client.get(f"{settings.API_V1_STR}/product/{prod_id}")
+    assert res.json()["data"]["status"] == 0
@@ -0,0 +1,69 @@
+import time
+
+import pytest
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from starlette.requests import Request
+from starlette.responses import Response
+
+from app.api import deps
+from app.core.database import engine
+
+def _request(method: str, token: str, headers: dict = None) -> Request:
+    return Request({
+        "type": "http",
+        "method": method,
+        "path": "/",
+        "headers": [(b"authorization", token.encode())] + [
+            (name.lower().encode(), value.encode()) for name, value in (headers or {}).items()
+        ],
+        "client": ("127.0.0.1", 1234),
+    })
+
+async def _write(token: str) -> Response:
+    response = Response()
+    gen = deps.get_db(_request("POST", token), response)
+    session = await gen.__anext__()
+    assert session.bind is engine
+    await gen.aclose()
+    return response
+
+def _read_bind(token: str, headers: dict = None):
+    return deps.get_read_session_factory(_request("GET", token, headers)).kw["bind"]
+
+@pytest.mark.asyncio
+async def test_reads_stick_to_primary_after_write(monkeypatch):
+    # A lazily-connecting engine stands in for the replica; no query is issued
+    replica = create_async_engine("postgresql+asyncpg://replica/store")
+    monkeypatch.setattr(deps, "ReadSessionLocal", async_sessionmaker(bind=replica))
+    deps.recent_writers.clear()
+
+    assert _read_bind("Bearer a") is replica
+
+    await _write("Bearer a")
+    assert _read_bind("Bearer a") is engine
+    # Other users keep reading from the replica
+    assert _read_bind("Bearer b") is replica
+
+    deps.recent_writers.clear()
+    assert _read_bind("Bearer a") is replica
+
+@pytest.mark.asyncio
+async def test_write_marker_sticks_across_workers(monkeypatch):
+    replica = create_async_engine("postgresql+asyncpg://replica/store")
+    monkeypatch.setattr(deps, "ReadSessionLocal", async_sessionmaker(bind=replica))
+    deps.recent_writers.clear()
+
+    response = await _write("Bearer a")
+    marker = response.headers[deps.LAST_WRITE_HEADER]
+    assert f"{deps.LAST_WRITE_COOKIE}={marker}" in response.headers["set-cookie"]
+
+    # Another worker has no in-process record; the marker carried by the client routes to the primary
+    deps.recent_writers.clear()
+    assert _read_bind("Bearer a") is replica
+    assert _read_bind("Bearer a", {deps.LAST_WRITE_HEADER: marker}) is engine
+    assert _read_bind("Bearer a", {"Cookie": f"{deps.LAST_WRITE_COOKIE}={marker}"}) is engine
+
+    # Markers older than the sticky window, or malformed, fall back to the replica
+    stale = str(time.time() - deps.settings.REPLICA_STICKY_SECONDS - 1)
+    assert _read_bind("Bearer a", {deps.LAST_WRITE_HEADER: stale}) is replica
+    assert _read_bind("Bearer a", {deps.LAST_WRITE_HEADER: "soon"}) is replica
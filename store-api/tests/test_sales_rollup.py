@@ -0,0 +1,163 @@
+import pytest
+import re
+from datetime import date, timedelta, timezone
+from decimal import Decimal
+from httpx import AsyncClient
+from app.core.config import settings
+from app.models.stats import ProductSalesRollup
+from app.services import sales_rollup
+from tests.test_admin_batch import create_orders
+
+
+async def _dashboard(client: AsyncClient, headers) -> dict:
+    res = await client.get(f"{settings.API_V1_STR}/admin/dashboard", headers=headers)
+    assert res.json()["code"] == 200
+    return res.json()["data"]
+
+
+def test_day_bounds(monkeypatch):
+    start, end = sales_rollup.day_bounds(date(2026, 10, 18))
+    assert start.isoformat() == "2026-10-18T00:00:00+08:00"
+    assert end - start == timedelta(days=1)
+
+    # DST switch day is 23 hours long
+    monkeypatch.setattr(settings, "SHOP_TIMEZONE", "America/New_York")
+    start, end = sales_rollup.day_bounds(date(2026, 3, 8))
+    assert end.astimezone(timezone.utc) - start.astimezone(timezone.utc) == timedelta(hours=23)
+
+
+@pytest.mark.asyncio
+async def test_dashboard_reads_rollup(
+    client: AsyncClient, db_session, normal_user_token_headers, admin_token_headers, statements
+):
+    cat_res = await client.post(f"{settings.API_V1_STR}/category", json={"name": "Rollup Cat"})
+    prod_res = await client.post(f"{settings.API_V1_STR}/product", json={
+        "category_id": cat_res.json()["data"]["id"], "name": "Rollup Product", "price": "12.50", "stock": 100
+    })
+    prod_id = prod_res.json()["data"]["id"]
+
+    statements.clear()
+    before = await _dashboard(client, admin_token_headers)
+    # One statement, no date() over orders.created_at
+    assert len(statements) == 1
+    assert "date(" not in statements[0].lower()
+
+    res = await client.post(f"{settings.API_V1_STR}/order/create", json={
+        "items": [{"product_id": prod_id, "count": 2}],
+        "delivery_type": "pickup",
+    }, headers=normal_user_token_headers)
+    order_id = res.json()["data"]["order_id"]
+    after_create = await _dashboard(client, admin_token_headers)
+    assert after_create["today_orders"] == before["today_orders"] + 1
+    assert after_create["pending_orders"] == before["pending_orders"] + 1
+    assert Decimal(after_create["today_sales"]) == Decimal(before["today_sales"])
+
+    detail = await client.get(f"{settings.API_V1_STR}/order/detail?order_id={order_id}", headers=normal_user_token_headers)
+    res = await client.post(f"{settings.API_V1_STR}/admin/order/verify", json={
+        "code": detail.json()["data"]["pickup_code"]
+    }, headers=admin_token_headers)
+    assert res.json()["code"] == 200
+    after_verify = await _dashboard(client, admin_token_headers)
+    assert after_verify["today_orders"] == after_create["today_orders"]
+    assert after_verify["pending_orders"] == before["pending_orders"]
+    assert Decimal(after_verify["today_sales"]) == Decimal(before["today_sales"]) + Decimal("25.00")
+
+
+@pytest.mark.asyncio
+async def test_batch_complete_updates_rollup(client, db_session, admin_token_headers):
+    order_ids = await create_orders(db_session, [3, 3, 1])
+    today = sales_rollup.local_today()
+    before = await sales_rollup.summary(db_session, today)
+
+    res = await client.post(
+        f"{settings.API_V1_STR}/admin/order/batch/complete_delivery",
+        headers=admin_token_headers,
+        json={"order_ids": order_ids},
+    )
+    assert res.json()["data"]["succeeded"] == 2
+
+    after = await sales_rollup.summary(db_session, today)
+    assert after["completed_count"] == before["completed_count"] + 2
+    assert after["sales_amount"] == before["sales_amount"] + Decimal("20.00")
+    # Range queries cover [start, end)
+    week = await sales_rollup.summary(db_session, today - timedelta(days=6), today + timedelta(days=1))
+    assert week["sales_amount"] >= after["sales_amount"]
+    assert (await sales_rollup.summary(db_session, today + timedelta(days=1)))["sales_amount"] == 0
+
+
+@pytest.mark.asyncio
+async def test_sales_and_product_stats(
+    client: AsyncClient, db_session, normal_user_token_headers, admin_token_headers, statements
+):
+    cat_res = await client.post(f"{settings.API_V1_STR}/category", json={"name": "Stats Cat"})
+    prod_ids = []
+    for name, price in (("Stats Tea", "800.00"), ("Stats Cake", "1500.00")):
+        prod_res = await client.post(f"{settings.API_V1_STR}/product", json={
+            "category_id": cat_res.json()["data"]["id"], "name": name, "price": price, "stock": 100
+        })
+        prod_ids.append(prod_res.json()["data"]["id"])
+    tea, cake = prod_ids
+
+    today = sales_rollup.local_today()
+    params = {"start_date": str(today), "end_date": str(today)}
+    before_day = (await client.get(
+        f"{settings.API_V1_STR}/admin/stats/sales", params=params, headers=admin_token_headers
+    )).json()["data"]
+    before_hours = (await client.get(
+        f"{settings.API_V1_STR}/admin/stats/sales", params={**params, "granularity": "hour"}, headers=admin_token_headers
+    )).json()["data"]
+    assert len(before_day) == 1 and len(before_hours) == 24
+
+    for items in ([{"product_id": tea, "count": 3}], [{"product_id": tea, "count": 1}, {"product_id": cake, "count": 2}]):
+        res = await client.post(f"{settings.API_V1_STR}/order/create", json={
+            "items": items, "delivery_type": "pickup",
+        }, headers=normal_user_token_headers)
+        order_id = res.json()["data"]["order_id"]
+        res = await client.post(
+            f"{settings.API_V1_STR}/admin/order/batch/verify", json={"order_ids": [order_id]}, headers=admin_token_headers
+        )
+        assert res.json()["data"]["succeeded"] == 1
+
+    statements.clear()
+    day = (await client.get(
+        f"{settings.API_V1_STR}/admin/stats/sales", params=params, headers=admin_token_headers
+    )).json()["data"]
+    assert day[0]["order_count"] == before_day[0]["order_count"] + 2
+    assert day[0]["completed_count"] == before_day[0]["completed_count"] + 2
+    assert Decimal(day[0]["sales_amount"]) == Decimal(before_day[0]["sales_amount"]) + Decimal("6200.00")
+    hours = (await client.get(
+        f"{settings.API_V1_STR}/admin/stats/sales", params={**params, "granularity": "hour"}, headers=admin_token_headers
+    )).json()["data"]
+    assert sum(h["order_count"] for h in hours) - sum(h["order_count"] for h in before_hours) == 2
+
+    products = (await client.get(
+        f"{settings.API_V1_STR}/admin/stats/products", params={**params, "limit": 100}, headers=admin_token_headers
+    )).json()["data"]
+    stats = {p["product_id"]: p for p in products}
+    assert stats[tea]["product_name"] == "Stats Tea"
+    assert stats[tea]["quantity"] == 4 and stats[tea]["order_count"] == 2
+    assert Decimal(stats[tea]["sales_amount"]) == Decimal("3200.00")
+    assert stats[cake]["quantity"] == 2 and Decimal(stats[cake]["sales_amount"]) == Decimal("3000.00")
+    # Served from the rollup tables only
+    assert not any(re.search(r"\b(orders|order_items)\b", s) for s in statements)
+
+    # Removing an item from a completed order adjusts the rollups
+    detail = await client.get(f"{settings.API_V1_STR}/order/detail?order_id={order_id}", headers=normal_user_token_headers)
+    cake_item = next(i for i in detail.json()["data"]["items"] if i["product_id"] == cake)
+    res = await client.post(f"{settings.API_V1_STR}/admin/order/update_items", json={
+        "order_id": order_id, "items": [{"item_id": cake_item["id"], "is_removed": True}]
+    }, headers=admin_token_headers)
+    assert res.json()["code"] == 200
+    rollup = await db_session.get(ProductSalesRollup, (today, cake), populate_existing=True)
+    assert rollup.quantity == 0 and rollup.order_count == 0 and rollup.sales_amount == 0
+    assert (await sales_rollup.summary(db_session, today))["sales_amount"] == Decimal(day[0]["sales_amount"]) - Decimal("3000.00")
+
+    # Invalid and oversized ranges
+    res = await client.get(f"{settings.API_V1_STR}/admin/stats/sales", params={
+        "start_date": str(today), "end_date": str(today - timedelta(days=1))
+    }, headers=admin_token_headers)
+    assert res.json()["code"] == 400
+    res = await client.get(f"{settings.API_V1_STR}/admin/stats/sales", params={
+        "start_date": str(today - timedelta(days=40)), "end_date": str(today), "granularity": "hour"
+    }, headers=admin_token_headers)
+    assert res.json()["code"] == 400
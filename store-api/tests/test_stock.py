@@ -0,0 +1,254 @@
+import pytest
+from httpx import AsyncClient
+from app.core.config import settings
+
+async def _create_product(client: AsyncClient, name: str, stock: int) -> int:
+    cat_res = await client.post(f"{settings.API_V1_STR}/category", json={"name": "Stock Cat"})
+    cat_id = cat_res.json()["data"]["id"]
+    prod_res = await client.post(f"{settings.API_V1_STR}/product", json={
+        "category_id": cat_id, "name": name, "price": "10.00", "stock": stock
+    })
+    return prod_res.json()["data"]["id"]
+
+@pytest.mark.asyncio
+async def test_stock_never_oversold(client: AsyncClient, normal_user_token_headers):
+    prod_id = await _create_product(client, "Flash Sale Product", 2)
+
+    # Same product listed twice in one order is merged before reservation
+    res = await client.post(f"{settings.API_V1_STR}/order/create", json={
+        "items": [{"product_id": prod_id, "count": 1}, {"product_id": prod_id, "count": 1}],
+        "delivery_type": "pickup",
+    }, headers=normal_user_token_headers)
+    assert res.json()["code"] == 200
+
+    res = await client.post(f"{settings.API_V1_STR}/order/create", json={
+        "items": [{"product_id": prod_id, "count": 1}],
+        "delivery_type": "pickup",
+    }, headers=normal_user_token_headers)
+    assert res.json()["code"] == 400
+    assert "stock insufficient" in res.json()["msg"]
+
+    res = await client.get(f"{settings.API_V1_STR}/product/{prod_id}")
+    assert res.json()["data"]["stock"] == 0
+    assert res.json()["data"]["sales_count"] == 2
+
+@pytest.mark.asyncio
+async def test_stock_reservation_is_all_or_nothing(client: AsyncClient, normal_user_token_headers):
+    plenty_id = await _create_product(client, "Plenty Product", 10)
+    scarce_id = await _create_product(client, "Scarce Product", 1)
+
+    res = await client.post(f"{settings.API_V1_STR}/order/create", json={
+        "items": [{"product_id": plenty_id, "count": 3}, {"product_id": scarce_id, "count": 2}],
+        "delivery_type": "pickup",
+    }, headers=normal_user_token_headers)
+    assert res.json()["code"] == 400
+    assert res.json()["msg"] == "Product Scarce Product stock insufficient"
+
+    # The successful row of the failed order must have been rolled back
+    res = await client.get(f"{settings.API_V1_STR}/product/{plenty_id}")
+    assert res.json()["data"]["stock"] == 10
+
+    res = await client.post(f"{settings.API_V1_STR}/order/create", json={
+        "items": [{"product_id": 999999999, "count": 1}],
+        "delivery_type": "pickup",
+    }, headers=normal_user_token_headers)
+    assert res.json()["code"] == 400
+    assert res.json()["msg"] == "Product 999999999 not found"
+
+@pytest.mark.asyncio
+async def test_memory_stock_backend_write_behind(client: AsyncClient, db_session):
+    from sqlalchemy import select
+    from app.models.product import Product
+    from app.services import stock
+
+    prod_id = await _create_product(client, "Hot Product", 5)
+    backend = stock.MemoryStockBackend()
+
+    async def db_stock():
+        result = await db_session.execute(
+            select(Product.stock, Product.sales_count).where(Product.id == prod_id)
+        )
+        return tuple(result.one())
+
+    rows = await backend.reserve(db_session, {prod_id: 3})
+    assert rows[prod_id].name == "Hot Product"
+    await db_session.commit()
+
+    # Counted in memory and journaled, products row untouched until flush
+    assert await db_stock() == (5, 0)
+    with pytest.raises(stock.StockError):
+        await backend.reserve(db_session, {prod_id: 3})
+
+    await backend.release(db_session, {prod_id: 1})
+    await db_session.commit()
+    await backend.reserve(db_session, {prod_id: 3})
+    await db_session.commit()
+
+    # Simulate a crash: a fresh backend must account for the unflushed journal
+    recovered = stock.MemoryStockBackend()
+    with pytest.raises(stock.StockError):
+        await recovered.reserve(db_session, {prod_id: 1})
+    await db_session.rollback()
+
+    await recovered.reconcile(db_session)
+    assert await db_stock() == (0, 5)
+
+@pytest.mark.asyncio
+async def test_memory_stock_backend_applies_changes_on_commit(client: AsyncClient, db_session, session_factory):
+    from app.models.product import Product
+    from app.services import stock
+
+    prod_id = await _create_product(client, "Hot Product Commit", 10)
+    backend = stock.MemoryStockBackend()
+    await backend.reserve(db_session, {prod_id: 4})
+    await db_session.commit()
+
+    # A release whose transaction rolls back never reaches the counter
+    await backend.release(db_session, {prod_id: 4})
+    await db_session.rollback()
+    with pytest.raises(stock.StockError):
+        await backend.reserve(db_session, {prod_id: 7})
+    await db_session.rollback()
+
+    # Reserve 2 more and keep it uncommitted while an admin overwrites the stock to 20
+    async with session_factory() as pending, session_factory() as admin:
+        await backend.reserve(pending, {prod_id: 2})
+        product = await admin.get(Product, prod_id)
+        await backend.invalidate(admin, [prod_id])
+        product.stock = 20
+        await admin.commit()
+
+        # The in-flight 2 still count against the new stock: 18 left, not 20
+        with pytest.raises(stock.StockError):
+            await backend.reserve(db_session, {prod_id: 19})
+        await db_session.rollback()
+        await pending.commit()
+
+    await backend.reserve(db_session, {prod_id: 18})
+    await db_session.rollback()
+    await backend.discard({prod_id: 18})
+    # A fresh backend reading the database agrees with the counter
+    await stock.MemoryStockBackend().reserve(db_session, {prod_id: 18})
+    await db_session.rollback()
+
+async def _create_order(db_session, stocks: dict, status: int) -> int:
+    # Insert an order directly, with its stock already reserved
+    import uuid
+    from sqlalchemy import update
+    from app.models.order import Order, OrderItem
+    from app.models.product import Product
+    from app.models.user import User
+
+    user = User(openid=f"test_stock_{uuid.uuid4().hex[:8]}", nickname="Stock User")
+    db_session.add(user)
+    await db_session.flush()
+    order = Order(
+        order_no=f"TEST_STOCK_{uuid.uuid4().hex[:12]}", user_id=user.id, total_amount=10, delivery_fee=0,
+        final_amount=10, status=status, delivery_type="delivery", address_snapshot={},
+    )
+    db_session.add(order)
+    await db_session.flush()
+    order_id = order.id
+    for prod_id, n in stocks.items():
+        db_session.add(OrderItem(order_id=order_id, product_id=prod_id, product_name="P", price=10, quantity=n))
+        await db_session.execute(update(Product).where(Product.id == prod_id).values(stock=Product.stock - n))
+    await db_session.commit()
+    return order_id
+
+@pytest.mark.asyncio
+async def test_cancel_restores_stock_in_one_statement(client: AsyncClient, normal_user_token_headers, statements):
+    first_id = await _create_product(client, "Cancel A", 10)
+    second_id = await _create_product(client, "Cancel B", 10)
+    res = await client.post(f"{settings.API_V1_STR}/order/create", json={
+        "items": [{"product_id": first_id, "count": 2}, {"product_id": second_id, "count": 3}],
+        "delivery_type": "pickup",
+    }, headers=normal_user_token_headers)
+    order_id = res.json()["data"]["order_id"]
+
+    statements.clear()
+    res = await client.post(f"{settings.API_V1_STR}/order/cancel", json={"order_id": order_id},
+                            headers=normal_user_token_headers)
+    assert res.json()["code"] == 200
+    # Conditional order UPDATE, event notification, one stock UPDATE, timeline INSERT - independent of item count
+    assert [s.split()[0] for s in statements if s.split()[0] in ("SELECT", "UPDATE", "INSERT")] == [
+        "UPDATE", "SELECT", "UPDATE", "INSERT"
+    ]
+    assert sum("pg_notify" in s for s in statements) == 1
+    assert sum("UPDATE products" in s for s in statements) == 1
+
+    for prod_id in (first_id, second_id):
+        res = await client.get(f"{settings.API_V1_STR}/product/{prod_id}")
+        assert res.json()["data"]["stock"] == 10
+
+@pytest.mark.asyncio
+async def test_cancelled_order_items_cannot_move_stock(
+    client: AsyncClient, normal_user_token_headers, admin_token_headers
+):
+    prod_id = await _create_product(client, "Cancel Edit", 10)
+    res = await client.post(f"{settings.API_V1_STR}/order/create", json={
+        "items": [{"product_id": prod_id, "count": 4}],
+        "delivery_type": "pickup",
+    }, headers=normal_user_token_headers)
+    order_id = res.json()["data"]["order_id"]
+    detail = await client.get(f"{settings.API_V1_STR}/order/detail?order_id={order_id}", headers=normal_user_token_headers)
+    item_id = detail.json()["data"]["items"][0]["id"]
+    res = await client.get(f"{settings.API_V1_STR}/product/{prod_id}")
+    assert res.json()["data"]["stock"] == 6
+
+    res = await client.post(f"{settings.API_V1_STR}/order/cancel", json={"order_id": order_id},
+                            headers=normal_user_token_headers)
+    assert res.json()["code"] == 200
+
+    # Stock was already restored on cancel: neither removal nor a larger quantity may touch it again
+    for change in ({"is_removed": True}, {"quantity": 8}):
+        res = await client.post(f"{settings.API_V1_STR}/admin/order/update_items", json={
+            "order_id": order_id, "items": [{"item_id": item_id, **change}]
+        }, headers=admin_token_headers)
+        assert res.json()["code"] == 400
+        res = await client.get(f"{settings.API_V1_STR}/product/{prod_id}")
+        assert res.json()["data"]["stock"] == 10
+
+    detail = await client.get(f"{settings.API_V1_STR}/order/detail?order_id={order_id}", headers=normal_user_token_headers)
+    item = detail.json()["data"]["items"][0]
+    assert item["quantity"] == 4 and not item["is_removed"]
+
+@pytest.mark.asyncio
+async def test_reject_and_item_removal_restore_stock(client: AsyncClient, db_session, admin_token_headers):
+    from sqlalchemy import select
+    from app.models.order import OrderItem
+
+    prod_id = await _create_product(client, "Reject Product", 10)
+
+    order_id = await _create_order(db_session, {prod_id: 4}, status=1)
+    res = await client.post(f"{settings.API_V1_STR}/admin/order/audit", json={
+        "order_id": order_id, "action": "reject", "reject_reason": "缺货"
+    }, headers=admin_token_headers)
+    assert res.json()["code"] == 200
+    res = await client.get(f"{settings.API_V1_STR}/product/{prod_id}")
+    assert res.json()["data"]["stock"] == 10
+
+    order_id = await _create_order(db_session, {prod_id: 4}, status=1)
+    item_id = (await db_session.execute(
+        select(OrderItem.id).where(OrderItem.order_id == order_id)
+    )).scalar_one()
+    res = await client.post(f"{settings.API_V1_STR}/admin/order/update_items", json={
+        "order_id": order_id, "items": [{"item_id": item_id, "quantity": 3}]
+    }, headers=admin_token_headers)
+    assert res.json()["code"] == 200
+    res = await client.get(f"{settings.API_V1_STR}/product/{prod_id}")
+    assert res.json()["data"]["stock"] == 7
+
+    res = await client.post(f"{settings.API_V1_STR}/admin/order/update_items", json={
+        "order_id": order_id, "items": [{"item_id": item_id, "is_removed": True}]
+    }, headers=admin_token_headers)
+    assert res.json()["code"] == 200
+    res = await client.get(f"{settings.API_V1_STR}/product/{prod_id}")
+    assert res.json()["data"]["stock"] == 10
+
+    # Removed items are not restored a second time when the order is rejected
+    res = await client.post(f"{settings.API_V1_STR}/admin/order/batch/audit", json={
+        "order_ids": [order_id], "action": "reject", "reject_reason": "缺货"
+    }, headers=admin_token_headers)
+    assert res.json()["data"]["succeeded"] == 1
+    res = await client.get(f"{settings.API_V1_STR}/product/{prod_id}")
+    assert res.json()["data"]["stock"] == 10
@@ -0,0 +1,208 @@
+import io
+import re
+import threading
+from types import SimpleNamespace
+
+import oss2
+import pytest
+from fastapi import UploadFile
+from httpx import ASGITransport, AsyncClient
+from starlette.datastructures import Headers
+from starlette.routing import Mount
+
+from app.core.config import settings
+from main import app
+from app.schemas import product as product_schemas
+from app.services import storage as storage_module
+from app.services.storage import AliyunOSSStorage, LocalStorage
+
+
+class FakeBucket:
+    """本地 OSS 替身: 记录上传内容和调用线程，可指定分片失败次数"""
+
+    def __init__(self, part_failures: int = 0):
+        self.objects = {}
+        self.parts = {}
+        self.aborted = []
+        self.threads = set()
+        self.part_failures = part_failures
+
+    def put_object(self, key, data, headers=None):
+        self.threads.add(threading.get_ident())
+        self.objects[key] = data.read()
+
+    def init_multipart_upload(self, key, headers=None):
+        self.parts[key] = {}
+        return SimpleNamespace(upload_id=f"upload-{key}")
+
+    def upload_part(self, key, upload_id, part_number, data):
+        self.threads.add(threading.get_ident())
+        if self.part_failures:
+            self.part_failures -= 1
+            raise oss2.exceptions.RequestError(Exception("connection reset"))
+        self.parts[key][part_number] = data
+        return SimpleNamespace(etag=f"etag-{part_number}")
+
+    def complete_multipart_upload(self, key, upload_id, parts):
+        uploaded = self.parts.pop(key)
+        self.objects[key] = b"".join(uploaded[p.part_number] for p in parts)
+
+    def abort_multipart_upload(self, key, upload_id):
+        self.aborted.append(key)
+
+    def object_exists(self, key):
+        return key in self.objects
+
+    def sign_url(self, method, key, expires):
+        return f"https://test-bucket.oss-cn-hangzhou.aliyuncs.com/{key}?Expires={expires}&Signature=fake"
+
+
+def make_upload(data: bytes, filename: str = "clip.mp4", content_type: str = "video/mp4") -> UploadFile:
+    return UploadFile(
+        file=io.BytesIO(data), filename=filename, size=len(data),
+        headers=Headers({"content-type": content_type}),
+    )
+
+
+@pytest.fixture
+def oss_storage(monkeypatch) -> AliyunOSSStorage:
+    monkeypatch.setattr(settings, "ALIYUN_OSS_ACCESS_KEY_ID", "test-key")
+    monkeypatch.setattr(settings, "ALIYUN_OSS_ACCESS_KEY_SECRET", "test-secret")
+    monkeypatch.setattr(settings, "ALIYUN_OSS_ENDPOINT", "oss-cn-hangzhou.aliyuncs.com")
+    monkeypatch.setattr(settings, "ALIYUN_OSS_BUCKET_NAME", "test-bucket")
+    return AliyunOSSStorage()
+
+
+def test_signed_url_cache(oss_storage: AliyunOSSStorage):
+    url = oss_storage.get_file_url("uploads/images/20240101/120000_abcd1234.png")
+    assert url.startswith("https://test-bucket.oss-cn-hangzhou.aliyuncs.com/uploads")
+    assert "Signature=" in url
+    assert oss_storage.url_cache.ttl <= oss_storage.url_expires // 2
+
+    # Same path: the cached signature is reused
+    assert oss_storage.get_file_url("uploads/images/20240101/120000_abcd1234.png") == url
+    assert oss_storage.url_cache.loads == 1
+    assert oss_storage.url_cache.hits == 1
+
+
+def test_get_file_urls(oss_storage: AliyunOSSStorage):
+    urls = oss_storage.get_file_urls(["a.png", "b.png", "a.png", ""])
+    assert list(urls) == ["a.png", "b.png"]
+    assert urls["a.png"] == oss_storage.get_file_url("a.png")
+    assert oss_storage.url_cache.loads == 2
+
+
+def test_public_url_mode(monkeypatch, oss_storage: AliyunOSSStorage):
+    monkeypatch.setattr(settings, "ALIYUN_OSS_PUBLIC_URL", "https://cdn.example.com/")
+    storage = AliyunOSSStorage()
+    assert storage.get_file_url("uploads/a.png") == "https://cdn.example.com/uploads/a.png"
+    assert storage.url_cache.loads == 0
+
+
+def test_product_out_thumb_url(monkeypatch, oss_storage: AliyunOSSStorage):
+    monkeypatch.setattr(product_schemas, "storage", oss_storage)
+    product = product_schemas.ProductOut(
+        id=1, category_id=1, name="P", price="1.00", sales_count=0, thumb_url="uploads/a.png"
+    )
+    assert product.thumb_path == "uploads/a.png"
+    assert product.thumb_url == oss_storage.get_file_url("uploads/a.png")
+
+
+# --- Storage contract: every backend must pass these ---
+
+@pytest.fixture(params=["aliyun", "local"])
+def contract_storage(request, tmp_path, monkeypatch):
+    """返回 (存储实例, 按路径读取已上传内容的函数)"""
+    monkeypatch.setattr(settings, "UPLOAD_MULTIPART_THRESHOLD", 10)
+    monkeypatch.setattr(settings, "UPLOAD_PART_SIZE", 4)
+    monkeypatch.setattr(storage_module, "LOCAL_CHUNK_SIZE", 4)
+    if request.param == "aliyun":
+        storage = request.getfixturevalue("oss_storage")
+        storage.bucket = FakeBucket()
+        return storage, lambda path: storage.bucket.objects[path]
+    storage = LocalStorage(root=str(tmp_path), base_url="/files")
+    return storage, lambda path: (tmp_path / path).read_bytes()
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("data", [b"png-bytes", b"0123456789abcdef-large"], ids=["small", "large"])
+async def test_storage_contract_upload(contract_storage, data):
+    storage, read_back = contract_storage
+    path = await storage.upload(make_upload(data, "photo.PNG", "image/png"), folder="products")
+    assert re.fullmatch(r"products/images/\d{8}/\d{6}_[0-9a-f]{8}\.PNG", path)
+    assert read_back(path) == data
+
+    path = await storage.upload(make_upload(b"doc", "notes", "application/octet-stream"))
+    assert re.fullmatch(r"uploads/files/\d{8}/\d{6}_[0-9a-f]{8}", path)
+
+
+@pytest.mark.asyncio
+async def test_storage_contract_urls(contract_storage):
+    storage, _ = contract_storage
+    path = await storage.upload(make_upload(b"x", "a.png", "image/png"))
+    assert await storage.exists(path)
+    assert not await storage.exists(f"{path}.missing")
+    url = storage.get_file_url(path)
+    assert path.split("/", 1)[1] in url
+    urls = storage.get_file_urls([path, path, ""])
+    assert urls == {path: url}
+
+
+@pytest.mark.asyncio
+async def test_oss_upload_runs_in_thread_pool(oss_storage: AliyunOSSStorage):
+    oss_storage.bucket = FakeBucket()
+    await oss_storage.upload(make_upload(b"png-bytes", "a.png", "image/png"))
+    # The blocking SDK call ran in the upload thread pool, not on the event loop thread
+    assert oss_storage.bucket.threads and threading.get_ident() not in oss_storage.bucket.threads
+
+
+@pytest.mark.asyncio
+async def test_local_static_serving(monkeypatch, tmp_path):
+    # Mounted on the real app so its exception handlers apply; the root does not exist yet
+    storage = LocalStorage(root=str(tmp_path / "storage"), base_url="/files")
+    monkeypatch.setattr(app.router, "routes", [*app.router.routes, Mount("/files", app=storage.static_app())])
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+        # Missing files are a real 404 even before the first upload, not a JSON body with status 200
+        res = await client.get("/files/uploads/missing.png")
+        assert res.status_code == 404
+        assert "code" not in res.json()
+
+        data = bytes(range(256)) * 4
+        path = await storage.upload(make_upload(data, "clip.mp4", "video/mp4"))
+        assert not list(tmp_path.rglob("*.part"))
+        assert storage.get_file_url(path) == f"/files/{path}"
+        res = await client.get(f"/files/{path}")
+        assert res.status_code == 200
+        assert res.content == data
+        assert res.headers["accept-ranges"] == "bytes"
+        etag, last_modified = res.headers["etag"], res.headers["last-modified"]
+
+        res = await client.get(f"/files/{path}", headers={"If-None-Match": etag})
+        assert res.status_code == 304
+        res = await client.get(f"/files/{path}", headers={"If-Modified-Since": last_modified})
+        assert res.status_code == 304
+
+        res = await client.get(f"/files/{path}", headers={"Range": "bytes=10-19"})
+        assert res.status_code == 206
+        assert res.content == data[10:20]
+        assert res.headers["content-range"] == f"bytes 10-19/{len(data)}"
+
+
+@pytest.mark.asyncio
+async def test_upload_multipart(monkeypatch, oss_storage: AliyunOSSStorage):
+    monkeypatch.setattr(settings, "UPLOAD_MULTIPART_THRESHOLD", 10)
+    monkeypatch.setattr(settings, "UPLOAD_PART_SIZE", 4)
+    data = b"0123456789abcdef-video"
+
+    # A failed part is retried without restarting the upload
+    oss_storage.bucket = FakeBucket(part_failures=1)
+    path = await oss_storage.upload(make_upload(data))
+    assert path.startswith("uploads/videos/")
+    assert oss_storage.bucket.objects[path] == data
+
+    # Parts failing beyond the retry budget abort the multipart upload
+    oss_storage.bucket = FakeBucket(part_failures=settings.UPLOAD_PART_RETRIES + 1)
+    with pytest.raises(oss2.exceptions.RequestError):
+        await oss_storage.upload(make_upload(data))
+    assert len(oss_storage.bucket.aborted) == 1
+    assert oss_storage.bucket.objects == {}
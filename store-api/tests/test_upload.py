@@ -0,0 +1,141 @@
+import io
+import uuid
+
+import pytest
+from httpx import AsyncClient
+from PIL import Image
+
+from app.api.v1.endpoints import admin, common, product as product_endpoints
+from app.core.config import settings
+from app.schemas import product as product_schemas
+from app.services import images
+from app.services.storage import LocalStorage
+
+
+@pytest.fixture
+def local_storage(tmp_path, monkeypatch) -> LocalStorage:
+    storage = LocalStorage(root=str(tmp_path), base_url="/files")
+    monkeypatch.setattr(common, "storage", storage)
+    monkeypatch.setattr(product_endpoints, "storage", storage)
+    monkeypatch.setattr(admin, "storage", storage)
+    yield storage
+    images.shutdown()
+
+
+def png_bytes(width: int, height: int) -> bytes:
+    buffer = io.BytesIO()
+    Image.new("RGBA", (width, height), (200, 30, 30, 128)).save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+@pytest.mark.asyncio
+async def test_upload_image_variants(client: AsyncClient, local_storage: LocalStorage, tmp_path):
+    res = await client.post(
+        f"{settings.API_V1_STR}/upload",
+        files={"file": ("photo.png", png_bytes(1000, 500), "image/png")},
+    )
+    data = res.json()["data"]
+    path = data["path"]
+    assert data["url"] == f"/files/{path}"
+    assert set(data["variants"]) == {str(size) for size in settings.IMAGE_VARIANT_SIZES}
+
+    for size in settings.IMAGE_VARIANT_SIZES:
+        variant = images.thumbnail_path(path, size)
+        assert data["variants"][str(size)] == f"/files/{variant}"
+        with Image.open(tmp_path / variant) as image:
+            assert image.format == "WEBP"
+            assert image.size == (size, size // 2)
+            assert image.mode == "RGBA"
+
+    # The product records the list-size thumbnail and exposes it next to the original image
+    product = await create_product(client, path)
+    assert product["thumb_small_url"] == product_schemas.storage.get_file_url(images.thumbnail_path(path))
+
+
+async def create_product(client: AsyncClient, thumb_url: str) -> dict:
+    cat_res = await client.post(f"{settings.API_V1_STR}/category", json={"name": "Thumb Cat"})
+    res = await client.post(f"{settings.API_V1_STR}/product", json={
+        "category_id": cat_res.json()["data"]["id"], "name": "Thumb Product", "price": "1.00", "thumb_url": thumb_url
+    })
+    return res.json()["data"]
+
+
+@pytest.mark.asyncio
+async def test_upload_without_variants(client: AsyncClient, local_storage: LocalStorage, monkeypatch):
+    # Not an image: stored as is
+    res = await client.post(
+        f"{settings.API_V1_STR}/upload", files={"file": ("notes.txt", b"hello", "text/plain")},
+    )
+    assert res.json()["data"]["variants"] == {}
+
+    # Corrupt image: the upload still succeeds without thumbnails
+    res = await client.post(
+        f"{settings.API_V1_STR}/upload", files={"file": ("broken.png", b"not a png", "image/png")},
+    )
+    assert res.json()["code"] == 200
+    assert res.json()["data"]["variants"] == {}
+
+    # A JPEG sent with a generic type gets no thumbnails even though its name matches the naming rule
+    res = await client.post(
+        f"{settings.API_V1_STR}/upload", files={"file": ("photo.jpg", png_bytes(400, 400), "application/octet-stream")},
+    )
+    path = res.json()["data"]["path"]
+    assert images.thumbnail_path(path) is not None
+    product = await create_product(client, path)
+    assert product["thumb_small_url"] == product["thumb_url"]
+
+    # Storing a thumbnail fails: the original upload still succeeds
+    async def fail(*args):
+        raise OSError("disk full")
+    monkeypatch.setattr(local_storage, "put_bytes", fail)
+    res = await client.post(
+        f"{settings.API_V1_STR}/upload", files={"file": ("photo.png", png_bytes(400, 400), "image/png")},
+    )
+    assert res.json()["code"] == 200
+    assert res.json()["data"]["variants"] == {}
+    product = await create_product(client, res.json()["data"]["path"])
+    assert product["thumb_small_url"] == product["thumb_url"]
+
+    product = product_schemas.ProductOut(
+        id=1, category_id=1, name="P", price="1.00", sales_count=0, thumb_url="uploads/images/a.gif"
+    )
+    assert product.thumb_small_url == product.thumb_url
+
+
+@pytest.mark.asyncio
+async def test_admin_save_product_thumbnail(client: AsyncClient, local_storage: LocalStorage, admin_token_headers):
+    async def upload(filename: str, content_type: str) -> str:
+        res = await client.post(
+            f"{settings.API_V1_STR}/upload", files={"file": (filename, png_bytes(400, 400), content_type)},
+        )
+        return res.json()["data"]["path"]
+
+    async def saved() -> dict:
+        res = await client.get(f"{settings.API_V1_STR}/admin/product/list", params={"name": name}, headers=admin_token_headers)
+        return res.json()["data"]["list"][0]
+
+    cat_res = await client.post(f"{settings.API_V1_STR}/category", json={"name": "Console Thumb Cat"})
+    name = f"Console Thumb {uuid.uuid4().hex[:8]}"
+    path = await upload("photo.png", "image/png")
+    res = await client.post(f"{settings.API_V1_STR}/admin/product/save", json={
+        "category_id": cat_res.json()["data"]["id"], "name": name, "price": "1.00", "thumb_url": path,
+    }, headers=admin_token_headers)
+    assert res.json()["code"] == 200
+    product = await saved()
+    assert product["thumb_small_url"] == product_schemas.storage.get_file_url(images.thumbnail_path(path))
+
+    # Replacing the picture with one that has no thumbnails drops the old thumbnail
+    res = await client.post(f"{settings.API_V1_STR}/admin/product/save", params={"id": product["id"]}, json={
+        "thumb_url": await upload("photo.jpg", "application/octet-stream"),
+    }, headers=admin_token_headers)
+    assert res.json()["code"] == 200
+    product = await saved()
+    assert product["thumb_small_url"] == product["thumb_url"]
+
+
+def test_thumbnail_path_since(monkeypatch):
+    monkeypatch.setattr(settings, "IMAGE_VARIANTS_SINCE", "20240601")
+    # Uploaded before thumbnails were enabled: no variants exist
+    assert images.thumbnail_path("uploads/images/20240531/120000_abcd1234.jpg") is None
+    assert images.thumbnail_path("uploads/images/20240601/120000_abcd1234.jpg") == \
+        f"uploads/images/20240601/120000_abcd1234_{settings.IMAGE_LIST_SIZE}.webp"
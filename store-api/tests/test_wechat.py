@@ -0,0 +1,79 @@
+import asyncio
+import time
+from datetime import datetime, timezone
+
+import pytest
+import pytest_asyncio
+from sqlalchemy import delete
+
+from app.core.config import settings
+from app.models.wechat import WeChatToken
+from app.services import wechat
+from tests.conftest import TestingSessionLocal
+
+
+@pytest_asyncio.fixture
+async def token_name():
+    name = f"access_token:test-{time.time_ns()}"
+    yield name
+    async with TestingSessionLocal() as session:
+        await session.execute(delete(WeChatToken).where(WeChatToken.name == name))
+        await session.commit()
+
+
+def make_manager(name: str) -> wechat.AccessTokenManager:
+    return wechat.AccessTokenManager(session_factory=TestingSessionLocal, name=name)
+
+
+@pytest.mark.asyncio
+async def test_access_token_single_flight(fake_wechat, token_name):
+    manager = make_manager(token_name)
+
+    # Concurrent callers share one refresh
+    tokens = await asyncio.gather(*(manager.get_token() for _ in range(20)))
+    assert set(tokens) == {"token-1"}
+    assert fake_wechat.tokens == ["token-1"]
+
+    # Served from memory while outside the refresh margin
+    requests = len(fake_wechat.requests)
+    assert await manager.get_token() == "token-1"
+    assert len(fake_wechat.requests) == requests
+
+    # Refreshed proactively once inside the refresh margin
+    manager.expires_at = time.time() + settings.WECHAT_TOKEN_REFRESH_MARGIN - 1
+    async with TestingSessionLocal() as session:
+        row = await session.get(WeChatToken, token_name)
+        row.expires_at = datetime.fromtimestamp(manager.expires_at, timezone.utc)
+        await session.commit()
+    assert await manager.get_token() == "token-2"
+    assert manager.stats()["fetches"] == 2
+
+
+@pytest.mark.asyncio
+async def test_access_token_shared_across_workers(fake_wechat, token_name):
+    # Two managers stand in for two worker processes sharing the database
+    worker_a, worker_b = make_manager(token_name), make_manager(token_name)
+    tokens = await asyncio.gather(worker_a.get_token(), worker_b.get_token())
+    assert tokens == ["token-1", "token-1"]
+    assert fake_wechat.tokens == ["token-1"]
+    assert worker_a.fetches + worker_b.fetches == 1
+    assert worker_a.shared_hits + worker_b.shared_hits == 1
+
+    # A token rejected by WeChat is replaced once, and the other worker picks up the new one
+    assert await worker_a.get_token(stale_token="token-1") == "token-2"
+    assert await worker_b.get_token(stale_token="token-1") == "token-2"
+    assert fake_wechat.tokens == ["token-1", "token-2"]
+
+
+@pytest.mark.asyncio
+async def test_call_api_refreshes_rejected_token(fake_wechat, token_name, monkeypatch):
+    manager = make_manager(token_name)
+    monkeypatch.setattr(wechat, "token_manager", manager)
+    await manager.get_token()
+    # Another party invalidated our token by fetching a new one
+    fake_wechat.tokens.append("token-external")
+
+    data = await wechat.call_api("POST", "/cgi-bin/message/subscribe/send", json={"touser": "openid"})
+    assert data["errcode"] == 0
+    assert manager.token == "token-3"
+    assert fake_wechat.requests[-1].url.params["access_token"] == "token-3"